@@ -0,0 +1,272 @@
+"""
+Admission Module
+Memory- and CPU-aware admission control for the heavy endpoints: each request's cost is estimated
+from its size, media type and duration, and requests queue until it fits the budget or are
+rejected with 429 and Retry-After
+"""
+
+import asyncio
+import json
+import logging
+import math
+import os
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Deque, Dict, Optional, Tuple
+
+from metrics import ADMISSION_DECISIONS, ADMISSION_QUEUE_DEPTH, ADMISSION_RESERVED, ADMISSION_WAIT_SECONDS
+
+try:
+    import psutil
+except ImportError:  # Without psutil the budget is not checked against free system memory
+    psutil = None
+
+# Setup logging
+logger = logging.getLogger("admission")
+
+MB = 1024 * 1024
+
+def _default_memory_budget_mb() -> int:
+    """Half of the machine's memory, leaving room for the interpreter, caches and other processes"""
+    if psutil is not None:
+        return int(psutil.virtual_memory().total / MB / 2)
+    return 2048
+
+ADMISSION_ENABLED = os.getenv("ADMISSION_ENABLED", "true").lower() == "true"
+ADMISSION_MEMORY_BUDGET_MB = int(os.getenv("ADMISSION_MEMORY_BUDGET_MB", str(_default_memory_budget_mb())))
+# Cores' worth of CPU-bound work (ffmpeg splitting, PDF parsing) admitted at once
+ADMISSION_CPU_BUDGET = float(os.getenv("ADMISSION_CPU_BUDGET", str(os.cpu_count() or 1)))
+ADMISSION_MAX_QUEUE = int(os.getenv("ADMISSION_MAX_QUEUE", "64"))
+ADMISSION_QUEUE_TIMEOUT_SECONDS = float(os.getenv("ADMISSION_QUEUE_TIMEOUT_SECONDS", "60"))
+# Requests also wait while the system has less free memory than this, whatever the budget says; 0 disables
+ADMISSION_MIN_AVAILABLE_MB = int(os.getenv("ADMISSION_MIN_AVAILABLE_MB", "256"))
+
+# Cost model. Uploads are streamed to disk, so the memory a request holds is its working set:
+# the Whisper chunk being uploaded, ffmpeg while splitting, parsed PDFs and transcript copies.
+BASE_REQUEST_BYTES = 24 * MB
+WHISPER_CHUNK_BYTES = 25 * MB
+FFMPEG_BYTES = 64 * MB
+# Raw, compacted, formatted and serialized copies of a transcript of speech (~2.5 words/s)
+TRANSCRIPT_BYTES_PER_SECOND = 128
+TRANSCRIPT_MEMORY_PER_BYTE = 12
+PDF_MEMORY_PER_BYTE = 20
+
+@dataclass(frozen=True)
+class MediaProfile:
+    media: str
+    # Typical encoded size per second of audio, to estimate the duration from the size
+    bytes_per_second: float = 16000
+    # Size assumed when the media is downloaded server-side and the request body is just a URL
+    assumed_bytes: Optional[int] = None
+
+ADMISSION_ENDPOINTS: Dict[str, MediaProfile] = {
+    "/analyze-interview": MediaProfile("audio"),
+    "/upload-audio": MediaProfile("audio"),
+    "/analyze-interview-url": MediaProfile("audio", assumed_bytes=60 * MB),
+    "/extract-transcript": MediaProfile("audio", assumed_bytes=60 * MB),
+    "/analyze-transcript": MediaProfile("transcript"),
+    "/analyze-transcript-stream": MediaProfile("transcript"),
+    "/compare-analyses": MediaProfile("pdf"),
+    "/compare-analyses-url": MediaProfile("pdf", assumed_bytes=4 * MB),
+    "/score-analyses": MediaProfile("pdf"),
+}
+
+@dataclass(frozen=True)
+class RequestCost:
+    memory_bytes: int
+    cpu: float
+
+def estimate_cost(profile: MediaProfile, content_length: int, duration_seconds: Optional[float] = None) -> RequestCost:
+    """Peak memory and CPU of one request, from its media type, size and (if known) duration"""
+    size = profile.assumed_bytes or content_length
+    if profile.media == "audio":
+        duration = duration_seconds or size / profile.bytes_per_second
+        splits = size > WHISPER_CHUNK_BYTES
+        memory = (
+            BASE_REQUEST_BYTES + min(size, WHISPER_CHUNK_BYTES) * 2
+            + (FFMPEG_BYTES if splits else 0) + duration * TRANSCRIPT_BYTES_PER_SECOND
+        )
+        return RequestCost(int(memory), 1.0 if splits else 0.1)
+    if profile.media == "pdf":
+        return RequestCost(BASE_REQUEST_BYTES + size * PDF_MEMORY_PER_BYTE, 1.0)
+    return RequestCost(BASE_REQUEST_BYTES + size * TRANSCRIPT_MEMORY_PER_BYTE, 0.25)
+
+class AdmissionRejected(Exception):
+    def __init__(self, reason: str, retry_after: int):
+        super().__init__(reason)
+        self.reason = reason
+        self.retry_after = retry_after
+
+class AdmissionController:
+    """
+    First-come, first-served admission against memory and CPU budgets, owned by the event loop.
+    A request larger than the whole budget still runs, but only on its own.
+    """
+
+    def __init__(
+        self,
+        memory_budget_bytes: int,
+        cpu_budget: float,
+        max_queue: int,
+        queue_timeout: float,
+        min_available_bytes: int = 0
+    ):
+        self.memory_budget_bytes = memory_budget_bytes
+        self.cpu_budget = cpu_budget
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.min_available_bytes = min_available_bytes
+        self.memory_in_use = 0
+        self.cpu_in_use = 0.0
+        self.active = 0
+        self._waiters: Deque[Tuple[RequestCost, asyncio.Future]] = deque()
+        # Smoothed time requests hold their reservation, for Retry-After
+        self._hold_seconds = 10.0
+
+    def _system_memory_ok(self) -> bool:
+        if psutil is None or not self.min_available_bytes:
+            return True
+        return psutil.virtual_memory().available >= self.min_available_bytes
+
+    def _fits(self, cost: RequestCost) -> bool:
+        if self.active == 0:
+            return True
+        return (
+            self.memory_in_use + cost.memory_bytes <= self.memory_budget_bytes
+            and self.cpu_in_use + cost.cpu <= self.cpu_budget
+            and self._system_memory_ok()
+        )
+
+    def _reserve(self, cost: RequestCost) -> None:
+        self.memory_in_use += cost.memory_bytes
+        self.cpu_in_use += cost.cpu
+        self.active += 1
+        self._update_gauges()
+
+    def _update_gauges(self) -> None:
+        ADMISSION_QUEUE_DEPTH.set(len(self._waiters))
+        ADMISSION_RESERVED.labels(resource="memory_bytes").set(self.memory_in_use)
+        ADMISSION_RESERVED.labels(resource="cpu").set(self.cpu_in_use)
+
+    def retry_after(self) -> int:
+        """Seconds until the queue ahead is likely to have drained"""
+        estimate = self._hold_seconds * (len(self._waiters) + 1) / max(1, self.active)
+        return max(1, min(300, math.ceil(estimate)))
+
+    async def acquire(self, cost: RequestCost, endpoint: str) -> None:
+        """Reserve the cost, waiting in line if needed; raises AdmissionRejected when the wait is too long"""
+        if not self._waiters and self._fits(cost):
+            self._reserve(cost)
+            ADMISSION_DECISIONS.labels(endpoint=endpoint, outcome="admitted").inc()
+            return
+        if len(self._waiters) >= self.max_queue:
+            ADMISSION_DECISIONS.labels(endpoint=endpoint, outcome="rejected_queue_full").inc()
+            raise AdmissionRejected("Server is at capacity", self.retry_after())
+
+        waiter = asyncio.get_running_loop().create_future()
+        entry = (cost, waiter)
+        self._waiters.append(entry)
+        self._update_gauges()
+        started = time.perf_counter()
+        try:
+            await asyncio.wait({waiter}, timeout=self.queue_timeout)
+        except asyncio.CancelledError:
+            # The client went away while queued; give back a reservation made in the meantime
+            if waiter.done() and not waiter.cancelled():
+                self.release(cost, 0.0)
+            else:
+                self._discard(entry)
+            raise
+        ADMISSION_WAIT_SECONDS.labels(endpoint=endpoint).observe(time.perf_counter() - started)
+        if not waiter.done():
+            self._discard(entry)
+            ADMISSION_DECISIONS.labels(endpoint=endpoint, outcome="rejected_timeout").inc()
+            raise AdmissionRejected("Timed out waiting for capacity", self.retry_after())
+        ADMISSION_DECISIONS.labels(endpoint=endpoint, outcome="queued").inc()
+
+    def _discard(self, entry: Tuple[RequestCost, asyncio.Future]) -> None:
+        entry[1].cancel()
+        try:
+            self._waiters.remove(entry)
+        except ValueError:
+            pass
+        self._update_gauges()
+        # The head of the line may have been what held the others back
+        self._admit_waiters()
+
+    def release(self, cost: RequestCost, held_seconds: float) -> None:
+        self.memory_in_use -= cost.memory_bytes
+        self.cpu_in_use -= cost.cpu
+        self.active -= 1
+        if held_seconds > 0:
+            self._hold_seconds = 0.8 * self._hold_seconds + 0.2 * held_seconds
+        self._admit_waiters()
+        self._update_gauges()
+
+    def _admit_waiters(self) -> None:
+        while self._waiters:
+            cost, waiter = self._waiters[0]
+            if waiter.done():
+                self._waiters.popleft()
+                continue
+            if not self._fits(cost):
+                break
+            self._waiters.popleft()
+            self._reserve(cost)
+            waiter.set_result(None)
+
+ADMISSION = AdmissionController(
+    ADMISSION_MEMORY_BUDGET_MB * MB,
+    ADMISSION_CPU_BUDGET,
+    ADMISSION_MAX_QUEUE,
+    ADMISSION_QUEUE_TIMEOUT_SECONDS,
+    ADMISSION_MIN_AVAILABLE_MB * MB
+)
+
+class AdmissionMiddleware:
+    """
+    ASGI middleware admitting requests to the heavy endpoints before their bodies are read.
+    Clients may send X-Media-Duration (seconds) for a better estimate of audio requests.
+    """
+
+    def __init__(self, app, controller: AdmissionController = ADMISSION):
+        self.app = app
+        self.controller = controller
+
+    async def __call__(self, scope, receive, send):
+        profile = ADMISSION_ENDPOINTS.get(scope.get("path")) if scope["type"] == "http" else None
+        if not ADMISSION_ENABLED or profile is None or scope["method"] != "POST":
+            await self.app(scope, receive, send)
+            return
+
+        headers = dict(scope.get("headers") or [])
+        try:
+            content_length = int(headers.get(b"content-length", b"0"))
+            duration = float(headers[b"x-media-duration"]) if b"x-media-duration" in headers else None
+        except ValueError:
+            content_length, duration = 0, None
+        cost = estimate_cost(profile, content_length, duration)
+
+        try:
+            await self.controller.acquire(cost, scope["path"])
+        except AdmissionRejected as e:
+            logger.warning(f"Rejected {scope['path']} ({cost.memory_bytes / MB:.0f}MB): {e.reason}")
+            body = json.dumps({"detail": f"{e.reason}, please retry in {e.retry_after} seconds"}).encode("utf-8")
+            await send({
+                "type": "http.response.start",
+                "status": 429,
+                "headers": [
+                    (b"content-type", b"application/json"),
+                    (b"content-length", str(len(body)).encode("latin-1")),
+                    (b"retry-after", str(e.retry_after).encode("latin-1")),
+                ],
+            })
+            await send({"type": "http.response.body", "body": body})
+            return
+
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.controller.release(cost, time.perf_counter() - started)
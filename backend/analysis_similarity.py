@@ -0,0 +1,262 @@
+"""
+Analysis Similarity Module
+Local comparison of a human and an AI interview analysis: sectioning, fuzzy section alignment
+and per-category lexical (TF-IDF cosine) and optional semantic (embedding) similarity
+"""
+
+import logging
+import math
+import os
+import re
+from collections import Counter
+from dataclasses import dataclass, field
+from difflib import SequenceMatcher
+from functools import lru_cache
+from typing import Dict, List, Optional, Sequence, Tuple
+
+try:
+    from sentence_transformers import SentenceTransformer
+except ImportError:  # Semantic similarity is optional; lexical similarity always works
+    SentenceTransformer = None
+
+# Setup logging
+logger = logging.getLogger("analysis-similarity")
+
+# Small CPU embedding model, e.g. "sentence-transformers/all-MiniLM-L6-v2"; empty disables it
+SIMILARITY_EMBEDDING_MODEL = os.getenv("SIMILARITY_EMBEDDING_MODEL", "")
+# Weight of the per-category mean versus whole-document similarity in the agreement score
+SIMILARITY_CATEGORY_WEIGHT = float(os.getenv("SIMILARITY_CATEGORY_WEIGHT", "0.7"))
+# Minimum heading similarity for two sections to be aligned
+SECTION_ALIGNMENT_THRESHOLD = float(os.getenv("SECTION_ALIGNMENT_THRESHOLD", "0.5"))
+
+# The categories used by the detailed comparison, with words that identify them
+CATEGORIES: Dict[str, List[str]] = {
+    "Technical Skills Assessment": [
+        "technical", "skill", "skills", "coding", "programming", "knowledge", "architecture", "design", "system"
+    ],
+    "Communication Skills": [
+        "communication", "communicate", "clarity", "clear", "articulate", "explain", "explained", "listening", "verbal"
+    ],
+    "Problem-solving Abilities": [
+        "problem", "solving", "approach", "reasoning", "debug", "debugging", "analytical", "logic", "algorithm"
+    ],
+    "Overall Performance": [
+        "overall", "performance", "summary", "score", "rating", "impression", "evaluation"
+    ],
+    "Recommendations": [
+        "recommendation", "recommendations", "recommend", "hire", "hiring", "next", "steps", "suggest", "improvement"
+    ],
+}
+
+STOPWORDS = set("""
+a an and are as at be been but by can could did do does for from had has have he her his how i if in into is it
+its of on or our she so than that the their them then there these they this to was we were what when which who
+will with would you your candidate candidates interview interviewer analysis
+""".split())
+
+TOKEN_PATTERN = re.compile(r"[a-z][a-z0-9+#]*")
+# A heading is a short line, optionally numbered or marked up, without sentence punctuation
+HEADING_PATTERN = re.compile(r"^\s*(?:#+\s*|\d+[.)]\s*|[IVX]+\.\s+|[-*•]\s*)?([A-Za-z][A-Za-z&/,()' -]{2,60}?)\s*:?\s*$")
+
+@dataclass
+class Section:
+    heading: str
+    text: str
+
+@dataclass
+class SectionAlignment:
+    original_heading: str
+    ai_heading: Optional[str]
+    heading_similarity: float
+    lexical_similarity: float
+
+@dataclass
+class CategorySimilarity:
+    category: str
+    present_in_original: bool
+    present_in_ai: bool
+    lexical_similarity: float
+    semantic_similarity: Optional[float] = None
+
+@dataclass
+class SimilarityReport:
+    agreement_score: float
+    document_lexical_similarity: float
+    document_semantic_similarity: Optional[float]
+    categories: List[CategorySimilarity] = field(default_factory=list)
+    section_alignment: List[SectionAlignment] = field(default_factory=list)
+    embedding_model: Optional[str] = None
+
+def tokenize(text: str) -> List[str]:
+    return [token for token in TOKEN_PATTERN.findall(text.lower()) if token not in STOPWORDS and len(token) > 1]
+
+def split_sections(text: str) -> List[Section]:
+    """Split a document into sections at heading-like lines; text before the first heading is the preamble"""
+    sections: List[Section] = []
+    heading = "Preamble"
+    body: List[str] = []
+    for line in text.splitlines():
+        match = HEADING_PATTERN.match(line)
+        if match and len(match.group(1).split()) <= 8 and not line.rstrip().endswith("."):
+            if body:
+                sections.append(Section(heading, " ".join(body)))
+            heading, body = match.group(1).strip(), []
+        elif line.strip():
+            body.append(line.strip())
+    if body:
+        sections.append(Section(heading, " ".join(body)))
+    return sections
+
+def _heading_similarity(a: str, b: str) -> float:
+    return SequenceMatcher(None, a.lower(), b.lower()).ratio()
+
+def categorize_section(section: Section) -> Optional[str]:
+    """Assign a section to a category by its heading, falling back to the vocabulary of its body"""
+    heading_tokens = set(tokenize(section.heading))
+    best, best_score = None, 0.0
+    for category, keywords in CATEGORIES.items():
+        score = max(_heading_similarity(section.heading, category), len(heading_tokens & set(keywords)) / 2)
+        if score > best_score:
+            best, best_score = category, score
+    if best_score >= SECTION_ALIGNMENT_THRESHOLD:
+        return best
+
+    counts = Counter(tokenize(section.text))
+    scores = {category: sum(counts[keyword] for keyword in keywords) for category, keywords in CATEGORIES.items()}
+    category, hits = max(scores.items(), key=lambda item: item[1])
+    return category if hits > 0 else None
+
+class TfidfIndex:
+    """Sparse TF-IDF vectors over a small corpus, for cosine similarity without extra dependencies"""
+
+    def __init__(self, documents: Sequence[str]):
+        self.tokens = [tokenize(document) for document in documents]
+        document_frequency = Counter(token for tokens in self.tokens for token in set(tokens))
+        total = len(documents)
+        self.idf = {token: math.log((1 + total) / (1 + df)) + 1 for token, df in document_frequency.items()}
+        # Section texts are compared against many candidates during alignment
+        self._vectors: Dict[str, Dict[str, float]] = {}
+
+    def vector(self, text: str) -> Dict[str, float]:
+        cached = self._vectors.get(text)
+        if cached is not None:
+            return cached
+        counts = Counter(tokenize(text))
+        vector = {token: count * self.idf.get(token, 1.0) for token, count in counts.items()}
+        norm = math.sqrt(sum(value * value for value in vector.values()))
+        vector = {token: value / norm for token, value in vector.items()} if norm else {}
+        self._vectors[text] = vector
+        return vector
+
+    def similarity(self, a: str, b: str) -> float:
+        va, vb = self.vector(a), self.vector(b)
+        if len(va) > len(vb):
+            va, vb = vb, va
+        return sum(value * vb.get(token, 0.0) for token, value in va.items())
+
+@lru_cache(maxsize=1)
+def _get_embedding_model(name: str):
+    """Load the embedding model once per process, or None when it is unavailable"""
+    if not name or SentenceTransformer is None:
+        return None
+    try:
+        return SentenceTransformer(name, device="cpu")
+    except Exception as e:
+        logger.warning(f"Could not load embedding model {name}, using lexical similarity only: {str(e)}")
+        return None
+
+def _embedding_similarities(pairs: List[Tuple[str, str]]) -> Optional[List[float]]:
+    """Cosine similarity of each text pair using the configured embedding model"""
+    model = _get_embedding_model(SIMILARITY_EMBEDDING_MODEL)
+    if model is None or not pairs:
+        return None
+    texts = [text for pair in pairs for text in pair]
+    embeddings = model.encode(texts, normalize_embeddings=True, batch_size=32)
+    return [
+        max(float(sum(x * y for x, y in zip(embeddings[2 * i], embeddings[2 * i + 1]))), 0.0)
+        for i in range(len(pairs))
+    ]
+
+def align_sections(original: List[Section], ai: List[Section], index: TfidfIndex) -> List[SectionAlignment]:
+    """Match each original section to the AI section with the most similar heading and content"""
+    alignments = []
+    for section in original:
+        best, best_score = None, 0.0
+        for candidate in ai:
+            heading = _heading_similarity(section.heading, candidate.heading)
+            score = 0.6 * heading + 0.4 * index.similarity(section.text, candidate.text)
+            if score > best_score:
+                best, best_score = candidate, score
+        if best is not None and best_score >= SECTION_ALIGNMENT_THRESHOLD * 0.6:
+            alignments.append(SectionAlignment(
+                original_heading=section.heading,
+                ai_heading=best.heading,
+                heading_similarity=round(_heading_similarity(section.heading, best.heading), 3),
+                lexical_similarity=round(index.similarity(section.text, best.text), 3)
+            ))
+        else:
+            alignments.append(SectionAlignment(section.heading, None, 0.0, 0.0))
+    return alignments
+
+def _category_texts(sections: List[Section]) -> Dict[str, str]:
+    texts: Dict[str, List[str]] = {}
+    for section in sections:
+        category = categorize_section(section)
+        if category:
+            texts.setdefault(category, []).append(f"{section.heading} {section.text}")
+    return {category: " ".join(parts) for category, parts in texts.items()}
+
+def compare_documents(original_text: str, ai_text: str) -> SimilarityReport:
+    """
+    Score how closely an AI analysis agrees with the original human analysis.
+    The agreement score (0-100) blends the mean per-category similarity with the
+    whole-document similarity, using embeddings when configured and TF-IDF otherwise.
+    """
+    original_sections = split_sections(original_text)
+    ai_sections = split_sections(ai_text)
+    index = TfidfIndex([section.text for section in original_sections + ai_sections] or [original_text, ai_text])
+
+    original_categories = _category_texts(original_sections)
+    ai_categories = _category_texts(ai_sections)
+    present = [category for category in CATEGORIES if category in original_categories or category in ai_categories]
+
+    # One embedding batch for the document pair and every category present in both documents
+    shared = [category for category in present if category in original_categories and category in ai_categories]
+    semantic = _embedding_similarities(
+        [(original_text, ai_text)] + [(original_categories[c], ai_categories[c]) for c in shared]
+    )
+    semantic_by_category = dict(zip(shared, semantic[1:])) if semantic else {}
+
+    categories = []
+    for category in present:
+        in_original, in_ai = category in original_categories, category in ai_categories
+        categories.append(CategorySimilarity(
+            category=category,
+            present_in_original=in_original,
+            present_in_ai=in_ai,
+            lexical_similarity=round(
+                index.similarity(original_categories[category], ai_categories[category]) if in_original and in_ai else 0.0, 3
+            ),
+            semantic_similarity=round(semantic_by_category[category], 3) if category in semantic_by_category else None
+        ))
+
+    document_lexical = index.similarity(original_text, ai_text)
+    document_semantic = semantic[0] if semantic else None
+    document_score = document_semantic if document_semantic is not None else document_lexical
+    category_scores = [
+        c.semantic_similarity if c.semantic_similarity is not None else c.lexical_similarity for c in categories
+    ]
+    if category_scores:
+        agreement = SIMILARITY_CATEGORY_WEIGHT * sum(category_scores) / len(category_scores)
+        agreement += (1 - SIMILARITY_CATEGORY_WEIGHT) * document_score
+    else:
+        agreement = document_score
+
+    return SimilarityReport(
+        agreement_score=round(min(max(agreement, 0.0), 1.0) * 100, 1),
+        document_lexical_similarity=round(document_lexical, 3),
+        document_semantic_similarity=round(document_semantic, 3) if document_semantic is not None else None,
+        categories=categories,
+        section_alignment=align_sections(original_sections, ai_sections, index),
+        embedding_model=SIMILARITY_EMBEDDING_MODEL if semantic else None
+    )
@@ -0,0 +1,4 @@
+"""
+Benchmarks Package
+End-to-end load tests against a local mock OpenAI server, with synthetic inputs
+"""
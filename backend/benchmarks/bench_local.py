@@ -0,0 +1,89 @@
+"""
+Local Hot Path Benchmarks
+pytest-benchmark suite for the pure-local functions whose cost grows with input size:
+audio splitting, PDF text extraction, transcript validation and the upload read loop
+
+Run through the baseline runner (python -m benchmarks.micro) or directly with
+    pytest benchmarks/bench_local.py --benchmark-only
+"""
+
+import asyncio
+import io
+import os
+import shutil
+
+import pytest
+from starlette.datastructures import UploadFile
+
+import main
+from benchmarks.fixtures import make_pdf, make_transcript, write_wav
+from pdf_extraction import TEXT_CACHE
+
+requires_ffmpeg = pytest.mark.skipif(shutil.which("ffmpeg") is None, reason="ffmpeg is not installed")
+
+@pytest.fixture(scope="module", params=[10, 60, 120], ids=lambda minutes: f"{minutes}min")
+def audio_file(request, tmp_path_factory):
+    """16 kHz mono WAV: 10 minutes stays under the split threshold, 60 and 120 split into 5 and 10 chunks"""
+    path = tmp_path_factory.mktemp("audio") / "interview.wav"
+    write_wav(str(path), request.param * 60)
+    return str(path)
+
+def _remove_chunks(audio_path: str) -> None:
+    directory = os.path.dirname(audio_path)
+    for name in os.listdir(directory):
+        if "_chunk_" in name:
+            os.remove(os.path.join(directory, name))
+
+@requires_ffmpeg
+@pytest.mark.benchmark(group="split_audio_file")
+def test_split_audio_file(benchmark, audio_file):
+    chunks = benchmark.pedantic(
+        main.split_audio_file, args=(audio_file,), setup=lambda: _remove_chunks(audio_file), rounds=3, iterations=1
+    )
+    assert chunks
+
+@pytest.fixture(scope="module", params=[5, 50, 500], ids=lambda pages: f"{pages}pages")
+def pdf_content(request):
+    return make_pdf([
+        [f"Page {page} line {line}: the candidate  described   trade-offs in caching and indexing." for line in range(50)]
+        for page in range(request.param)
+    ])
+
+@pytest.mark.benchmark(group="extract_text_from_pdf")
+def test_extract_text_from_pdf(benchmark, pdf_content):
+    # Every round parses the document; the text cache would otherwise answer from memory
+    text = benchmark.pedantic(
+        main.extract_text_from_pdf, args=(pdf_content,), setup=TEXT_CACHE.clear, rounds=5, iterations=1
+    )
+    assert "trade-offs" in text
+
+@pytest.mark.benchmark(group="extract_text_from_pdf")
+def test_extract_text_from_pdf_cached(benchmark, pdf_content):
+    main.extract_text_from_pdf(pdf_content)
+    assert benchmark(main.extract_text_from_pdf, pdf_content)
+
+@pytest.fixture(scope="module", params=[30, 120, 480], ids=lambda minutes: f"{minutes}min")
+def transcript(request):
+    return make_transcript(request.param)
+
+@pytest.mark.benchmark(group="validate_transcript_quality")
+def test_validate_transcript_quality(benchmark, transcript):
+    is_valid, _ = benchmark(main.validate_transcript_quality, transcript)
+    assert is_valid
+
+@pytest.fixture(scope="module", params=[10, 50, 100], ids=lambda megabytes: f"{megabytes}MB")
+def upload_bytes(request):
+    return os.urandom(request.param * 1024 * 1024)
+
+@pytest.mark.benchmark(group="save_upload")
+def test_save_upload(benchmark, upload_bytes, tmp_path):
+    upload = UploadFile(file=io.BytesIO(upload_bytes), filename="interview.mp3")
+    destination = str(tmp_path / "interview.mp3")
+
+    def rewind():
+        upload.file.seek(0)
+
+    size, _ = benchmark.pedantic(
+        lambda: asyncio.run(main.save_upload(upload, destination)), setup=rewind, rounds=5, iterations=1
+    )
+    assert size == len(upload_bytes)
@@ -0,0 +1,348 @@
+"""
+End-to-End Benchmark Module
+Drives the analysis endpoints at a fixed concurrency against a local mock OpenAI server and
+reports throughput, latency percentiles and the API process memory high-water mark
+
+Run from the backend directory, e.g.:
+    python -m benchmarks.e2e --concurrency 8 --requests 40 --chat-latency 0.8,0.4
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import socket
+import subprocess
+import sys
+import time
+from dataclasses import asdict, dataclass, field
+from typing import Callable, Dict, List, Optional
+
+import httpx
+import psutil
+
+from benchmarks.fixtures import make_analysis_pdf, make_transcript, make_wav
+from benchmarks.mock_openai import MockSettings, add_latency_arguments, settings_from_arguments, start_mock_server
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SKILLS = "Communication, Technical Knowledge, Problem Solving, Collaboration, Leadership"
+MEMORY_SAMPLE_SECONDS = 0.1
+
+# Provider limits are meaningless against the mock and would make the benchmark measure the limiter.
+# Every request of a scenario sends the same inputs, so request coalescing and the PDF text cache
+# are off too; otherwise concurrent requests would join one pipeline and the numbers would measure
+# cache hits. Pass --app-env to measure them deliberately.
+DEFAULT_APP_ENV = {
+    "OPENAI_REQUESTS_PER_MINUTE": "1000000",
+    "OPENAI_TOKENS_PER_MINUTE": "1000000000",
+    "OPENAI_AUDIO_REQUESTS_PER_MINUTE": "1000000",
+    "SINGLE_FLIGHT_ENABLED": "false",
+    "PDF_CACHE_MAX_ENTRIES": "0",
+    "PDF_CACHE_DIR": "",
+}
+
+@dataclass
+class ScenarioResult:
+    scenario: str
+    requests: int
+    errors: int
+    wall_seconds: float
+    throughput_rps: float
+    p50_seconds: Optional[float]
+    p95_seconds: Optional[float]
+    p99_seconds: Optional[float]
+    max_seconds: Optional[float]
+    peak_rss_mb: Optional[float]
+    status_codes: Dict[str, int] = field(default_factory=dict)
+
+def percentile(values: List[float], fraction: float) -> Optional[float]:
+    """Nearest-rank percentile"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[max(0, min(len(ordered) - 1, int(round(fraction * len(ordered) + 0.5)) - 1))]
+
+def build_scenarios(args: argparse.Namespace) -> Dict[str, Callable[[], dict]]:
+    """Request builders per scenario; inputs are generated once and shared by every request"""
+    transcript = make_transcript(args.transcript_minutes).encode("utf-8")
+    audio = make_wav(args.audio_seconds) if "analyze-interview" in args.scenarios else b""
+    original_pdf = make_analysis_pdf(args.pdf_pages, "Hiring Manager", seed=11)
+    ai_pdf = make_analysis_pdf(args.pdf_pages, "AI Analyst", seed=12)
+    return {
+        "analyze-transcript": lambda: {
+            "url": "/analyze-transcript",
+            "files": {"file": ("transcript.txt", transcript, "text/plain")},
+            "data": {"skills_to_assess": SKILLS, "analysis_mode": args.analysis_mode},
+        },
+        "analyze-interview": lambda: {
+            "url": "/analyze-interview",
+            "files": {"file": ("interview.wav", audio, "audio/wav")},
+            "data": {"skills_to_assess": SKILLS, "analysis_mode": args.analysis_mode},
+        },
+        "compare-analyses": lambda: {
+            "url": "/compare-analyses",
+            "files": {
+                "original_analysis": ("original.pdf", original_pdf, "application/pdf"),
+                "ai_analysis": ("ai.pdf", ai_pdf, "application/pdf"),
+            },
+        },
+    }
+
+class MemorySampler:
+    """Peak resident memory of a process and its children (e.g. the PDF extraction pool)"""
+
+    def __init__(self, pid: Optional[int]):
+        self.process = psutil.Process(pid) if pid else None
+        self.peak_bytes = 0
+        self._task: Optional[asyncio.Task] = None
+
+    def _rss(self) -> int:
+        total = 0
+        for process in [self.process] + self.process.children(recursive=True):
+            try:
+                total += process.memory_info().rss
+            except psutil.Error:
+                pass
+        return total
+
+    async def _run(self) -> None:
+        while True:
+            self.peak_bytes = max(self.peak_bytes, self._rss())
+            await asyncio.sleep(MEMORY_SAMPLE_SECONDS)
+
+    def start(self) -> None:
+        if self.process is not None:
+            self.peak_bytes = 0
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> Optional[float]:
+        if self._task is None:
+            return None
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+        return round(max(self.peak_bytes, self._rss()) / (1024 * 1024), 1)
+
+def vm_hwm_mb(pid: int) -> Optional[float]:
+    """Kernel-tracked peak RSS of the process over its lifetime (Linux only)"""
+    try:
+        with open(f"/proc/{pid}/status", "r", encoding="ascii") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return round(int(line.split()[1]) / 1024, 1)
+    except OSError:
+        pass
+    return None
+
+async def run_scenario(
+    client: httpx.AsyncClient,
+    name: str,
+    build_request: Callable[[], dict],
+    total: int,
+    concurrency: int,
+    sampler: MemorySampler
+) -> ScenarioResult:
+    latencies: List[float] = []
+    status_codes: Dict[str, int] = {}
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one() -> None:
+        async with semaphore:
+            started = time.perf_counter()
+            try:
+                response = await client.post(**build_request())
+                status = str(response.status_code)
+            except httpx.HTTPError as e:
+                status = type(e).__name__
+            elapsed = time.perf_counter() - started
+            status_codes[status] = status_codes.get(status, 0) + 1
+            if status == "200":
+                latencies.append(elapsed)
+
+    sampler.start()
+    started = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(total)))
+    wall = time.perf_counter() - started
+    peak = await sampler.stop()
+
+    def rounded(value: Optional[float]) -> Optional[float]:
+        return round(value, 3) if value is not None else None
+
+    return ScenarioResult(
+        scenario=name,
+        requests=total,
+        errors=total - len(latencies),
+        wall_seconds=round(wall, 3),
+        throughput_rps=round(len(latencies) / wall, 3) if wall else 0.0,
+        p50_seconds=rounded(percentile(latencies, 0.50)),
+        p95_seconds=rounded(percentile(latencies, 0.95)),
+        p99_seconds=rounded(percentile(latencies, 0.99)),
+        max_seconds=rounded(max(latencies) if latencies else None),
+        peak_rss_mb=peak,
+        status_codes=status_codes,
+    )
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+def api_environment(args: argparse.Namespace, mock_port: int) -> Dict[str, str]:
+    """
+    Environment of the API process: pointed at the mock, at the real providers (e.g. to record a
+    cassette with --app-env LLM_CASSETTE_MODE=record), or replaying a cassette offline
+    """
+    env = dict(os.environ)
+    env.update(DEFAULT_APP_ENV)
+    if args.replay:
+        env.update({
+            "LLM_CASSETTE_MODE": "replay",
+            "LLM_CASSETTE_PATH": os.path.abspath(args.replay),
+            "LLM_CASSETTE_LATENCY_SCALE": str(args.replay_latency_scale),
+        })
+        # Keys only need to be present; replayed calls never reach the providers
+        env.setdefault("OPENAI_API_KEY", "replay")
+        env.setdefault("GEMINI_API_KEY", "replay")
+    elif args.upstream == "mock":
+        env.update({"OPENAI_API_KEY": "mock", "OPENAI_BASE_URL": f"http://127.0.0.1:{mock_port}/v1"})
+    env.update(dict(item.split("=", 1) for item in args.app_env))
+    return env
+
+def start_api(env: Dict[str, str], log_path: str) -> tuple[subprocess.Popen, str]:
+    """Run the API under uvicorn in a child process"""
+    port = _free_port()
+    with open(log_path, "w") as log:
+        process = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1", "--port", str(port),
+             "--log-level", "warning", "--no-access-log"],
+            cwd=BACKEND_DIR, env=env, stdout=log, stderr=subprocess.STDOUT
+        )
+    return process, f"http://127.0.0.1:{port}"
+
+async def wait_until_healthy(client: httpx.AsyncClient, process: Optional[subprocess.Popen], timeout: float = 60) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process is not None and process.poll() is not None:
+            raise RuntimeError(f"API process exited with code {process.returncode}")
+        try:
+            if (await client.get("/health")).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        await asyncio.sleep(0.25)
+    raise RuntimeError("API did not become healthy in time")
+
+def print_report(results: List[ScenarioResult]) -> None:
+    header = f"{'scenario':<20}{'ok/total':>10}{'rps':>9}{'p50 s':>9}{'p95 s':>9}{'p99 s':>9}{'max s':>9}{'peak MB':>10}"
+    print(header)
+    print("-" * len(header))
+
+    def cell(value, width):
+        return f"{'-' if value is None else value:>{width}}"
+
+    for result in results:
+        print(
+            f"{result.scenario:<20}{f'{result.requests - result.errors}/{result.requests}':>10}"
+            f"{cell(result.throughput_rps, 9)}{cell(result.p50_seconds, 9)}{cell(result.p95_seconds, 9)}"
+            f"{cell(result.p99_seconds, 9)}{cell(result.max_seconds, 9)}{cell(result.peak_rss_mb, 10)}"
+        )
+        if result.errors:
+            print(f"  status codes: {result.status_codes}")
+
+async def run(args: argparse.Namespace) -> dict:
+    settings: MockSettings = settings_from_arguments(args)
+    settings.transcript_minutes = args.transcript_minutes
+    mock_runner, mock_port = await start_mock_server(settings, port=args.mock_port)
+    print(f"Mock OpenAI server at http://127.0.0.1:{mock_port}/v1")
+    process = None
+    try:
+        if args.target:
+            base_url, pid = args.target, args.target_pid
+        else:
+            process, base_url = start_api(api_environment(args, mock_port), args.server_log)
+            pid = process.pid
+
+        limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+        async with httpx.AsyncClient(base_url=base_url, timeout=args.timeout, limits=limits) as client:
+            await wait_until_healthy(client, process)
+            builders = build_scenarios(args)
+            sampler = MemorySampler(pid)
+            results = []
+            for name in args.scenarios:
+                for _ in range(args.warmup):
+                    await client.post(**builders[name]())
+                print(f"Running {name}: {args.requests} requests at concurrency {args.concurrency}...")
+                results.append(await run_scenario(client, name, builders[name], args.requests, args.concurrency, sampler))
+
+        report = {
+            "config": {
+                "concurrency": args.concurrency,
+                "requests": args.requests,
+                "chat_latency": asdict(args.chat_latency),
+                "transcription_latency": asdict(args.transcription_latency),
+                "transcript_minutes": args.transcript_minutes,
+                "audio_seconds": args.audio_seconds,
+                "pdf_pages": args.pdf_pages,
+                "analysis_mode": args.analysis_mode,
+                "upstream": f"replay:{args.replay}" if args.replay else args.upstream,
+            },
+            "results": [asdict(result) for result in results],
+            "api_vm_hwm_mb": vm_hwm_mb(pid) if pid else None,
+        }
+        print_report(results)
+        if report["api_vm_hwm_mb"] is not None:
+            print(f"API process memory high-water mark (VmHWM): {report['api_vm_hwm_mb']} MB")
+        return report
+    finally:
+        if process is not None:
+            process.terminate()
+            try:
+                process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                process.kill()
+        await mock_runner.cleanup()
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="End-to-end benchmark of the analysis API against a mock OpenAI server")
+    parser.add_argument("--scenarios", type=lambda value: [s.strip() for s in value.split(",") if s.strip()],
+                        default=["analyze-transcript", "analyze-interview", "compare-analyses"],
+                        help="Comma-separated: analyze-transcript, analyze-interview, compare-analyses")
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--requests", type=int, default=20, help="Measured requests per scenario")
+    parser.add_argument("--warmup", type=int, default=1, help="Unmeasured requests per scenario")
+    parser.add_argument("--timeout", type=float, default=600, help="Per-request timeout in seconds")
+    parser.add_argument("--transcript-minutes", type=float, default=30)
+    parser.add_argument("--audio-seconds", type=float, default=60)
+    parser.add_argument("--pdf-pages", type=int, default=3)
+    parser.add_argument("--analysis-mode", choices=["parallel", "fused"], default="parallel")
+    parser.add_argument("--app-env", action="append", default=[], metavar="KEY=VALUE",
+                        help="Extra environment for the API process; repeatable")
+    parser.add_argument("--upstream", choices=["mock", "real"], default="mock",
+                        help="Providers the API calls: the local mock, or the real APIs from the environment")
+    parser.add_argument("--replay", metavar="CASSETTE", help="Replay recorded provider exchanges from this cassette offline")
+    parser.add_argument("--replay-latency-scale", type=float, default=1.0,
+                        help="Replay latency relative to the recording; 0 replays instantly")
+    parser.add_argument("--server-log", default="benchmark-server.log", help="Where the API process output goes")
+    parser.add_argument("--mock-port", type=int, default=0, help="Mock server port; 0 picks a free one")
+    parser.add_argument("--target", help="Benchmark an already running API at this URL instead of starting one; "
+                                         "start it with OPENAI_BASE_URL pointing at the mock (--mock-port)")
+    parser.add_argument("--target-pid", type=int, help="PID of the --target API, for memory sampling")
+    parser.add_argument("--output", help="Write the report as JSON to this file")
+    add_latency_arguments(parser)
+    args = parser.parse_args()
+
+    unknown = set(args.scenarios) - {"analyze-transcript", "analyze-interview", "compare-analyses"}
+    if unknown:
+        parser.error(f"Unknown scenarios: {', '.join(sorted(unknown))}")
+
+    report = asyncio.run(run(args))
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"Report written to {args.output}")
+
+if __name__ == "__main__":
+    main()
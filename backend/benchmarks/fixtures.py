@@ -0,0 +1,115 @@
+"""
+Benchmark Fixtures Module
+Deterministic synthetic inputs: interview transcripts, PCM WAV audio and text PDFs
+"""
+
+import io
+import math
+import random
+import struct
+import wave
+from typing import List
+
+TOPICS = [
+    "distributed caching", "database indexing", "API versioning", "incident response",
+    "code review practices", "load balancing", "message queues", "unit testing",
+    "team leadership", "performance profiling", "schema migrations", "observability",
+]
+
+def make_transcript(minutes: float = 30, words_per_minute: int = 150, seed: int = 7) -> str:
+    """An interview transcript of alternating labelled turns with [mm:ss] timestamps"""
+    rng = random.Random(seed)
+    target_words = int(minutes * words_per_minute)
+    lines = []
+    words = 0
+    turn = 0
+    while words < target_words:
+        seconds = int(words / words_per_minute * 60)
+        timestamp = f"[{seconds // 60:02d}:{seconds % 60:02d}]"
+        topic = rng.choice(TOPICS)
+        if turn % 2 == 0:
+            text = f"Can you tell me about a time you worked on {topic}? What trade-offs did you consider?"
+        else:
+            sentences = [
+                f"In my last role I owned {topic} for a service handling {rng.randint(2, 90)} thousand requests per second.",
+                f"We measured the baseline first, then changed one thing at a time and compared {rng.choice(TOPICS)} metrics.",
+                "The main trade-off was latency against consistency, and we documented the decision for the team.",
+                f"I would approach it differently now by investing earlier in {rng.choice(TOPICS)}.",
+            ]
+            text = " ".join(rng.sample(sentences, rng.randint(2, 4)))
+        speaker = "Interviewer" if turn % 2 == 0 else "Candidate"
+        lines.append(f"{timestamp} {speaker}: {text}")
+        words += len(text.split())
+        turn += 1
+    return "\n".join(lines)
+
+def write_wav(output, seconds: float, sample_rate: int = 16000) -> None:
+    """Mono 16-bit PCM of a quiet tone, about 1.9 MB per minute at 16 kHz, to a path or file object"""
+    frames = int(seconds * sample_rate)
+    # One second of samples, written repeatedly, keeps hour-long files fast and out of memory
+    period = struct.pack(
+        f"<{sample_rate}h",
+        *(int(3000 * math.sin(2 * math.pi * 220 * i / sample_rate)) for i in range(sample_rate))
+    )
+    with wave.open(output, "wb") as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(sample_rate)
+        whole, remainder = divmod(frames, sample_rate)
+        for _ in range(whole):
+            wav.writeframes(period)
+        wav.writeframes(period[:remainder * 2])
+
+def make_wav(seconds: float, sample_rate: int = 16000) -> bytes:
+    buffer = io.BytesIO()
+    write_wav(buffer, seconds, sample_rate)
+    return buffer.getvalue()
+
+def _escape_pdf_text(text: str) -> str:
+    return text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+def make_pdf(page_lines: List[List[str]]) -> bytes:
+    """A minimal PDF with one Helvetica text page per list of lines"""
+    pages = len(page_lines)
+    font_id = 3 + 2 * pages
+    objects = [
+        "<< /Type /Catalog /Pages 2 0 R >>",
+        f"<< /Type /Pages /Kids [{' '.join(f'{3 + 2 * i} 0 R' for i in range(pages))}] /Count {pages} >>",
+    ]
+    for i, lines in enumerate(page_lines):
+        shown = "".join(f"({_escape_pdf_text(line)}) Tj T* " for line in lines)
+        stream = f"BT /F1 10 Tf 12 TL 40 780 Td {shown}ET"
+        objects.append(
+            f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] /Contents {4 + 2 * i} 0 R "
+            f"/Resources << /Font << /F1 {font_id} 0 R >> >> >>"
+        )
+        objects.append(f"<< /Length {len(stream)} >>\nstream\n{stream}\nendstream")
+    objects.append("<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>")
+
+    output = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, 1):
+        offsets.append(len(output))
+        output += f"{number} 0 obj\n{body}\nendobj\n".encode("latin-1")
+    xref = len(output)
+    output += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode("latin-1")
+    output += "".join(f"{offset:010d} 00000 n \n" for offset in offsets).encode("latin-1")
+    output += f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF".encode("latin-1")
+    return bytes(output)
+
+def make_analysis_pdf(pages: int = 3, author: str = "Reviewer", seed: int = 11) -> bytes:
+    """An interview analysis report with the section headings the comparison expects"""
+    rng = random.Random(seed)
+    sections = ["Summary", "Technical Skills", "Communication", "Strengths", "Areas for Improvement", "Recommendation"]
+    page_lines = []
+    for page in range(pages):
+        lines = [f"Interview Analysis by {author} - page {page + 1}"]
+        for heading in sections:
+            lines.append(f"{heading}:")
+            for _ in range(5):
+                lines.append(
+                    f"The candidate showed {rng.choice(['solid', 'limited', 'strong', 'uneven'])} "
+                    f"experience with {rng.choice(TOPICS)} and explained trade-offs clearly."
+                )
+        page_lines.append(lines[:60])
+    return make_pdf(page_lines)
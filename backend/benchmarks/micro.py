@@ -0,0 +1,47 @@
+"""
+Micro-Benchmark Runner
+Runs the local hot path benchmarks and compares them with the stored baseline, failing when a
+median regresses by more than the threshold
+
+Run from the backend directory:
+    python -m benchmarks.micro            # compare with the latest baseline
+    python -m benchmarks.micro --save     # record a new baseline
+    python -m benchmarks.micro -- -k pdf  # extra pytest arguments after --
+"""
+
+import argparse
+import os
+import sys
+
+import pytest
+
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+# Baselines are stored per machine (OS, interpreter and architecture), as pytest-benchmark names them
+BASELINE_DIR = os.path.join(BENCHMARKS_DIR, "baselines")
+BENCHMARK_REGRESSION_THRESHOLD = int(os.getenv("BENCHMARK_REGRESSION_THRESHOLD", "25"))
+
+def pytest_arguments(save: bool, threshold: int) -> list:
+    arguments = [
+        os.path.join(BENCHMARKS_DIR, "bench_local.py"),
+        "--benchmark-only",
+        f"--benchmark-storage=file://{BASELINE_DIR}",
+        "--benchmark-columns=min,median,max,rounds",
+        "--benchmark-sort=name",
+    ]
+    if save:
+        arguments.append("--benchmark-save=baseline")
+    else:
+        arguments += ["--benchmark-compare", f"--benchmark-compare-fail=median:{threshold}%"]
+    return arguments
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Local hot path benchmarks with a stored baseline")
+    parser.add_argument("--save", action="store_true", help="Record the results as the new baseline")
+    parser.add_argument("--threshold", type=int, default=BENCHMARK_REGRESSION_THRESHOLD,
+                        help="Allowed median regression in percent before the run fails")
+    args, extra = parser.parse_known_args()
+    extra = [argument for argument in extra if argument != "--"]
+    sys.exit(pytest.main(pytest_arguments(args.save, args.threshold) + extra))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,226 @@
+"""
+Mock OpenAI Module
+Local OpenAI-compatible server for benchmarks: chat completions (plain and streamed) with
+schema-conforming structured outputs, audio transcriptions, and configurable latencies
+
+Run standalone with: python -m benchmarks.mock_openai --port 8100
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import random
+import re
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Optional
+
+from aiohttp import web
+
+from benchmarks.fixtures import make_transcript
+
+# Prompt size estimate used for the reported usage
+CHARS_PER_TOKEN = 4
+STREAM_CHUNK_CHARS = 48
+REQUESTED_SKILLS = re.compile(r"following skills based on the interview transcript: ([^\n]+)")
+
+@dataclass
+class LatencyProfile:
+    """Lognormal latency around a median; sigma 0 makes it constant"""
+    median: float
+    sigma: float = 0.0
+
+    @classmethod
+    def parse(cls, value: str) -> "LatencyProfile":
+        """'median' or 'median,sigma' in seconds"""
+        parts = [float(part) for part in value.split(",")]
+        return cls(*parts[:2])
+
+    def sample(self, rng: random.Random) -> float:
+        if self.median <= 0:
+            return 0.0
+        return self.median * math.exp(rng.gauss(0, self.sigma)) if self.sigma else self.median
+
+@dataclass
+class MockSettings:
+    chat_latency: LatencyProfile
+    transcription_latency: LatencyProfile
+    # Share of chat latency spent before the first streamed token
+    time_to_first_token: float = 0.3
+    # Share of skill assessments returned below the cascade confidence threshold
+    low_confidence_rate: float = 0.2
+    transcript_minutes: float = 20
+    seed: int = 1234
+
+def _sample_value(schema: Dict[str, Any], name: str, rng: random.Random) -> Any:
+    """A value conforming to a strict JSON schema (inlined refs, as the schema registry emits)"""
+    if "anyOf" in schema:
+        options = [option for option in schema["anyOf"] if option.get("type") != "null"]
+        return _sample_value(options[0], name, rng) if options else None
+    if "enum" in schema:
+        return rng.choice(schema["enum"])
+    kind = schema.get("type")
+    if isinstance(kind, list):
+        kind = next((k for k in kind if k != "null"), "string")
+    if kind == "object":
+        return {key: _sample_value(value, key, rng) for key, value in schema.get("properties", {}).items()}
+    if kind == "array":
+        count = max(schema.get("minItems", 0), rng.randint(2, 4))
+        return [_sample_value(schema.get("items", {}), name, rng) for _ in range(count)]
+    if kind in ("number", "integer"):
+        low, high = schema.get("minimum", 0), schema.get("maximum", 100)
+        value = low + (high - low) * rng.uniform(0.65, 0.95)
+        return int(value) if kind == "integer" else round(value, 1)
+    if kind == "boolean":
+        return rng.random() < 0.5
+    return f"Sample {name.replace('_', ' ')} observed in the interview"
+
+def _skill_assessments(schema: Dict[str, Any], prompt: str, settings: MockSettings, rng: random.Random) -> Dict[str, Any]:
+    """One assessment per requested skill, some below the cascade threshold so escalation is exercised"""
+    match = REQUESTED_SKILLS.search(prompt)
+    skills = [skill.strip() for skill in match.group(1).split(",")] if match else []
+    item_schema = schema["properties"]["assessments"]["items"]
+    assessments = []
+    for skill in skills:
+        item = _sample_value(item_schema, "assessment", rng)
+        item["skill"] = skill
+        if rng.random() < settings.low_confidence_rate:
+            item["confidence_score"] = round(rng.uniform(30, 55), 1)
+        assessments.append(item)
+    return {"assessments": assessments}
+
+# Canned builders for schemas whose content the pipeline inspects; the rest are sampled from the schema
+CANNED_OUTPUTS: Dict[str, Callable[[Dict[str, Any], str, MockSettings, random.Random], Any]] = {
+    "skill_assessment": _skill_assessments,
+}
+
+class MockOpenAIServer:
+    """aiohttp application serving the OpenAI endpoints the pipeline calls"""
+
+    def __init__(self, settings: MockSettings):
+        self.settings = settings
+        self.rng = random.Random(settings.seed)
+        self.transcript = make_transcript(settings.transcript_minutes, seed=settings.seed)
+        self.calls: Dict[str, int] = {}
+        self.app = web.Application(client_max_size=512 * 1024 * 1024)
+        self.app.router.add_post("/v1/chat/completions", self.chat_completions)
+        self.app.router.add_post("/v1/audio/transcriptions", self.transcriptions)
+
+    def _count(self, endpoint: str) -> None:
+        self.calls[endpoint] = self.calls.get(endpoint, 0) + 1
+
+    def _content(self, body: Dict[str, Any]) -> str:
+        prompt = "\n".join(str(message.get("content", "")) for message in body.get("messages", []))
+        response_format = body.get("response_format") or {}
+        if response_format.get("type") != "json_schema":
+            # Formatting and free-text stages: echo a slice of the prompt as the "formatted" text
+            return prompt[-4000:]
+        name = response_format["json_schema"]["name"]
+        schema = response_format["json_schema"]["schema"]
+        builder = CANNED_OUTPUTS.get(name)
+        payload = builder(schema, prompt, self.settings, self.rng) if builder else _sample_value(schema, name, self.rng)
+        return json.dumps(payload)
+
+    def _usage(self, body: Dict[str, Any], content: str) -> Dict[str, Any]:
+        prompt_tokens = sum(len(str(message.get("content", ""))) for message in body.get("messages", [])) // CHARS_PER_TOKEN
+        completion_tokens = len(content) // CHARS_PER_TOKEN
+        return {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens,
+            "prompt_tokens_details": {"cached_tokens": 0},
+        }
+
+    async def chat_completions(self, request: web.Request) -> web.StreamResponse:
+        body = await request.json()
+        self._count("chat")
+        latency = self.settings.chat_latency.sample(self.rng)
+        content = self._content(body)
+        model = body.get("model", "mock")
+        created = int(time.time())
+
+        if not body.get("stream"):
+            await asyncio.sleep(latency)
+            return web.json_response({
+                "id": "chatcmpl-mock",
+                "object": "chat.completion",
+                "created": created,
+                "model": model,
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+                "usage": self._usage(body, content),
+            })
+
+        response = web.StreamResponse(headers={"Content-Type": "text/event-stream", "Cache-Control": "no-cache"})
+        await response.prepare(request)
+
+        async def send(chunk: Dict[str, Any]) -> None:
+            await response.write(f"data: {json.dumps(chunk)}\n\n".encode("utf-8"))
+
+        def chunk(delta: Dict[str, Any], finish_reason: Optional[str] = None) -> Dict[str, Any]:
+            return {
+                "id": "chatcmpl-mock", "object": "chat.completion.chunk", "created": created, "model": model,
+                "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+            }
+
+        pieces = [content[i:i + STREAM_CHUNK_CHARS] for i in range(0, len(content), STREAM_CHUNK_CHARS)] or [""]
+        await asyncio.sleep(latency * self.settings.time_to_first_token)
+        await send(chunk({"role": "assistant", "content": ""}))
+        delay = latency * (1 - self.settings.time_to_first_token) / len(pieces)
+        for piece in pieces:
+            await send(chunk({"content": piece}))
+            await asyncio.sleep(delay)
+        await send(chunk({}, "stop"))
+        if (body.get("stream_options") or {}).get("include_usage"):
+            await send({
+                "id": "chatcmpl-mock", "object": "chat.completion.chunk", "created": created, "model": model,
+                "choices": [], "usage": self._usage(body, content),
+            })
+        await response.write(b"data: [DONE]\n\n")
+        await response.write_eof()
+        return response
+
+    async def transcriptions(self, request: web.Request) -> web.Response:
+        # Read the whole upload, as the real API does, before "transcribing"
+        form = await request.post()
+        self._count("transcriptions")
+        await asyncio.sleep(self.settings.transcription_latency.sample(self.rng))
+        if form.get("response_format", "json") == "text":
+            return web.Response(text=self.transcript, content_type="text/plain")
+        return web.json_response({"text": self.transcript})
+
+async def start_mock_server(settings: MockSettings, host: str = "127.0.0.1", port: int = 0) -> tuple[web.AppRunner, int]:
+    """Start the server on the running loop; port 0 picks a free port, which is returned"""
+    server = MockOpenAIServer(settings)
+    runner = web.AppRunner(server.app, access_log=None)
+    await runner.setup()
+    await web.TCPSite(runner, host, port).start()
+    return runner, runner.addresses[0][1]
+
+def add_latency_arguments(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument("--chat-latency", type=LatencyProfile.parse, default=LatencyProfile(0.8, 0.4),
+                        help="Chat completion latency as 'median[,sigma]' seconds (lognormal)")
+    parser.add_argument("--transcription-latency", type=LatencyProfile.parse, default=LatencyProfile(2.0, 0.3),
+                        help="Transcription latency as 'median[,sigma]' seconds (lognormal)")
+    parser.add_argument("--low-confidence-rate", type=float, default=0.2,
+                        help="Share of skill assessments below the cascade threshold")
+    parser.add_argument("--seed", type=int, default=1234)
+
+def settings_from_arguments(args: argparse.Namespace) -> MockSettings:
+    return MockSettings(
+        chat_latency=args.chat_latency,
+        transcription_latency=args.transcription_latency,
+        low_confidence_rate=args.low_confidence_rate,
+        seed=args.seed,
+    )
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Local OpenAI-compatible mock server for benchmarks")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8100)
+    add_latency_arguments(parser)
+    args = parser.parse_args()
+    web.run_app(MockOpenAIServer(settings_from_arguments(args)).app, host=args.host, port=args.port, access_log=None)
+
+if __name__ == "__main__":
+    main()
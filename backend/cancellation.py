@@ -0,0 +1,244 @@
+"""
+Cancellation Module
+Cooperative cancellation of request pipelines: a client disconnect or an expired deadline stops
+LLM calls, Whisper uploads, ffmpeg and downloads at their next checkpoint
+"""
+
+import asyncio
+import contextvars
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, List, Optional
+
+from fastapi import HTTPException
+
+from metrics import CANCELLED_REQUESTS
+
+# Setup logging
+logger = logging.getLogger("cancellation")
+
+CANCELLATION_ENABLED = os.getenv("CANCELLATION_ENABLED", "true").lower() == "true"
+# Longest a request may run before its work is cancelled and it gets 504; 0 disables. Clients
+# and proxies can ask for a shorter deadline with X-Request-Timeout (seconds).
+REQUEST_DEADLINE_SECONDS = float(os.getenv("REQUEST_DEADLINE_SECONDS", "900"))
+
+# Status for a request whose client went away; nobody reads it, but metrics and logs do
+CLIENT_CLOSED_REQUEST = 499
+
+class RequestCancelled(HTTPException):
+    """Raised at a checkpoint once the work's token is cancelled"""
+
+    def __init__(self, reason: str):
+        self.reason = reason
+        super().__init__(
+            status_code=504 if reason == "deadline" else CLIENT_CLOSED_REQUEST,
+            detail="Request deadline exceeded" if reason == "deadline" else f"Request cancelled: {reason}"
+        )
+
+class CancelToken:
+    """
+    Set once when the work it guards should stop. Worker threads check it at their checkpoints;
+    callbacks registered with on_cancel (killing a child process, closing a stream) run at once.
+    """
+
+    def __init__(self, deadline: Optional[float] = None):
+        # time.monotonic() after which the work is cancelled, if any
+        self.deadline = deadline
+        self.reason: Optional[str] = None
+        self._event = threading.Event()
+        self._callbacks: List[Callable[[], None]] = []
+        self._lock = threading.Lock()
+
+    @property
+    def cancelled(self) -> bool:
+        if not self._event.is_set() and self.deadline is not None and time.monotonic() >= self.deadline:
+            self.cancel("deadline")
+        return self._event.is_set()
+
+    def remaining(self) -> Optional[float]:
+        """Seconds left before the deadline, or None without one"""
+        return None if self.deadline is None else max(self.deadline - time.monotonic(), 0.0)
+
+    def child(self, deadline: Optional[float] = None) -> "CancelToken":
+        """Token for part of the work: cancelled with this one, or on its own at an earlier deadline"""
+        deadlines = [d for d in (self.deadline, deadline) if d is not None]
+        token = CancelToken(min(deadlines) if deadlines else None)
+        self.on_cancel(lambda: token.cancel(self.reason))
+        return token
+
+    def cancel(self, reason: str) -> None:
+        with self._lock:
+            if self._event.is_set():
+                return
+            self.reason = reason
+            self._event.set()
+            callbacks, self._callbacks = self._callbacks, []
+        for callback in callbacks:
+            try:
+                callback()
+            except Exception as e:
+                logger.warning(f"Cancel callback failed: {e}")
+
+    def on_cancel(self, callback: Callable[[], None]) -> Callable[[], None]:
+        """Run callback when the token is cancelled (at once if it already is); returns a remover"""
+        with self._lock:
+            if not self._event.is_set():
+                self._callbacks.append(callback)
+                return lambda: self._remove(callback)
+        callback()
+        return lambda: None
+
+    def _remove(self, callback: Callable[[], None]) -> None:
+        with self._lock:
+            if callback in self._callbacks:
+                self._callbacks.remove(callback)
+
+    def raise_if_cancelled(self) -> None:
+        if self.cancelled:
+            raise RequestCancelled(self.reason)
+
+    def sleep(self, seconds: float) -> None:
+        """time.sleep that wakes up and raises as soon as the token is cancelled"""
+        remaining = self.remaining()
+        self._event.wait(seconds if remaining is None else min(seconds, remaining))
+        self.raise_if_cancelled()
+
+_current_token: contextvars.ContextVar[Optional[CancelToken]] = contextvars.ContextVar("cancel_token", default=None)
+
+def current_token() -> Optional[CancelToken]:
+    return _current_token.get()
+
+def bind_token(token: CancelToken) -> None:
+    """Make token the current one for this context (a task, or a thread via in_current_context)"""
+    _current_token.set(token)
+
+def check_cancelled() -> None:
+    """Checkpoint: raise RequestCancelled if the current work has been cancelled"""
+    token = _current_token.get()
+    if token is not None:
+        token.raise_if_cancelled()
+
+def cancellable_sleep(seconds: float) -> None:
+    """Sleep that is cut short by cancellation of the current work"""
+    token = _current_token.get()
+    if token is None:
+        time.sleep(seconds)
+    else:
+        token.sleep(seconds)
+
+@contextmanager
+def interrupt_on_cancel(interrupt: Callable[[], None]):
+    """
+    Call interrupt (killing a child process, closing a stream) if the current work is cancelled
+    while the block runs; the block then raises RequestCancelled instead of the error it caused
+    """
+    token = _current_token.get()
+    remove = token.on_cancel(interrupt) if token is not None else None
+    try:
+        yield
+    except Exception:
+        check_cancelled()
+        raise
+    finally:
+        if remove is not None:
+            remove()
+    check_cancelled()
+
+def _requested_deadline(headers: dict) -> Optional[float]:
+    """Seconds the request may run: X-Request-Timeout capped by REQUEST_DEADLINE_SECONDS"""
+    limit = REQUEST_DEADLINE_SECONDS if REQUEST_DEADLINE_SECONDS > 0 else None
+    try:
+        requested = float(headers[b"x-request-timeout"]) if b"x-request-timeout" in headers else None
+    except ValueError:
+        requested = None
+    if requested is not None and requested > 0:
+        return min(requested, limit) if limit else requested
+    return limit
+
+class CancellationMiddleware:
+    """
+    ASGI middleware giving each POST request a cancel token. When the client disconnects or the
+    deadline passes, the token is cancelled, so worker threads stop at their next checkpoint,
+    and the request's task is cancelled, which releases its queue place and shared pipelines.
+    """
+
+    def __init__(self, app, endpoint_label: Callable[[str], str]):
+        self.app = app
+        self.endpoint_label = endpoint_label
+
+    async def __call__(self, scope, receive, send):
+        if not CANCELLATION_ENABLED or scope["type"] != "http" or scope["method"] != "POST":
+            await self.app(scope, receive, send)
+            return
+
+        timeout = _requested_deadline(dict(scope.get("headers") or []))
+        token = CancelToken(time.monotonic() + timeout if timeout else None)
+        body_received = asyncio.Event()
+        disconnected = asyncio.Event()
+        response_started = False
+
+        async def receive_with_watch():
+            # Once the body is read, the watcher owns the real receive and reports the disconnect
+            if body_received.is_set():
+                await disconnected.wait()
+                return {"type": "http.disconnect"}
+            message = await receive()
+            if message["type"] == "http.disconnect":
+                disconnected.set()
+            elif not message.get("more_body", False):
+                body_received.set()
+            return message
+
+        async def send_with_state(message):
+            nonlocal response_started
+            if message["type"] == "http.response.start":
+                response_started = True
+            await send(message)
+
+        async def watch_disconnect():
+            await body_received.wait()
+            while (await receive())["type"] != "http.disconnect":
+                pass
+            disconnected.set()
+
+        # The app task copies the context, and with it the token, when it is created
+        context_token = _current_token.set(token)
+        app_task = asyncio.ensure_future(self.app(scope, receive_with_watch, send_with_state))
+        _current_token.reset(context_token)
+        watchers = [asyncio.ensure_future(watch_disconnect()), asyncio.ensure_future(disconnected.wait())]
+        try:
+            done, _ = await asyncio.wait([app_task, *watchers], timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+            if app_task in done:
+                app_task.result()
+                return
+
+            reason = "client disconnected" if disconnected.is_set() else "deadline"
+            token.cancel(reason)
+            app_task.cancel()
+            try:
+                await app_task
+            except (asyncio.CancelledError, Exception):
+                pass
+            endpoint = self.endpoint_label(scope["path"])
+            CANCELLED_REQUESTS.labels(endpoint=endpoint, reason="deadline" if reason == "deadline" else "disconnect").inc()
+            logger.info(f"Cancelled {scope['path']}: {reason}")
+            if not response_started:
+                error = RequestCancelled(reason)
+                body = json.dumps({"detail": error.detail}).encode("utf-8")
+                await send({
+                    "type": "http.response.start",
+                    "status": error.status_code,
+                    "headers": [
+                        (b"content-type", b"application/json"),
+                        (b"content-length", str(len(body)).encode("latin-1")),
+                    ],
+                })
+                await send({"type": "http.response.body", "body": body})
+        finally:
+            for task in (app_task, *watchers):
+                if not task.done():
+                    task.cancel()
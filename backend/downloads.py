@@ -0,0 +1,226 @@
+"""
+Downloads Module
+Pooled, bounded, streaming HTTP downloads with conditional re-fetch (ETag/Last-Modified) from a local cache
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+from dataclasses import dataclass
+from typing import Dict, Optional
+
+import aiohttp
+
+from metrics import record_cache_lookup
+from tracing import set_span_attributes, stage_span
+
+# Setup logging
+logger = logging.getLogger("downloads")
+
+DOWNLOAD_CONNECT_TIMEOUT_SECONDS = float(os.getenv("DOWNLOAD_CONNECT_TIMEOUT_SECONDS", "5"))
+# Longest wait for the next chunk; a stalled server fails fast instead of pinning a worker
+DOWNLOAD_READ_TIMEOUT_SECONDS = float(os.getenv("DOWNLOAD_READ_TIMEOUT_SECONDS", "15"))
+DOWNLOAD_TOTAL_TIMEOUT_SECONDS = float(os.getenv("DOWNLOAD_TOTAL_TIMEOUT_SECONDS", "60"))
+DOWNLOAD_MAX_BYTES = int(os.getenv("DOWNLOAD_MAX_BYTES", str(25 * 1024 * 1024)))
+DOWNLOAD_CHUNK_BYTES = 64 * 1024
+DOWNLOAD_MAX_CONNECTIONS = int(os.getenv("DOWNLOAD_MAX_CONNECTIONS", "32"))
+DOWNLOAD_MAX_CONNECTIONS_PER_HOST = int(os.getenv("DOWNLOAD_MAX_CONNECTIONS_PER_HOST", "8"))
+# Responses with an ETag or Last-Modified are kept here and revalidated on the next fetch; empty disables
+DOWNLOAD_CACHE_DIR = os.getenv(
+    "DOWNLOAD_CACHE_DIR", os.path.join(tempfile.gettempdir(), "flo-interviewer-downloads")
+)
+# Least recently used entries are evicted once the cache passes either limit
+DOWNLOAD_CACHE_MAX_BYTES = int(os.getenv("DOWNLOAD_CACHE_MAX_BYTES", str(512 * 1024 * 1024)))
+DOWNLOAD_CACHE_MAX_ENTRIES = int(os.getenv("DOWNLOAD_CACHE_MAX_ENTRIES", "256"))
+
+class DownloadError(Exception):
+    def __init__(self, message: str, status_code: int = 400):
+        super().__init__(message)
+        self.status_code = status_code
+
+@dataclass
+class DownloadResult:
+    content: bytes
+    from_cache: bool
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+
+class _CachedBodyMissing(Exception):
+    """A 304 arrived for an entry whose body has since been removed"""
+
+class DownloadCache:
+    """
+    Response bodies and their validators on disk, keyed by URL hash. Bounded by total size and
+    entry count; a body's modification time marks its last use and the oldest are evicted first.
+    """
+
+    def __init__(self, directory: str, max_bytes: int, max_entries: int):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    def _paths(self, url: str):
+        key = hashlib.sha256(url.encode("utf-8")).hexdigest()
+        return os.path.join(self.directory, f"{key}.json"), os.path.join(self.directory, f"{key}.body")
+
+    def load_validators(self, url: str) -> Optional[Dict[str, str]]:
+        if not self.directory:
+            return None
+        meta_path, body_path = self._paths(url)
+        if not (os.path.exists(meta_path) and os.path.exists(body_path)):
+            return None
+        try:
+            with open(meta_path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def load_body(self, url: str) -> bytes:
+        """The cached body; raises OSError if it has been evicted or removed"""
+        body_path = self._paths(url)[1]
+        with open(body_path, "rb") as f:
+            content = f.read()
+        try:
+            os.utime(body_path)
+        except OSError:
+            pass
+        return content
+
+    def remove(self, url: str) -> None:
+        for path in self._paths(url):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    def store(self, url: str, content: bytes, validators: Dict[str, str]) -> None:
+        if not self.directory:
+            return
+        meta_path, body_path = self._paths(url)
+        # Write then rename, body before metadata, so readers never see a partial entry
+        for path, data, mode in ((body_path, content, "wb"), (meta_path, json.dumps(validators), "w")):
+            temp_path = f"{path}.{os.getpid()}.tmp"
+            with open(temp_path, mode) as f:
+                f.write(data)
+            os.replace(temp_path, path)
+        self._evict()
+
+    def _evict(self) -> None:
+        """Remove least recently used entries until the cache is within its limits"""
+        with self._lock:
+            entries = []
+            with os.scandir(self.directory) as it:
+                for entry in it:
+                    if not entry.name.endswith(".body"):
+                        continue
+                    try:
+                        stat = entry.stat()
+                    except OSError:
+                        continue
+                    entries.append((stat.st_mtime, stat.st_size, entry.name[:-len(".body")]))
+            entries.sort()
+            total = sum(size for _, size, _ in entries)
+            count = len(entries)
+            for _, size, key in entries:
+                if total <= self.max_bytes and count <= self.max_entries:
+                    break
+                # Metadata first, so an entry is never revalidated without its body
+                for suffix in (".json", ".body"):
+                    try:
+                        os.remove(os.path.join(self.directory, key + suffix))
+                    except OSError:
+                        pass
+                total -= size
+                count -= 1
+
+class Downloader:
+    """One pooled aiohttp session for the process; create it lazily inside the running event loop"""
+
+    def __init__(self, cache: DownloadCache):
+        self.cache = cache
+        self._session: Optional[aiohttp.ClientSession] = None
+
+    def _get_session(self) -> aiohttp.ClientSession:
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(
+                    limit=DOWNLOAD_MAX_CONNECTIONS,
+                    limit_per_host=DOWNLOAD_MAX_CONNECTIONS_PER_HOST,
+                    ttl_dns_cache=300
+                ),
+                timeout=aiohttp.ClientTimeout(
+                    total=DOWNLOAD_TOTAL_TIMEOUT_SECONDS,
+                    sock_connect=DOWNLOAD_CONNECT_TIMEOUT_SECONDS,
+                    sock_read=DOWNLOAD_READ_TIMEOUT_SECONDS
+                )
+            )
+        return self._session
+
+    async def close(self) -> None:
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+    async def fetch(self, url: str, max_bytes: int = DOWNLOAD_MAX_BYTES) -> DownloadResult:
+        """Download a URL into memory, at most max_bytes, revalidating a cached copy when there is one"""
+        with stage_span("pdf_download"):
+            result = await self._fetch(url, max_bytes)
+            set_span_attributes({"download.bytes": len(result.content), "download.from_cache": result.from_cache})
+            return result
+
+    async def _fetch(self, url: str, max_bytes: int) -> DownloadResult:
+        validators = await asyncio.to_thread(self.cache.load_validators, url)
+        headers = {}
+        if validators and validators.get("etag"):
+            headers["If-None-Match"] = validators["etag"]
+        if validators and validators.get("last_modified"):
+            headers["If-Modified-Since"] = validators["last_modified"]
+
+        try:
+            async with self._get_session().get(url, headers=headers) as response:
+                if validators:
+                    record_cache_lookup("download", response.status == 304)
+                if response.status == 304 and validators:
+                    try:
+                        content = await asyncio.to_thread(self.cache.load_body, url)
+                    except OSError:
+                        raise _CachedBodyMissing()
+                    logger.info(f"Not modified, using cached copy of {url}")
+                    return DownloadResult(content, True, validators.get("etag"), validators.get("last_modified"))
+                if response.status != 200:
+                    raise DownloadError(f"Status code: {response.status}")
+                if response.content_length is not None and response.content_length > max_bytes:
+                    raise DownloadError(f"File is {response.content_length} bytes, the limit is {max_bytes}", 413)
+
+                chunks = []
+                size = 0
+                async for chunk in response.content.iter_chunked(DOWNLOAD_CHUNK_BYTES):
+                    size += len(chunk)
+                    if size > max_bytes:
+                        raise DownloadError(f"File exceeds the {max_bytes} byte limit", 413)
+                    chunks.append(chunk)
+                content = b"".join(chunks)
+                etag = response.headers.get("ETag")
+                last_modified = response.headers.get("Last-Modified")
+        except _CachedBodyMissing:
+            # Evicted or cleaned up after the validators were read: drop them and fetch unconditionally
+            logger.info(f"Cached copy of {url} is gone, downloading it again")
+            await asyncio.to_thread(self.cache.remove, url)
+            return await self._fetch(url, max_bytes)
+        except asyncio.TimeoutError:
+            raise DownloadError("Timed out", 504)
+        except aiohttp.ClientError as e:
+            raise DownloadError(str(e))
+
+        if etag or last_modified:
+            await asyncio.to_thread(self.cache.store, url, content, {"etag": etag, "last_modified": last_modified})
+        return DownloadResult(content, False, etag, last_modified)
+
+DOWNLOADER = Downloader(DownloadCache(DOWNLOAD_CACHE_DIR, DOWNLOAD_CACHE_MAX_BYTES, DOWNLOAD_CACHE_MAX_ENTRIES))
@@ -0,0 +1,197 @@
+"""
+Latency Budget Module
+Caller-supplied latency budgets for the analysis pipeline, split across its stages as they start.
+A stage that overruns its share is cancelled and the response carries what is ready, with the
+remaining sections marked pending.
+"""
+
+import asyncio
+import logging
+import os
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from typing import Any, Callable, Iterable, List, Literal, Optional, Set
+
+from pydantic import BaseModel, Field
+from starlette.concurrency import run_in_threadpool
+
+from cancellation import CancelToken, bind_token, current_token
+from metrics import BUDGET_RESPONSES, BUDGET_STAGE_OUTCOMES
+from tracing import in_current_context
+
+# Setup logging
+logger = logging.getLogger("latency-budget")
+
+# Budget for analysis requests that do not pass one; 0 leaves them unbounded
+ANALYSIS_LATENCY_BUDGET_SECONDS = float(os.getenv("ANALYSIS_LATENCY_BUDGET_SECONDS", "0"))
+# Share of the remaining budget a stage may use when it starts. Download and transcription are
+# needed for anything to be returned, so they may use all of it; the analysis gets what is left.
+BUDGET_STAGE_SHARES = {
+    "download": float(os.getenv("BUDGET_SHARE_DOWNLOAD", "1.0")),
+    "transcribe": float(os.getenv("BUDGET_SHARE_TRANSCRIBE", "1.0")),
+    "format": float(os.getenv("BUDGET_SHARE_FORMAT", "0.4")),
+    "analysis": float(os.getenv("BUDGET_SHARE_ANALYSIS", "1.0")),
+    "summary": float(os.getenv("BUDGET_SHARE_SUMMARY", "1.0")),
+}
+# Held back from the stages for validation, rendering and sending the response
+BUDGET_RESERVE_SECONDS = float(os.getenv("BUDGET_RESERVE_SECONDS", "0.5"))
+# A stage allotted less than this is skipped rather than started and abandoned
+BUDGET_MIN_STAGE_SECONDS = float(os.getenv("BUDGET_MIN_STAGE_SECONDS", "1.0"))
+
+class BudgetExceeded(Exception):
+    def __init__(self, stage: str):
+        super().__init__(f"{stage} did not finish within its latency budget")
+        self.stage = stage
+
+class StageDecision(BaseModel):
+    stage: str
+    allotted_seconds: float
+    elapsed_seconds: float
+    outcome: Literal["completed", "partial", "timed_out", "skipped", "failed"]
+
+class BudgetReport(BaseModel):
+    budget_seconds: float
+    elapsed_seconds: float
+    stages: List[StageDecision] = Field(default_factory=list)
+    pending: List[str] = Field(default_factory=list, description="Response sections not (fully) ready within the budget")
+
+class BudgetStage:
+    """One stage's share of the budget, with a cancel token that expires at the stage deadline"""
+
+    def __init__(self, budget: "LatencyBudget", name: str, allotted: float):
+        self.budget = budget
+        self.name = name
+        self.allotted = allotted
+        self.started = time.monotonic()
+        self.deadline = self.started + allotted
+        parent = current_token()
+        self.token = parent.child(self.deadline) if parent is not None else CancelToken(self.deadline)
+
+    @property
+    def skipped(self) -> bool:
+        return self.allotted < BUDGET_MIN_STAGE_SECONDS
+
+    def remaining(self) -> float:
+        return max(self.deadline - time.monotonic(), 0.0)
+
+    def bind(self, func: Callable) -> Callable:
+        """Wrap func to run under the stage's token; submit it through in_current_context"""
+        token = self.token
+
+        def run(*args, **kwargs):
+            bind_token(token)
+            return func(*args, **kwargs)
+        return run
+
+    def wait(self, futures: Iterable[Future]) -> Set[Future]:
+        """Wait for futures until the stage deadline; the unfinished ones are cancelled"""
+        done, not_done = wait(list(futures), timeout=self.remaining())
+        if not_done:
+            self.token.cancel("deadline")
+        return done
+
+    def call(self, func: Callable, *args, **kwargs) -> Any:
+        """Run func on its own thread under the stage deadline; raises BudgetExceeded if it overruns"""
+        executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix=f"budget-{self.name}")
+        try:
+            future = executor.submit(in_current_context(self.bind(func)), *args, **kwargs)
+        finally:
+            executor.shutdown(wait=False)
+        outcome = "failed"
+        try:
+            if future not in self.wait([future]):
+                outcome = "timed_out"
+                raise BudgetExceeded(self.name)
+            result = future.result()
+            outcome = "completed"
+            return result
+        finally:
+            # Recorded however the stage ends, including when it raises
+            self.finish(outcome)
+
+    def finish(self, outcome: str) -> None:
+        self.budget.record(self, outcome)
+
+class LatencyBudget:
+    """A request's latency budget; each stage gets its share of what remains when it starts"""
+
+    def __init__(self, seconds: float):
+        self.seconds = seconds
+        self.started = time.monotonic()
+        self.deadline = self.started + seconds
+        self.decisions: List[StageDecision] = []
+        self.pending: List[str] = []
+        self._lock = threading.Lock()
+
+    @classmethod
+    def for_request(cls, seconds: Optional[float]) -> Optional["LatencyBudget"]:
+        """The caller's budget, else the configured default, else None for an unbounded request"""
+        seconds = seconds or ANALYSIS_LATENCY_BUDGET_SECONDS
+        return cls(seconds) if seconds and seconds > 0 else None
+
+    def remaining(self) -> float:
+        return max(self.deadline - BUDGET_RESERVE_SECONDS - time.monotonic(), 0.0)
+
+    def stage(self, name: str) -> BudgetStage:
+        return BudgetStage(self, name, self.remaining() * BUDGET_STAGE_SHARES.get(name, 1.0))
+
+    def record(self, stage: BudgetStage, outcome: str) -> None:
+        decision = StageDecision(
+            stage=stage.name,
+            allotted_seconds=round(stage.allotted, 3),
+            elapsed_seconds=round(time.monotonic() - stage.started, 3),
+            outcome=outcome
+        )
+        with self._lock:
+            self.decisions.append(decision)
+        BUDGET_STAGE_OUTCOMES.labels(stage=stage.name, outcome=outcome).inc()
+        if outcome != "completed":
+            logger.info(f"{stage.name} {outcome.replace('_', ' ')} after {decision.elapsed_seconds}s of {decision.allotted_seconds}s")
+
+    def mark_pending(self, *sections: str) -> None:
+        with self._lock:
+            self.pending.extend(section for section in sections if section not in self.pending)
+
+    async def run(self, name: str, func: Callable, *args, **kwargs) -> Any:
+        """
+        Run a blocking stage in the threadpool within its share of the budget. Raises
+        BudgetExceeded if the stage was skipped or overran; the overrunning work is cancelled.
+        """
+        stage = self.stage(name)
+        if stage.skipped:
+            stage.finish("skipped")
+            raise BudgetExceeded(name)
+        outcome = "failed"
+        task = asyncio.ensure_future(run_in_threadpool(stage.bind(func), *args, **kwargs))
+        try:
+            done, _ = await asyncio.wait({task}, timeout=stage.remaining())
+            if not done:
+                stage.token.cancel("deadline")
+                task.cancel()
+                outcome = "timed_out"
+                raise BudgetExceeded(name)
+            result = task.result()
+            outcome = "completed"
+            return result
+        finally:
+            # Recorded however the stage ends, including when it raises or the request is cancelled
+            stage.finish(outcome)
+
+    def report(self) -> BudgetReport:
+        """The budget decisions for the response; call once, when the response is built"""
+        with self._lock:
+            report = BudgetReport(
+                budget_seconds=self.seconds,
+                elapsed_seconds=round(time.monotonic() - self.started, 3),
+                stages=list(self.decisions),
+                pending=list(self.pending)
+            )
+        BUDGET_RESPONSES.labels(outcome="partial" if report.pending else "complete").inc()
+        return report
+
+async def run_stage(budget: Optional[LatencyBudget], name: str, func: Callable, *args, **kwargs) -> Any:
+    """Run a blocking stage in the threadpool, within its share of the budget when there is one"""
+    if budget is None:
+        return await run_in_threadpool(func, *args, **kwargs)
+    return await budget.run(name, func, *args, **kwargs)
@@ -0,0 +1,308 @@
+"""
+LLM Cassettes Module
+Record real provider exchanges, with their timing, to a cassette file and replay them offline at
+the recorded or a scaled latency: OpenAI at the HTTP transport, Gemini at the SDK call
+"""
+
+import base64
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from types import SimpleNamespace
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+import httpx
+import openai
+
+# Setup logging
+logger = logging.getLogger("llm-cassettes")
+
+# "record" saves every exchange, "replay" serves them without network access; empty disables
+LLM_CASSETTE_MODE = os.getenv("LLM_CASSETTE_MODE", "").lower()
+LLM_CASSETTE_PATH = os.getenv("LLM_CASSETTE_PATH", "cassettes/llm.jsonl")
+# Replay latency relative to the recording: 1 reproduces it, 0 replays instantly
+LLM_CASSETTE_LATENCY_SCALE = float(os.getenv("LLM_CASSETTE_LATENCY_SCALE", "1"))
+
+GEMINI_USAGE_FIELDS = ("prompt_token_count", "candidates_token_count", "cached_content_token_count", "total_token_count")
+
+class Cassette:
+    """
+    Exchanges keyed by a hash of the normalized request, one JSON object per line. Requests
+    recorded more than once are replayed in their recorded order, wrapping around.
+    """
+
+    def __init__(self, path: str, mode: str, latency_scale: float = 1.0):
+        if mode not in ("record", "replay"):
+            raise ValueError(f"Unknown cassette mode: {mode}")
+        self.path = path
+        self.mode = mode
+        self.latency_scale = latency_scale
+        self._lock = threading.Lock()
+        self._entries: Optional[Dict[str, List[dict]]] = None
+        self._positions: Dict[str, int] = {}
+
+    def _load(self) -> Dict[str, List[dict]]:
+        entries: Dict[str, List[dict]] = {}
+        with open(self.path, "r", encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    entry = json.loads(line)
+                    entries.setdefault(entry["key"], []).append(entry)
+        logger.info(f"Loaded {sum(len(v) for v in entries.values())} recorded exchanges from {self.path}")
+        return entries
+
+    def next_entry(self, key: str) -> Optional[dict]:
+        with self._lock:
+            if self._entries is None:
+                self._entries = self._load()
+            recorded = self._entries.get(key)
+            if not recorded:
+                return None
+            position = self._positions.get(key, 0)
+            self._positions[key] = position + 1
+            return recorded[position % len(recorded)]
+
+    def record(self, entry: dict) -> None:
+        line = json.dumps(entry, ensure_ascii=False)
+        with self._lock:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(line + "\n")
+
+    def sleep_until(self, started: float, offset: float) -> None:
+        """Sleep until offset (recorded seconds, scaled) after started"""
+        remaining = started + offset * self.latency_scale - time.perf_counter()
+        if remaining > 0:
+            time.sleep(remaining)
+
+def request_key(provider: str, *parts: Any) -> str:
+    digest = hashlib.sha256(provider.encode("utf-8"))
+    for part in parts:
+        digest.update(b"\0")
+        digest.update(part if isinstance(part, bytes) else json.dumps(part, sort_keys=True, default=str).encode("utf-8"))
+    return digest.hexdigest()
+
+def _encode_chunk(offset: float, data: bytes) -> dict:
+    try:
+        return {"t": round(offset, 4), "text": data.decode("utf-8")}
+    except UnicodeDecodeError:
+        return {"t": round(offset, 4), "base64": base64.b64encode(data).decode("ascii")}
+
+def _decode_chunk(chunk: dict) -> bytes:
+    if "text" in chunk:
+        return chunk["text"].encode("utf-8")
+    return base64.b64decode(chunk["base64"])
+
+# OpenAI: HTTP transport
+
+def _normalized_body(request: httpx.Request) -> bytes:
+    """Request body with per-request randomness removed: JSON key order and multipart boundaries"""
+    body = request.read()
+    content_type = request.headers.get("content-type", "")
+    if content_type.startswith("application/json"):
+        try:
+            return json.dumps(json.loads(body), sort_keys=True).encode("utf-8")
+        except ValueError:
+            return body
+    if "boundary=" in content_type:
+        boundary = content_type.split("boundary=", 1)[1].split(";")[0].strip('"').encode("latin-1")
+        return body.replace(boundary, b"BOUNDARY")
+    return body
+
+class _RecordingStream(httpx.SyncByteStream):
+    """Passes the response body through while timing each chunk; the exchange is saved on close"""
+
+    def __init__(self, stream: httpx.SyncByteStream, entry: dict, cassette: Cassette, headers_at: float):
+        self._stream = stream
+        self._entry = entry
+        self._cassette = cassette
+        self._headers_at = headers_at
+        self._saved = False
+
+    def __iter__(self) -> Iterator[bytes]:
+        for data in self._stream:
+            self._entry["chunks"].append(_encode_chunk(time.perf_counter() - self._headers_at, data))
+            yield data
+
+    def close(self) -> None:
+        try:
+            self._stream.close()
+        finally:
+            if not self._saved:
+                self._saved = True
+                self._cassette.record(self._entry)
+
+class _ReplayStream(httpx.SyncByteStream):
+    def __init__(self, chunks: List[dict], cassette: Cassette):
+        self._chunks = chunks
+        self._cassette = cassette
+
+    def __iter__(self) -> Iterator[bytes]:
+        started = time.perf_counter()
+        for chunk in self._chunks:
+            self._cassette.sleep_until(started, chunk["t"])
+            yield _decode_chunk(chunk)
+
+class CassetteTransport(httpx.BaseTransport):
+    """httpx transport that records exchanges through the wrapped transport, or replays them"""
+
+    def __init__(self, cassette: Cassette, transport: Optional[httpx.BaseTransport] = None):
+        self.cassette = cassette
+        self.transport = transport or httpx.HTTPTransport()
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        key = request_key("openai", request.method, request.url.path, _normalized_body(request))
+        if self.cassette.mode == "replay":
+            return self._replay(request, key)
+
+        started = time.perf_counter()
+        response = self.transport.handle_request(request)
+        headers_at = time.perf_counter()
+        entry = {
+            "key": key,
+            "provider": "openai",
+            "method": request.method,
+            "path": request.url.path,
+            "status": response.status_code,
+            "headers": [[name, value] for name, value in response.headers.multi_items()],
+            "latency": round(headers_at - started, 4),
+            "chunks": [],
+        }
+        return httpx.Response(
+            status_code=response.status_code,
+            headers=response.headers,
+            stream=_RecordingStream(response.stream, entry, self.cassette, headers_at),
+            extensions=response.extensions,
+            request=request,
+        )
+
+    def _replay(self, request: httpx.Request, key: str) -> httpx.Response:
+        started = time.perf_counter()
+        entry = self.cassette.next_entry(key)
+        if entry is None:
+            # A 4xx is not retried, so a missing recording fails the call at once
+            return httpx.Response(
+                status_code=404,
+                json={"error": {
+                    "message": f"No recorded exchange for {request.method} {request.url.path} in {self.cassette.path}",
+                    "type": "cassette_miss",
+                }},
+                request=request,
+            )
+        self.cassette.sleep_until(started, entry["latency"])
+        return httpx.Response(
+            status_code=entry["status"],
+            headers=entry["headers"],
+            stream=_ReplayStream(entry["chunks"], self.cassette),
+            request=request,
+        )
+
+    def close(self) -> None:
+        self.transport.close()
+
+# Gemini: SDK call
+
+class CassetteMiss(Exception):
+    pass
+
+class _ReplayedGeminiChunk:
+    def __init__(self, text: str):
+        self.text = text
+        self.parts = [text] if text else []
+
+class _ReplayedGeminiResponse:
+    """Stands in for a GenerateContentResponse: text, usage_metadata and, when streamed, its chunks"""
+
+    def __init__(self, entry: dict, cassette: Cassette):
+        self.text = entry["text"]
+        self.usage_metadata = SimpleNamespace(**entry["usage"]) if entry.get("usage") else None
+        self._chunks = entry["chunks"]
+        self._cassette = cassette
+
+    def __iter__(self) -> Iterator[_ReplayedGeminiChunk]:
+        started = time.perf_counter()
+        for chunk in self._chunks:
+            self._cassette.sleep_until(started, chunk["t"])
+            yield _ReplayedGeminiChunk(chunk["text"])
+
+def _gemini_usage(response: Any) -> Optional[dict]:
+    usage = getattr(response, "usage_metadata", None)
+    if usage is None:
+        return None
+    return {field: getattr(usage, field, 0) or 0 for field in GEMINI_USAGE_FIELDS}
+
+class _RecordingGeminiStream:
+    """Iterates a streamed Gemini response, timing each chunk; the exchange is saved at the end"""
+
+    def __init__(self, response: Any, entry: dict, cassette: Cassette):
+        self._response = response
+        self._entry = entry
+        self._cassette = cassette
+
+    def __iter__(self) -> Iterator[Any]:
+        started = time.perf_counter()
+        parts = []
+        for chunk in self._response:
+            text = chunk.text if chunk.parts else ""
+            parts.append(text)
+            self._entry["chunks"].append({"t": round(time.perf_counter() - started, 4), "text": text})
+            yield chunk
+        self._entry["text"] = "".join(parts)
+        self._entry["usage"] = _gemini_usage(self._response)
+        self._cassette.record(self._entry)
+
+    @property
+    def usage_metadata(self) -> Any:
+        return getattr(self._response, "usage_metadata", None)
+
+def gemini_generate(
+    model: Any,
+    model_name: str,
+    system_instruction: Optional[str],
+    contents: List[dict],
+    generation_config: dict,
+    stream: bool = False
+) -> Any:
+    """model.generate_content, recorded to or replayed from the cassette when one is active"""
+    if CASSETTE is None:
+        return model.generate_content(contents, generation_config=generation_config, stream=stream)
+
+    key = request_key("gemini", model_name, system_instruction, contents, generation_config, stream)
+    started = time.perf_counter()
+    if CASSETTE.mode == "replay":
+        entry = CASSETTE.next_entry(key)
+        if entry is None:
+            raise CassetteMiss(f"No recorded Gemini exchange for {model_name} in {CASSETTE.path}")
+        CASSETTE.sleep_until(started, entry["latency"])
+        return _ReplayedGeminiResponse(entry, CASSETTE)
+
+    response = model.generate_content(contents, generation_config=generation_config, stream=stream)
+    entry = {
+        "key": key,
+        "provider": "gemini",
+        "model": model_name,
+        "stream": stream,
+        "latency": round(time.perf_counter() - started, 4),
+        "chunks": [],
+    }
+    if stream:
+        return _RecordingGeminiStream(response, entry, CASSETTE)
+    entry["text"] = response.text
+    entry["usage"] = _gemini_usage(response)
+    CASSETTE.record(entry)
+    return response
+
+def cassette_http_client() -> Optional[httpx.Client]:
+    """HTTP client for the OpenAI SDK that goes through the cassette, or None for the SDK default"""
+    if CASSETTE is None:
+        return None
+    return openai.DefaultHttpxClient(transport=CassetteTransport(CASSETTE))
+
+CASSETTE: Optional[Cassette] = (
+    Cassette(LLM_CASSETTE_PATH, LLM_CASSETTE_MODE, LLM_CASSETTE_LATENCY_SCALE) if LLM_CASSETTE_MODE else None
+)
+if CASSETTE is not None:
+    logger.warning(f"LLM cassette {CASSETTE.mode} mode: {CASSETTE.path} (latency scale {CASSETTE.latency_scale:g})")
@@ -0,0 +1,676 @@
+"""
+LLM Providers Module
+Provider abstraction for the analysis stages, with a router that picks a provider from live latency and error rates
+"""
+
+import json
+import logging
+import os
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Callable, Deque, Dict, List, Optional, Tuple
+
+import google.generativeai as genai
+import openai
+from fastapi import HTTPException
+
+from cancellation import CancelToken, RequestCancelled, bind_token, check_cancelled, current_token, interrupt_on_cancel
+from llm_cassettes import cassette_http_client, gemini_generate
+from metrics import LLM_CALL_SECONDS, LLM_TOKENS, track_submission
+from rate_limiter import RateLimitExceeded, call_with_rate_limit, get_rate_limiter
+from tracing import in_current_context, set_span_attributes, span
+from transcript_compaction import count_tokens
+
+# Setup logging
+logger = logging.getLogger("llm-providers")
+
+# Model used by each provider for the fast (first-pass) and strong tiers
+PROVIDER_MODELS = {
+    "openai": {
+        "fast": os.getenv("CASCADE_FAST_MODEL", "gpt-4.1-mini"),
+        "strong": os.getenv("CASCADE_STRONG_MODEL", "gpt-4.1"),
+    },
+    "gemini": {
+        "fast": os.getenv("GEMINI_FAST_MODEL", "gemini-2.5-flash"),
+        "strong": os.getenv("GEMINI_STRONG_MODEL", "gemini-2.5-pro"),
+    },
+}
+
+# Routing for ai_provider="auto"
+ROUTER_PROVIDER_ORDER = [p.strip() for p in os.getenv("ROUTER_PROVIDER_ORDER", "openai,gemini").split(",") if p.strip()]
+ROUTER_WINDOW_SECONDS = float(os.getenv("ROUTER_WINDOW_SECONDS", "300"))
+ROUTER_MIN_SAMPLES = int(os.getenv("ROUTER_MIN_SAMPLES", "5"))
+ROUTER_MAX_ERROR_RATE = float(os.getenv("ROUTER_MAX_ERROR_RATE", "0.25"))
+ROUTER_EXPLORATION_RATE = float(os.getenv("ROUTER_EXPLORATION_RATE", "0.05"))
+ROUTER_THROTTLE_COOLDOWN_SECONDS = float(os.getenv("ROUTER_THROTTLE_COOLDOWN_SECONDS", "30"))
+
+# Hedging: a stage call still running after the stage's observed p90 gets a duplicate
+# request, and the first valid result wins. Streamed calls are hedged on the p90 time to
+# first token instead; the first stream to deliver text wins and the other is cancelled.
+# HEDGE_MAX_FRACTION caps the extra calls.
+HEDGE_ENABLED = os.getenv("HEDGE_ENABLED", "false").lower() == "true"
+HEDGE_PERCENTILE = float(os.getenv("HEDGE_PERCENTILE", "0.9"))
+HEDGE_MIN_SAMPLES = int(os.getenv("HEDGE_MIN_SAMPLES", "20"))
+HEDGE_MIN_DELAY_SECONDS = float(os.getenv("HEDGE_MIN_DELAY_SECONDS", "2"))
+HEDGE_MAX_FRACTION = float(os.getenv("HEDGE_MAX_FRACTION", "0.1"))
+HEDGE_MAX_WORKERS = int(os.getenv("HEDGE_MAX_WORKERS", "32"))
+
+@dataclass
+class LLMResult:
+    text: str
+    provider: str
+    model: str
+    prompt_tokens: int = 0
+    cached_tokens: int = 0
+    completion_tokens: int = 0
+    hedged: bool = False
+
+class LLMProvider:
+    """A chat model backend that can return free text or schema-constrained JSON"""
+
+    name = "base"
+
+    def is_configured(self) -> bool:
+        raise NotImplementedError
+
+    def model_for(self, tier: str) -> str:
+        return PROVIDER_MODELS[self.name][tier]
+
+    def complete(
+        self,
+        messages: List[dict],
+        tier: str = "strong",
+        response_format: Optional[dict] = None,
+        max_tokens: Optional[int] = None,
+        temperature: float = 0.3,
+        cache_key: Optional[str] = None,
+        on_text: Optional[Callable[[str], None]] = None
+    ) -> LLMResult:
+        raise NotImplementedError
+
+@lru_cache(maxsize=4)
+def get_openai_client(api_key: str) -> openai.OpenAI:
+    """Shared OpenAI client, so connections are pooled across stages and requests"""
+    # Retries are scheduled by the shared rate limiter, so the SDK's own retry loop is disabled.
+    # With LLM_CASSETTE_MODE set, requests go through the record/replay transport.
+    return openai.OpenAI(api_key=api_key, max_retries=0, http_client=cassette_http_client())
+
+def estimate_request_tokens(messages: List[dict], max_tokens: Optional[int]) -> int:
+    """Upper estimate of the tokens a request will consume, for the token bucket"""
+    return count_tokens("".join(message["content"] for message in messages)) + (max_tokens or 2000)
+
+class OpenAIProvider(LLMProvider):
+    name = "openai"
+
+    def is_configured(self) -> bool:
+        return bool(os.getenv("OPENAI_API_KEY"))
+
+    def client(self) -> openai.OpenAI:
+        api_key = os.getenv("OPENAI_API_KEY")
+        if not api_key:
+            raise HTTPException(status_code=500, detail="OpenAI API key not configured.")
+        return get_openai_client(api_key)
+
+    def complete(
+        self,
+        messages: List[dict],
+        tier: str = "strong",
+        response_format: Optional[dict] = None,
+        max_tokens: Optional[int] = None,
+        temperature: float = 0.3,
+        cache_key: Optional[str] = None,
+        on_text: Optional[Callable[[str], None]] = None
+    ) -> LLMResult:
+        client = self.client()
+        model = self.model_for(tier)
+
+        kwargs = {"model": model, "messages": messages, "temperature": temperature}
+        if response_format is not None:
+            kwargs["response_format"] = response_format
+        if max_tokens is not None:
+            kwargs["max_tokens"] = max_tokens
+        if cache_key:
+            kwargs["extra_body"] = {"prompt_cache_key": cache_key}
+
+        estimated_tokens = estimate_request_tokens(messages, max_tokens)
+        if on_text is None:
+            response = call_with_rate_limit(
+                self.name,
+                lambda: client.chat.completions.create(**kwargs),
+                estimated_tokens,
+                lambda response: response.usage.total_tokens if getattr(response, "usage", None) else None
+            )
+            text = response.choices[0].message.content
+            usage = getattr(response, "usage", None)
+        else:
+            # Only opening the stream is retried; usage arrives with the final chunk
+            stream = call_with_rate_limit(
+                self.name,
+                lambda: client.chat.completions.create(**kwargs, stream=True, stream_options={"include_usage": True}),
+                estimated_tokens
+            )
+            parts = []
+            usage = None
+            # Closing the stream on cancellation ends the generation, and with it the spend
+            with interrupt_on_cancel(stream.close):
+                for chunk in stream:
+                    if chunk.choices and chunk.choices[0].delta.content:
+                        parts.append(chunk.choices[0].delta.content)
+                        on_text(chunk.choices[0].delta.content)
+                    if getattr(chunk, "usage", None):
+                        usage = chunk.usage
+            text = "".join(parts)
+            get_rate_limiter(self.name).record_usage(estimated_tokens, usage.total_tokens if usage else None)
+
+        details = getattr(usage, "prompt_tokens_details", None)
+        return LLMResult(
+            text=text,
+            provider=self.name,
+            model=model,
+            prompt_tokens=(usage.prompt_tokens or 0) if usage else 0,
+            cached_tokens=(getattr(details, "cached_tokens", None) or 0) if details else 0,
+            completion_tokens=(usage.completion_tokens or 0) if usage else 0
+        )
+
+# Keys of the OpenAPI schema subset accepted by Gemini's response_schema
+GEMINI_SCHEMA_KEYS = {"type", "format", "description", "nullable", "enum", "items", "properties", "required"}
+
+def to_gemini_schema(schema: dict) -> dict:
+    """Convert a JSON schema to the subset Gemini accepts, dropping bounds and other unsupported keywords"""
+    converted = {}
+    for key, value in schema.items():
+        if key not in GEMINI_SCHEMA_KEYS:
+            continue
+        if key == "properties":
+            value = {name: to_gemini_schema(prop) for name, prop in value.items()}
+        elif key == "items":
+            value = to_gemini_schema(value)
+        converted[key] = value
+    return converted
+
+class GeminiProvider(LLMProvider):
+    name = "gemini"
+
+    def __init__(self):
+        self._configured_key = None
+        self._lock = threading.Lock()
+
+    def is_configured(self) -> bool:
+        return bool(os.getenv("GEMINI_API_KEY"))
+
+    def _configure(self) -> None:
+        """Configure the SDK once per API key rather than on every request"""
+        api_key = os.getenv("GEMINI_API_KEY")
+        if not api_key:
+            raise HTTPException(status_code=500, detail="Gemini API key not configured.")
+        with self._lock:
+            if self._configured_key != api_key:
+                genai.configure(api_key=api_key)
+                self._configured_key = api_key
+                self._model.cache_clear()
+
+    @lru_cache(maxsize=16)
+    def _model(self, model_name: str, system_instruction: Optional[str]) -> genai.GenerativeModel:
+        return genai.GenerativeModel(model_name, system_instruction=system_instruction)
+
+    def complete(
+        self,
+        messages: List[dict],
+        tier: str = "strong",
+        response_format: Optional[dict] = None,
+        max_tokens: Optional[int] = None,
+        temperature: float = 0.3,
+        cache_key: Optional[str] = None,
+        on_text: Optional[Callable[[str], None]] = None
+    ) -> LLMResult:
+        self._configure()
+        model_name = self.model_for(tier)
+
+        # Gemini takes the system block at model construction and uses "model" for assistant turns
+        system_instruction = "\n\n".join(m["content"] for m in messages if m["role"] == "system") or None
+        contents = [
+            {"role": "model" if m["role"] == "assistant" else "user", "parts": [m["content"]]}
+            for m in messages if m["role"] != "system"
+        ]
+
+        generation_config = {"temperature": temperature}
+        if max_tokens is not None:
+            generation_config["max_output_tokens"] = max_tokens
+        if response_format is not None:
+            generation_config["response_mime_type"] = "application/json"
+            generation_config["response_schema"] = to_gemini_schema(response_format["json_schema"]["schema"])
+
+        model = self._model(model_name, system_instruction)
+        estimated_tokens = estimate_request_tokens(messages, max_tokens)
+        if on_text is None:
+            response = call_with_rate_limit(
+                self.name,
+                lambda: gemini_generate(model, model_name, system_instruction, contents, generation_config),
+                estimated_tokens,
+                lambda response: getattr(getattr(response, "usage_metadata", None), "total_token_count", None)
+            )
+            text = response.text
+        else:
+            response = call_with_rate_limit(
+                self.name,
+                lambda: gemini_generate(model, model_name, system_instruction, contents, generation_config, stream=True),
+                estimated_tokens
+            )
+            parts = []
+            for chunk in response:
+                check_cancelled()
+                if chunk.parts:
+                    parts.append(chunk.text)
+                    on_text(chunk.text)
+            text = "".join(parts)
+            get_rate_limiter(self.name).record_usage(
+                estimated_tokens, getattr(getattr(response, "usage_metadata", None), "total_token_count", None)
+            )
+
+        usage = getattr(response, "usage_metadata", None)
+        return LLMResult(
+            text=text,
+            provider=self.name,
+            model=model_name,
+            prompt_tokens=getattr(usage, "prompt_token_count", 0) or 0,
+            cached_tokens=getattr(usage, "cached_content_token_count", 0) or 0,
+            completion_tokens=getattr(usage, "candidates_token_count", 0) or 0
+        )
+
+PROVIDERS: Dict[str, LLMProvider] = {
+    "openai": OpenAIProvider(),
+    "gemini": GeminiProvider(),
+}
+
+def get_provider(name: str) -> LLMProvider:
+    """Return a provider by name"""
+    if name not in PROVIDERS:
+        raise HTTPException(status_code=400, detail=f"Invalid AI provider '{name}'. Choose one of: {', '.join(PROVIDERS)} or auto")
+    return PROVIDERS[name]
+
+class ProviderRouter:
+    """Tracks live latency and error rates per provider and orders providers for each call"""
+
+    def __init__(self, order: List[str]):
+        self.order = [name for name in order if name in PROVIDERS]
+        self.samples: Dict[str, Deque[Tuple[float, float, bool]]] = {name: deque(maxlen=500) for name in self.order}
+        self.throttled_until: Dict[str, float] = {}
+        self.lock = threading.Lock()
+
+    def record(self, provider: str, latency: float, ok: bool, throttled: bool = False) -> None:
+        """Record the outcome of one call"""
+        with self.lock:
+            self.samples.setdefault(provider, deque(maxlen=500)).append((time.monotonic(), latency, ok))
+            if throttled:
+                self.throttled_until[provider] = time.monotonic() + ROUTER_THROTTLE_COOLDOWN_SECONDS
+
+    def _recent(self, provider: str) -> List[Tuple[float, float, bool]]:
+        cutoff = time.monotonic() - ROUTER_WINDOW_SECONDS
+        return [sample for sample in self.samples.get(provider, ()) if sample[0] >= cutoff]
+
+    def stats(self, provider: str) -> Dict[str, Optional[float]]:
+        """p95 latency of successful calls and error rate over the recent window"""
+        with self.lock:
+            recent = self._recent(provider)
+        latencies = sorted(latency for _, latency, ok in recent if ok)
+        p95 = latencies[min(int(len(latencies) * 0.95), len(latencies) - 1)] if latencies else None
+        error_rate = sum(1 for _, _, ok in recent if not ok) / len(recent) if recent else 0.0
+        return {"samples": len(recent), "p95_seconds": p95, "error_rate": error_rate}
+
+    def _health(self, provider: str) -> Tuple[bool, Optional[float]]:
+        """(unhealthy, score): unhealthy past the error-rate limit, score the error-weighted p95 or None"""
+        stats = self.stats(provider)
+        if stats["samples"] < ROUTER_MIN_SAMPLES:
+            return False, None
+        # A provider whose calls all failed has no p95 but is still past the error-rate limit
+        unhealthy = stats["error_rate"] > ROUTER_MAX_ERROR_RATE
+        if stats["p95_seconds"] is None:
+            return unhealthy, None
+        return unhealthy, stats["p95_seconds"] * (1.0 + stats["error_rate"])
+
+    def rank(self) -> List[str]:
+        """Configured providers, healthiest and fastest first"""
+        candidates = [name for name in self.order if PROVIDERS[name].is_configured()]
+        now = time.monotonic()
+        health = {name: self._health(name) for name in candidates}
+        # Latency only reorders providers when all of them have it; against one without data yet
+        # the configured preference order stands
+        compare_latency = all(score is not None for _, score in health.values())
+        ranked = sorted(
+            candidates,
+            key=lambda name: (
+                self.throttled_until.get(name, 0.0) > now,
+                health[name][0],
+                health[name][1] if compare_latency else 0.0,
+                self.order.index(name)
+            )
+        )
+        # Occasionally try a lower-ranked provider so its statistics stay current
+        if len(ranked) > 1 and random.random() < ROUTER_EXPLORATION_RATE:
+            ranked.insert(0, ranked.pop(random.randrange(1, len(ranked))))
+        return ranked
+
+ROUTER = ProviderRouter(ROUTER_PROVIDER_ORDER)
+
+def _call_provider(provider: LLMProvider, **kwargs) -> LLMResult:
+    """Call a provider and feed the outcome back to the router"""
+    started = time.monotonic()
+    try:
+        result = provider.complete(**kwargs)
+    except RequestCancelled:
+        # Says nothing about the provider's health
+        raise
+    except RateLimitExceeded:
+        ROUTER.record(provider.name, time.monotonic() - started, ok=False, throttled=True)
+        raise
+    except Exception:
+        ROUTER.record(provider.name, time.monotonic() - started, ok=False)
+        raise
+    ROUTER.record(provider.name, time.monotonic() - started, ok=True)
+    return result
+
+class HedgePolicy:
+    """Per-stage latency percentiles and the budget that caps how many hedge requests are sent"""
+
+    def __init__(self):
+        self.latencies: Dict[str, Deque[float]] = {}
+        self.calls = 0
+        self.hedges = 0
+        self.lock = threading.Lock()
+
+    def record_latency(self, stage: str, latency: float) -> None:
+        with self.lock:
+            self.latencies.setdefault(stage, deque(maxlen=200)).append(latency)
+
+    def delay(self, stage: str) -> Optional[float]:
+        """How long to wait before hedging a call for this stage, or None while there is too little data"""
+        with self.lock:
+            latencies = sorted(self.latencies.get(stage, ()))
+        if len(latencies) < HEDGE_MIN_SAMPLES:
+            return None
+        percentile = latencies[min(int(len(latencies) * HEDGE_PERCENTILE), len(latencies) - 1)]
+        return max(percentile, HEDGE_MIN_DELAY_SECONDS)
+
+    def record_call(self) -> None:
+        with self.lock:
+            self.calls += 1
+
+    def try_acquire(self) -> bool:
+        """Take a hedge from the budget if extra calls stay within HEDGE_MAX_FRACTION of all calls"""
+        with self.lock:
+            if self.hedges + 1 > self.calls * HEDGE_MAX_FRACTION:
+                return False
+            self.hedges += 1
+            return True
+
+class _StreamTracker:
+    """Forwards streamed text and remembers whether any has been delivered"""
+
+    def __init__(self, on_text: Callable[[str], None]):
+        self.on_text = on_text
+        self.started = False
+
+    def __call__(self, text: str) -> None:
+        self.started = True
+        self.on_text(text)
+
+class _FirstTokenTimer:
+    """Forwards streamed text and records the stage's time to first token"""
+
+    def __init__(self, stage_key: str, on_text: Callable[[str], None]):
+        self.stage_key = stage_key
+        self.on_text = on_text
+        self.started = time.monotonic()
+        self.recorded = False
+
+    def __call__(self, text: str) -> None:
+        if not self.recorded:
+            self.recorded = True
+            HEDGING.record_latency(_first_token_key(self.stage_key), time.monotonic() - self.started)
+        self.on_text(text)
+
+def _first_token_key(stage_key: str) -> str:
+    return f"{stage_key}:first_token"
+
+class _StreamRace:
+    """
+    Streamed attempts at one call. The first to deliver text owns the consumer; the others are
+    cancelled through their tokens, which closes their streams.
+    """
+
+    def __init__(self, on_text: Callable[[str], None]):
+        self.on_text = on_text
+        self.winner: Optional[int] = None
+        # Set once an attempt delivers text or finishes, i.e. when there is no point hedging
+        self.progress = threading.Event()
+        self._tokens: Dict[int, CancelToken] = {}
+        self._lock = threading.Lock()
+
+    def attempt(self, attempt: int) -> Tuple[CancelToken, Callable[[str], None]]:
+        parent = current_token()
+        token = parent.child() if parent is not None else CancelToken()
+        with self._lock:
+            self._tokens[attempt] = token
+            lost = self.winner is not None
+
+        def on_text(text: str) -> None:
+            if self.claim(attempt):
+                self.on_text(text)
+        if lost:
+            token.cancel("hedge lost")
+        return token, on_text
+
+    def claim(self, attempt: int) -> bool:
+        """Make attempt the winner if there is none yet; False if another attempt already won"""
+        with self._lock:
+            if self.winner is not None:
+                return self.winner == attempt
+            self.winner = attempt
+            losers = [token for other, token in self._tokens.items() if other != attempt]
+        self.progress.set()
+        for token in losers:
+            token.cancel("hedge lost")
+        return True
+
+HEDGING = HedgePolicy()
+HEDGE_EXECUTOR = ThreadPoolExecutor(max_workers=HEDGE_MAX_WORKERS, thread_name_prefix="llm-hedge")
+
+def _dispatch(provider: str, kwargs: dict) -> LLMResult:
+    """Call one provider, or route across providers with failover when provider is auto"""
+    if provider != "auto":
+        return _call_provider(get_provider(provider), **kwargs)
+
+    ranked = ROUTER.rank()
+    if not ranked:
+        raise HTTPException(status_code=500, detail="No AI provider API key configured.")
+
+    # A stream that already delivered text cannot be replayed on another provider
+    stream = _StreamTracker(kwargs["on_text"]) if kwargs.get("on_text") else None
+    if stream is not None:
+        kwargs = dict(kwargs, on_text=stream)
+
+    for i, name in enumerate(ranked):
+        try:
+            return _call_provider(PROVIDERS[name], **kwargs)
+        except HTTPException as e:
+            if e.status_code != 429 or i == len(ranked) - 1 or (stream and stream.started):
+                raise
+            logger.warning(f"{name} is throttled, routing to {ranked[i + 1]}")
+        except Exception as e:
+            if i == len(ranked) - 1 or (stream and stream.started):
+                raise
+            logger.warning(f"{name} call failed ({e}), routing to {ranked[i + 1]}")
+
+def _hedge_target(provider: str) -> str:
+    """Send the duplicate to the runner-up provider when routing is automatic, else to the same provider"""
+    if provider != "auto":
+        return provider
+    ranked = ROUTER.rank()
+    return ranked[1] if len(ranked) > 1 else "auto"
+
+def _is_valid(result: LLMResult, structured: bool) -> bool:
+    """Structured results must at least parse as JSON; the stages validate the schema themselves"""
+    if not structured:
+        return bool(result.text)
+    try:
+        json.loads(result.text)
+    except (TypeError, ValueError):
+        return False
+    return True
+
+def _complete_hedged(provider: str, kwargs: dict, delay: float, stage: str) -> LLMResult:
+    """Run a call and, if it outlives `delay`, race a duplicate against it"""
+    structured = kwargs["response_format"] is not None
+    primary = track_submission("llm_hedge", HEDGE_EXECUTOR.submit(in_current_context(_dispatch), provider, kwargs))
+    pending = {primary}
+
+    done, _ = wait(pending, timeout=delay)
+    if not done and HEDGING.try_acquire():
+        target = _hedge_target(provider)
+        logger.info(f"{stage} call still running after {delay:.2f}s, hedging on {target}")
+        pending.add(track_submission("llm_hedge", HEDGE_EXECUTOR.submit(in_current_context(_dispatch), target, kwargs)))
+
+    # The losing call cannot be cancelled mid-flight; it finishes in the background and is discarded
+    errors = []
+    fallback = None
+    while pending:
+        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            try:
+                result = future.result()
+            except Exception as e:
+                errors.append(e)
+                continue
+            result.hedged = future is not primary
+            if _is_valid(result, structured):
+                return result
+            fallback = fallback or result
+
+    if fallback is not None:
+        return fallback
+    raise errors[0]
+
+def _run_attempt(token: CancelToken, provider: str, kwargs: dict) -> LLMResult:
+    bind_token(token)
+    return _dispatch(provider, kwargs)
+
+def _complete_hedged_stream(provider: str, kwargs: dict, delay: float, stage: str) -> LLMResult:
+    """Run a streamed call and, if no text arrives within `delay`, race a second stream against it"""
+    race = _StreamRace(kwargs["on_text"])
+    attempts = {}
+
+    def submit(target: str) -> None:
+        attempt = len(attempts)
+        token, on_text = race.attempt(attempt)
+        future = HEDGE_EXECUTOR.submit(in_current_context(_run_attempt), token, target, dict(kwargs, on_text=on_text))
+        future.add_done_callback(lambda _: race.progress.set())
+        attempts[track_submission("llm_hedge", future)] = attempt
+
+    submit(provider)
+    if not race.progress.wait(delay) and HEDGING.try_acquire():
+        target = _hedge_target(provider)
+        logger.info(f"{stage} stream has no first token after {delay:.2f}s, hedging on {target}")
+        submit(target)
+
+    errors = {}
+    pending = set(attempts)
+    while pending:
+        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            attempt = attempts[future]
+            try:
+                result = future.result()
+            except Exception as e:
+                errors[attempt] = e
+                continue
+            # An attempt that finished without streaming any text can still win
+            if race.claim(attempt):
+                result.hedged = attempt != 0
+                return result
+
+    # The winner's error if its stream broke off, else the first attempt's
+    raise errors.get(race.winner, errors.get(0, next(iter(errors.values()))))
+
+def _record_metrics(stage: str, tier: str, result: LLMResult, elapsed: float) -> None:
+    LLM_CALL_SECONDS.labels(stage=stage, tier=tier).observe(elapsed)
+    tokens = LLM_TOKENS.labels
+    # Cached tokens are a subset of the prompt tokens; "prompt" counts only the uncached ones
+    tokens(stage, result.provider, result.model, "prompt").inc(max(result.prompt_tokens - result.cached_tokens, 0))
+    tokens(stage, result.provider, result.model, "cached").inc(result.cached_tokens)
+    tokens(stage, result.provider, result.model, "completion").inc(result.completion_tokens)
+
+def complete_chat(
+    messages: List[dict],
+    tier: str = "strong",
+    provider: str = "openai",
+    response_format: Optional[dict] = None,
+    max_tokens: Optional[int] = None,
+    temperature: float = 0.3,
+    cache_key: Optional[str] = None,
+    stage: Optional[str] = None,
+    on_text: Optional[Callable[[str], None]] = None
+) -> LLMResult:
+    """
+    Run a chat completion on the requested provider. With provider="auto" the router picks
+    the provider with the best recent p95 latency and error rate, and fails over to the
+    next one when a call fails. With hedging enabled, calls for a stage that run past the
+    stage's observed p90 latency are duplicated and the first valid result is kept.
+    With `on_text` the response is streamed and each text delta is passed to it as it
+    arrives; streamed calls are hedged when no text has arrived by the stage's p90 time to
+    first token, and only the stream that delivers text first reaches `on_text`.
+    Raises RequestCancelled without calling out once the request has been cancelled.
+    """
+    check_cancelled()
+    kwargs = dict(
+        messages=messages,
+        tier=tier,
+        response_format=response_format,
+        max_tokens=max_tokens,
+        temperature=temperature,
+        cache_key=cache_key,
+        on_text=on_text
+    )
+
+    stage_key = f"{stage}:{tier}" if stage else None
+    delay = None
+    if stage_key:
+        if on_text is not None:
+            kwargs["on_text"] = _FirstTokenTimer(stage_key, on_text)
+        if HEDGE_ENABLED:
+            delay = HEDGING.delay(stage_key if on_text is None else _first_token_key(stage_key))
+    HEDGING.record_call()
+
+    started = time.monotonic()
+    with span("llm.chat", {
+        "llm.stage": stage,
+        "llm.tier": tier,
+        "llm.requested_provider": provider,
+        "llm.streamed": on_text is not None,
+        "llm.prompt_chars": sum(len(message["content"]) for message in messages)
+    }):
+        if delay is None:
+            result = _dispatch(provider, kwargs)
+        elif on_text is None:
+            result = _complete_hedged(provider, kwargs, delay, stage)
+        else:
+            result = _complete_hedged_stream(provider, kwargs, delay, stage)
+        set_span_attributes({
+            "llm.provider": result.provider,
+            "llm.model": result.model,
+            "llm.prompt_tokens": result.prompt_tokens,
+            "llm.cached_tokens": result.cached_tokens,
+            "llm.completion_tokens": result.completion_tokens,
+            "llm.hedged": result.hedged,
+            "llm.response_chars": len(result.text or "")
+        })
+
+    elapsed = time.monotonic() - started
+    if stage_key:
+        HEDGING.record_latency(stage_key, elapsed)
+    _record_metrics(stage or "unknown", tier, result, elapsed)
+    return result
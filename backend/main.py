@@ -1,32 +1,121 @@
-from fastapi import FastAPI, HTTPException, Depends, UploadFile, File, Form
+from fastapi import FastAPI, HTTPException, Depends, UploadFile, File, Form, Header, Query, Response
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
+from starlette.concurrency import run_in_threadpool
 from pydantic import BaseModel, HttpUrl, Field
-from typing import Optional, Literal, List, Dict, Union
+from typing import Optional, Literal, List, Dict, Union, Any, Callable
 import os
 import re
+import asyncio
+import logging
 import tempfile
 import shutil
 import math
+import difflib
 from dotenv import load_dotenv
 import openai
-import google.generativeai as genai
-import requests
 import json
 import yt_dlp
 import ffmpeg
 from enum import Enum
-import PyPDF2
-import io
+import hashlib
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+from contextlib import contextmanager
+from transcript_compaction import compact_transcript, preload_tokenizer
+from rate_limiter import call_with_rate_limit
+from llm_providers import LLMResult, complete_chat, get_openai_client
+from streaming_json import JSONArrayItemParser
+from schema_registry import SCHEMAS, ItemError, validate_item, validate_items
+from analysis_similarity import SimilarityReport, compare_documents
+from pdf_extraction import extract_text as extract_pdf_text
+from downloads import DOWNLOADER, DownloadError
+from admission import AdmissionMiddleware
+from cancellation import CancellationMiddleware, RequestCancelled, check_cancelled, interrupt_on_cancel
+from latency_budget import BudgetExceeded, BudgetReport, BudgetStage, LatencyBudget, run_stage
+from responses import CompressionMiddleware, dumps, encode_model, parse_fields, projected_response
+from single_flight import SINGLE_FLIGHT, request_fingerprint
+from metrics import RequestMetricsMiddleware, render_metrics, track_submission
+from tracing import TracingMiddleware, in_current_context, set_span_attributes, stage_span
+from transcript_stats import TranscriptScan, TranscriptStatistics, format_statistics_facts, scan_transcript
+
+# Setup logging
+logger = logging.getLogger("interview-analysis")
 
 # Load environment variables
 load_dotenv(".env.local")
 
+# Model cascade for the structured analysis stages: a fast model does the first
+# pass and only low-confidence, invalid or borderline items go to the strong model.
+# The models behind each tier are configured per provider in llm_providers.
+CASCADE_ENABLED = os.getenv("CASCADE_ENABLED", "true").lower() == "true"
+CASCADE_MIN_CONFIDENCE = float(os.getenv("CASCADE_MIN_CONFIDENCE", "60"))
+CASCADE_BORDERLINE_SCORES = [
+    float(score) for score in os.getenv("CASCADE_BORDERLINE_SCORES", "50,70").split(",") if score.strip()
+]
+CASCADE_BORDERLINE_MARGIN = float(os.getenv("CASCADE_BORDERLINE_MARGIN", "5"))
+
+# Prompt-prefix caching: transcript calls share a stable system block and the transcript
+# as their leading messages, so the provider can reuse the cached prefix across stages
+PROMPT_CACHE_KEY_ENABLED = os.getenv("PROMPT_CACHE_KEY_ENABLED", "true").lower() == "true"
+# Optional head start for the first parallel analysis stage so it writes the prefix cache before
+# the others read it; off by default since it adds up to this much latency to every analysis
+PROMPT_CACHE_STAGGER_SECONDS = float(os.getenv("PROMPT_CACHE_STAGGER_SECONDS", "0"))
+
+# Fused mode returns skills, Q&A, insights and the summary from a single structured call
+ANALYSIS_MODE = os.getenv("ANALYSIS_MODE", "parallel")
+FUSED_ANALYSIS_TIER = os.getenv("FUSED_ANALYSIS_TIER", "strong")
+
+# The executive summary is rendered from the structured results by default; set this
+# to have an LLM write it instead, at the cost of one more serial round trip
+LLM_SUMMARY_ENABLED = os.getenv("LLM_SUMMARY_ENABLED", "false").lower() == "true"
+
+# Stream the skills and Q&A responses so each item is validated as soon as it is generated
+STREAMING_ENABLED = os.getenv("STREAMING_ENABLED", "true").lower() == "true"
+
+# Transcript compaction: disfluency removal and a per-stage token budget. Stages with
+# the same budget receive identical text, which keeps the shared prompt prefix cacheable.
+COMPACTION_ENABLED = os.getenv("COMPACTION_ENABLED", "true").lower() == "true"
+COMPACTION_TOKEN_BUDGET = int(os.getenv("COMPACTION_TOKEN_BUDGET", "60000"))
+COMPACTION_STAGE_BUDGETS = {
+    stage: int(os.getenv(f"COMPACTION_TOKEN_BUDGET_{stage.upper()}", COMPACTION_TOKEN_BUDGET))
+    for stage in ("format", "skills", "qa", "insights", "fused")
+}
+
+# Audio uploads are streamed to disk in chunks and rejected once they pass the limit
+MAX_UPLOAD_BYTES = int(os.getenv("MAX_UPLOAD_BYTES", str(100 * 1024 * 1024)))
+UPLOAD_CHUNK_BYTES = 1024 * 1024
+
 app = FastAPI(
     title="AI Interview Analysis API",
     description="Comprehensive AI-powered interview analysis with skill assessment and insights",
     version="2.0.0"
 )
 
+@app.on_event("startup")
+async def load_tokenizer():
+    # Token counts drive compaction and rate limiting; fetch the encoding now, not on the first request
+    await run_in_threadpool(preload_tokenizer)
+
+@app.on_event("shutdown")
+async def close_download_session():
+    await DOWNLOADER.close()
+
+_api_paths: set = set()
+
+def _endpoint_label(path: str) -> str:
+    """Metric label for a request path; unknown paths share one label to bound cardinality"""
+    if not _api_paths:
+        _api_paths.update(route.path for route in app.routes)
+    return path if path in _api_paths else "other"
+
+# Memory- and CPU-aware queueing for the heavy endpoints, inside CORS so 429s carry its headers
+app.add_middleware(AdmissionMiddleware)
+# Client disconnects and deadlines cancel the request's work, including while it is queued
+app.add_middleware(CancellationMiddleware, endpoint_label=_endpoint_label)
+# gzip/brotli for complete JSON responses; streamed responses pass through
+app.add_middleware(CompressionMiddleware)
+
 # CORS middleware for web applications
 app.add_middleware(
     CORSMiddleware,
@@ -36,6 +125,11 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Request latency and in-flight gauges for /metrics
+app.add_middleware(RequestMetricsMiddleware, endpoint_label=_endpoint_label)
+# Root tracing span and Server-Timing header for every request
+app.add_middleware(TracingMiddleware)
+
 # Enums for structured responses
 class SkillLevel(str, Enum):
     BEGINNER = "Beginner"
@@ -88,16 +182,68 @@ class InterviewInsights(BaseModel):
     hiring_recommendation: str
     next_steps: List[str] = Field(default_factory=list)
 
+# Envelopes for the structured LLM responses
+class SkillAssessmentBatch(BaseModel):
+    assessments: List[SkillAssessment]
+
+class QAExtraction(BaseModel):
+    qa_pairs: List[QuestionAnswer]
+
+class FusedAnalysis(BaseModel):
+    assessments: List[SkillAssessment]
+    qa_pairs: List[QuestionAnswer]
+    insights: InterviewInsights
+    analysis_summary: str
+
+class CascadeDecision(BaseModel):
+    stage: str
+    item: str
+    tier: Literal["fast", "strong"]
+    provider: str
+    model: str
+    reason: Optional[str] = Field(None, description="Why the item was escalated to the strong model")
+
+class TokenUsage(BaseModel):
+    stage: str
+    provider: str
+    model: str
+    prompt_tokens: int = 0
+    cached_tokens: int = Field(0, description="Prompt tokens served from the provider's prefix cache")
+    completion_tokens: int = 0
+    hedged: bool = Field(False, description="Whether a hedge request returned this result")
+
+class TranscriptCompaction(BaseModel):
+    stage: str
+    original_tokens: int
+    compacted_tokens: int
+    token_budget: Optional[int] = None
+    truncated: bool = Field(False, description="Whether the transcript had to be cut to fit the budget")
+
+class ValidationIssue(BaseModel):
+    stage: str
+    index: Optional[int] = Field(None, description="Position of the item in the model's response, when it was part of a list")
+    field: str
+    message: str
+
+class AnalysisMetadata(BaseModel):
+    analysis_mode: Literal["parallel", "fused"] = "parallel"
+    analysis_seconds: Optional[float] = Field(None, description="Wall time of the analysis and summary stages")
+    cascade_decisions: List[CascadeDecision] = Field(default_factory=list)
+    token_usage: List[TokenUsage] = Field(default_factory=list)
+    transcript_compaction: List[TranscriptCompaction] = Field(default_factory=list)
+    validation_issues: List[ValidationIssue] = Field(default_factory=list)
+    budget: Optional[BudgetReport] = Field(None, description="How the caller's latency budget was spent, when one was given")
+
 class TranscriptRequest(BaseModel):
     video_url: str
-    ai_provider: Literal["openai", "gemini"] = "openai"
+    ai_provider: Literal["openai", "gemini", "auto"] = "openai"
     format_prompt: Optional[str] = "Please format this transcript into a clear, well-structured summary with key points and main topics."
 
 class InterviewAnalysisRequest(BaseModel):
     skills_to_assess: List[str] = Field(..., description="Comma-separated skills to assess")
     job_role: Optional[str] = "Software Developer"
     company_name: Optional[str] = "Company"
-    ai_provider: Literal["openai", "gemini"] = "openai"
+    ai_provider: Literal["openai", "gemini", "auto"] = "openai"
 
 class ComprehensiveAnalysisResponse(BaseModel):
     video_id: Optional[str] = None
@@ -110,8 +256,15 @@ class ComprehensiveAnalysisResponse(BaseModel):
     # Enhanced analysis
     skill_assessments: List[SkillAssessment]
     questions_and_answers: List[QuestionAnswer]
-    interview_insights: InterviewInsights
-    analysis_summary: str
+    interview_insights: Optional[InterviewInsights]
+    analysis_summary: Optional[str]
+    transcript_statistics: Optional[TranscriptStatistics] = None
+    analysis_metadata: Optional[AnalysisMetadata] = None
+    pending_sections: List[str] = Field(
+        default_factory=list,
+        description="Sections not (fully) ready within the latency budget: formatted_transcript (raw text returned), "
+                    "skill_assessments and questions_and_answers (items finished so far), interview_insights, analysis_summary"
+    )
 
 class TranscriptResponse(BaseModel):
     video_id: Optional[str] = None
@@ -136,6 +289,12 @@ class ComparisonSummary(BaseModel):
     key_similarities: List[str]
     key_differences: List[str]
 
+class ComparisonNarrative(BaseModel):
+    # The agreement score is computed locally; the model only writes the narrative
+    overall_comparison: str
+    key_similarities: List[str]
+    key_differences: List[str]
+
 class DetailedComparison(BaseModel):
     category: str
     original: str
@@ -148,10 +307,14 @@ class ComparisonRecommendations(BaseModel):
     ai_strengths: List[str]
     improvement_suggestions: List[str]
 
+class DetailedComparisonList(BaseModel):
+    detailed_comparison: List[DetailedComparison]
+
 class ComparisonResponse(BaseModel):
     summary: ComparisonSummary
     detailed_comparison: List[DetailedComparison]
     recommendations: ComparisonRecommendations
+    local_similarity: Optional[SimilarityReport] = None
 
 # Utility functions
 def extract_video_id_from_url(url: str) -> Optional[str]:
@@ -168,12 +331,12 @@ def extract_video_id_from_url(url: str) -> Optional[str]:
     
     return None
 
+@stage_span("download")
 def download_audio_from_url(video_url: str) -> str:
     """Download audio from video URL using yt-dlp"""
+    # Create temporary directory
+    temp_dir = tempfile.mkdtemp()
     try:
-        # Create temporary directory
-        temp_dir = tempfile.mkdtemp()
-        
         # Configure yt-dlp options with error handling
         ydl_opts = {
             'format': 'bestaudio/best',
@@ -185,12 +348,17 @@ def download_audio_from_url(video_url: str) -> str:
             }],
             'quiet': True,
             'no_warnings': True,
+            # Stop downloading and converting once the request is cancelled
+            'progress_hooks': [lambda _: check_cancelled()],
+            'postprocessor_hooks': [lambda _: check_cancelled()],
         }
         
         with yt_dlp.YoutubeDL(ydl_opts) as ydl:
             try:
                 info = ydl.extract_info(video_url, download=True)
             except Exception as download_error:
+                # yt-dlp wraps what the hooks raise; report the cancellation itself
+                check_cancelled()
                 raise Exception(f"Download failed: {str(download_error)}")
             
         # Find the downloaded file
@@ -204,9 +372,22 @@ def download_audio_from_url(video_url: str) -> str:
             
         return audio_files[0]  # Return the first audio file found
         
+    except RequestCancelled:
+        shutil.rmtree(temp_dir, ignore_errors=True)
+        raise
     except Exception as e:
+        shutil.rmtree(temp_dir, ignore_errors=True)
         raise HTTPException(status_code=400, detail=f"Could not download audio from {video_url}. Error: {str(e)}")
 
+def probe_audio_duration(audio_file_path: str) -> Optional[float]:
+    """Audio duration in seconds from ffprobe, or None when it cannot be read"""
+    try:
+        probe = ffmpeg.probe(audio_file_path)
+        return float(probe['streams'][0]['duration'])
+    except Exception:
+        return None
+
+@stage_span("split")
 def split_audio_file(audio_file_path: str, max_size_mb: int = 25) -> List[str]:
     """Split audio file into chunks if it's larger than max_size_mb"""
     file_size = os.path.getsize(audio_file_path)
@@ -218,13 +399,8 @@ def split_audio_file(audio_file_path: str, max_size_mb: int = 25) -> List[str]:
     # Calculate number of chunks needed
     num_chunks = math.ceil(file_size / max_size_bytes)
     
-    # Get audio duration using ffmpeg
-    try:
-        probe = ffmpeg.probe(audio_file_path)
-        duration = float(probe['streams'][0]['duration'])
-    except:
-        # Fallback: estimate based on file size
-        duration = file_size / (128 * 1024 / 8)  # Assume 128kbps
+    # Get audio duration using ffmpeg, falling back to an estimate based on file size (assume 128kbps)
+    duration = probe_audio_duration(audio_file_path) or file_size / (128 * 1024 / 8)
     
     chunk_duration = duration / num_chunks
     
@@ -238,30 +414,38 @@ def split_audio_file(audio_file_path: str, max_size_mb: int = 25) -> List[str]:
         chunk_file = os.path.join(temp_dir, f"{base_name}_chunk_{i+1}.mp3")
         
         try:
-            (
+            process = (
                 ffmpeg
                 .input(audio_file_path, ss=start_time, t=chunk_duration)
                 .output(chunk_file, acodec='mp3', audio_bitrate='128k')
                 .overwrite_output()
-                .run(quiet=True)
+                .run_async(pipe_stdout=True, pipe_stderr=True)
             )
+            # ffmpeg is killed as soon as the request is cancelled
+            with interrupt_on_cancel(process.kill):
+                _, stderr = process.communicate()
+            if process.returncode != 0:
+                raise ffmpeg.Error('ffmpeg', None, stderr)
             chunk_files.append(chunk_file)
         except Exception as e:
             # Clean up on error
-            for cf in chunk_files:
+            for cf in chunk_files + [chunk_file]:
                 if os.path.exists(cf):
                     os.remove(cf)
+            if isinstance(e, RequestCancelled):
+                raise
             raise Exception(f"Failed to split audio file: {str(e)}")
     
     return chunk_files
 
+@stage_span("transcribe")
 def transcribe_with_whisper(audio_file_path: str) -> tuple[str, int]:
     """Transcribe audio file using OpenAI Whisper API, handling large files"""
     api_key = os.getenv("OPENAI_API_KEY")
     if not api_key:
         raise HTTPException(status_code=500, detail="OpenAI API key not configured.")
     
-    client = openai.OpenAI(api_key=api_key)
+    client = get_openai_client(api_key)
     
     try:
         # Split file if needed
@@ -271,19 +455,29 @@ def transcribe_with_whisper(audio_file_path: str) -> tuple[str, int]:
         for i, chunk_file in enumerate(chunk_files):
             print(f"Transcribing chunk {i+1}/{len(chunk_files)}...")
             
-            with open(chunk_file, "rb") as audio_file:
-                response = client.audio.transcriptions.create(
-                    model="whisper-1",
-                    file=audio_file,
-                    response_format="text"
-                )
-                transcriptions.append(response)
+            def transcribe_chunk():
+                # Reopen the chunk on every attempt so retries upload the whole file
+                with open(chunk_file, "rb") as audio_file:
+                    return client.audio.transcriptions.create(
+                        model="whisper-1",
+                        file=audio_file,
+                        response_format="text"
+                    )
+            
+            with stage_span("whisper_chunk", {
+                "audio.chunk_index": i,
+                "audio.chunk_count": len(chunk_files),
+                "audio.chunk_bytes": os.path.getsize(chunk_file)
+            }):
+                transcriptions.append(call_with_rate_limit("openai_audio", transcribe_chunk))
         
         # Combine all transcriptions
         full_transcript = " ".join(transcriptions)
         
         return full_transcript, len(chunk_files)
         
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Whisper transcription error: {str(e)}")
     finally:
@@ -296,7 +490,7 @@ def transcribe_with_whisper(audio_file_path: str) -> tuple[str, int]:
             temp_dir = os.path.dirname(audio_file_path) if audio_file_path else None
             if temp_dir and os.path.exists(temp_dir):
                 for file in os.listdir(temp_dir):
-                    if file.endswith('_chunk_') and file.endswith('.mp3'):
+                    if '_chunk_' in file and file.endswith('.mp3'):
                         chunk_path = os.path.join(temp_dir, file)
                         if os.path.exists(chunk_path):
                             os.remove(chunk_path)
@@ -309,94 +503,231 @@ def transcribe_with_whisper(audio_file_path: str) -> tuple[str, int]:
         except Exception as cleanup_error:
             print(f"Warning: Cleanup failed: {cleanup_error}")
 
-def format_with_openai(transcript: str, prompt: str) -> str:
-    """Format transcript using OpenAI API"""
-    api_key = os.getenv("OPENAI_API_KEY")
-    if not api_key:
-        raise HTTPException(status_code=500, detail="OpenAI API key not configured.")
-    
-    client = openai.OpenAI(api_key=api_key)
+ANALYSIS_SYSTEM_PROMPT = """You are an expert technical interviewer and senior HR professional working with interview transcripts.
+The next message contains the full interview transcript. The final message describes the task for this request.
+Base every judgement on evidence in the transcript, be objective, fair and constructive, and follow the task's output instructions exactly."""
+
+def prepare_stage_transcript(transcript: str, stage: str, metadata: Optional[AnalysisMetadata] = None) -> str:
+    """Compact the transcript for a stage and record its before/after token counts"""
+    if not COMPACTION_ENABLED:
+        return transcript
     
+    result = compact_transcript(transcript, COMPACTION_STAGE_BUDGETS.get(stage) or None)
+    if metadata is not None:
+        metadata.transcript_compaction.append(TranscriptCompaction(
+            stage=stage,
+            original_tokens=result.original_tokens,
+            compacted_tokens=result.compacted_tokens,
+            token_budget=result.token_budget,
+            truncated=result.truncated
+        ))
+    return result.text
+
+def build_transcript_messages(transcript: str, task: str) -> List[dict]:
+    """Build chat messages with the shared, cacheable prefix (system block + transcript) followed by the task"""
+    return [
+        {"role": "system", "content": ANALYSIS_SYSTEM_PROMPT},
+        {"role": "user", "content": f"Interview transcript:\n{transcript}"},
+        {"role": "user", "content": task}
+    ]
+
+def transcript_cache_key(transcript: str) -> Optional[str]:
+    """Cache key that routes calls sharing a transcript to the same prompt cache"""
+    if not PROMPT_CACHE_KEY_ENABLED:
+        return None
+    return f"transcript-{hashlib.sha256(transcript.encode('utf-8')).hexdigest()[:32]}"
+
+@contextmanager
+def budgeted_metadata(metadata: Optional[AnalysisMetadata], budget: Optional[LatencyBudget]):
+    """
+    Metadata for work running under a latency budget. The work records into its own copy, merged into
+    metadata when the block exits: when the work returns, or when it is abandoned at its deadline.
+    Records made by abandoned work as it winds down are dropped, so they never reach a built response.
+    """
+    if metadata is None or budget is None:
+        yield metadata
+        return
+    stage_metadata = AnalysisMetadata()
+    try:
+        yield stage_metadata
+    finally:
+        for field in ("cascade_decisions", "token_usage", "transcript_compaction", "validation_issues"):
+            getattr(metadata, field).extend(list(getattr(stage_metadata, field)))
+
+def _record_token_usage(metadata: Optional[AnalysisMetadata], stage: str, result: LLMResult) -> None:
+    """Record prompt, cached and completion token counts reported by the provider"""
+    if metadata is None:
+        return
+    metadata.token_usage.append(TokenUsage(
+        stage=stage,
+        provider=result.provider,
+        model=result.model,
+        prompt_tokens=result.prompt_tokens,
+        cached_tokens=result.cached_tokens,
+        completion_tokens=result.completion_tokens,
+        hedged=result.hedged
+    ))
+
+@stage_span("format")
+def format_transcript(
+    transcript: str,
+    prompt: str,
+    provider: str = "openai",
+    metadata: Optional[AnalysisMetadata] = None
+) -> str:
+    """Format transcript with the requested AI provider"""
     # Check if transcript is already in a dialog format
     is_dialog_format = any(line.strip().startswith(("Interviewer:", "Candidate:")) for line in transcript.split("\n"))
     
     try:
         # If already in dialog format, use a modified prompt
         if is_dialog_format:
-            system_message = "You are a helpful assistant that formats interview transcripts while preserving the dialog structure."
-            modified_prompt = f"Format this interview transcript maintaining the Interviewer/Candidate structure. Keep all content, just improve the formatting for readability:\n\n{transcript}"
+            task = "Format this interview transcript maintaining the Interviewer/Candidate structure. Keep all content, just improve the formatting for readability."
         else:
-            system_message = "You are a helpful assistant that formats and summarizes video transcripts."
-            modified_prompt = f"{prompt}\n\nTranscript:\n{transcript}"
-        
-        response = client.chat.completions.create(
-            model="gpt-4.1",
-            messages=[
-                {"role": "system", "content": system_message},
-                {"role": "user", "content": modified_prompt}
-            ],
+            task = prompt
+        
+        # The transcript goes first so the prefix is cached for later calls on the same model: this runs
+        # on the strong model, so it serves the analysis stages only with the cascade off (otherwise
+        # their first pass runs on the fast model) and when compaction leaves the transcript unchanged
+        result = complete_chat(
+            messages=build_transcript_messages(transcript, task),
+            tier="strong",
+            provider=provider,
+            stage="format",
             max_tokens=1500,
-            temperature=0.7
+            temperature=0.7,
+            cache_key=transcript_cache_key(transcript)
         )
-        return response.choices[0].message.content
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"OpenAI API error: {str(e)}")
-
-def format_with_gemini(transcript: str, prompt: str) -> str:
-    """Format transcript using Google Gemini API"""
-    api_key = os.getenv("GEMINI_API_KEY")
-    if not api_key:
-        raise HTTPException(status_code=500, detail="Gemini API key not configured.")
-    
-    genai.configure(api_key=api_key)
-    
-    try:
-        model = genai.GenerativeModel('gemini-pro')
-        full_prompt = f"{prompt}\n\nTranscript:\n{transcript}"
-        response = model.generate_content(full_prompt)
-        return response.text
+        _record_token_usage(metadata, "format", result)
+        return result.text
+    except HTTPException:
+        raise
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Gemini API error: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"{provider} API error: {str(e)}")
 
 def validate_transcript_quality(transcript: str) -> tuple[bool, str]:
     """Validate if transcript is suitable for analysis"""
-    if not transcript or len(transcript.strip()) < 50:
-        return False, "Transcript too short for meaningful analysis"
-    
-    # Check for common transcription errors
-    error_indicators = ["[inaudible]", "[unclear]", "???", "..." * 3]
-    error_count = sum(transcript.lower().count(indicator) for indicator in error_indicators)
-    
-    if error_count > len(transcript.split()) * 0.1:  # More than 10% errors
-        return False, "Transcript quality too poor for reliable analysis"
-    
-    # Check if it looks like an interview (has questions or dialogue markers)
-    question_indicators = ["?", "tell me", "describe", "explain", "what is", "how do", "why", "Interviewer:", "interviewer:", "Candidate:", "candidate:"]
-    has_questions = any(indicator in transcript.lower() for indicator in question_indicators)
+    scan = scan_transcript(transcript)
+    return scan.is_valid, scan.message
+
+def conversation_statistics(
+    scan: TranscriptScan,
+    formatted_transcript: str,
+    duration_seconds: Optional[float] = None
+) -> TranscriptStatistics:
+    """
+    Statistics from the raw transcript scan, or from the formatted transcript when only the
+    formatted one has speaker labels (e.g. Whisper output)
+    """
+    if scan.statistics.speaker_turns or not formatted_transcript:
+        return scan.statistics
+    return scan_transcript(formatted_transcript, duration_seconds).statistics
+
+# Structured-output schemas, derived once from the response models
+SKILL_ASSESSMENT_RESPONSE_FORMAT = SCHEMAS.register("skill_assessment", SkillAssessmentBatch)
+QA_PAIRS_RESPONSE_FORMAT = SCHEMAS.register("qa_extraction", QAExtraction)
+INTERVIEW_INSIGHTS_RESPONSE_FORMAT = SCHEMAS.register("interview_insights", InterviewInsights)
+FUSED_ANALYSIS_RESPONSE_FORMAT = SCHEMAS.register("fused_interview_analysis", FusedAnalysis)
+SUMMARY_COMPARISON_RESPONSE_FORMAT = SCHEMAS.register("summary_comparison", ComparisonNarrative)
+DETAILED_COMPARISON_RESPONSE_FORMAT = SCHEMAS.register("detailed_comparison", DetailedComparisonList)
+COMPARISON_RECOMMENDATIONS_RESPONSE_FORMAT = SCHEMAS.register("comparison_recommendations", ComparisonRecommendations)
+
+def _is_borderline_score(score: float) -> bool:
+    """Check whether a score sits close enough to a decision boundary to need a second opinion"""
+    return any(abs(score - threshold) <= CASCADE_BORDERLINE_MARGIN for threshold in CASCADE_BORDERLINE_SCORES)
+
+def _record_cascade_decision(
+    metadata: Optional[AnalysisMetadata],
+    stage: str,
+    item: str,
+    tier: str,
+    result: LLMResult,
+    reason: Optional[str] = None
+) -> None:
+    """Record which model tier handled an item of a structured stage"""
+    if metadata is None:
+        return
+    metadata.cascade_decisions.append(CascadeDecision(
+        stage=stage,
+        item=item[:120],
+        tier=tier,
+        provider=result.provider,
+        model=result.model,
+        reason=reason
+    ))
+
+def _record_validation_issues(
+    metadata: Optional[AnalysisMetadata],
+    stage: str,
+    errors: List[ItemError],
+    index: Optional[int] = None
+) -> None:
+    """Report schema violations in a model response, keeping them in the analysis metadata"""
+    for error in errors:
+        item_index = error.index if error.index is not None else index
+        logger.warning(f"Invalid {stage} item {item_index if item_index is not None else ''}: {error.field}: {error.message}")
+        if metadata is not None:
+            metadata.validation_issues.append(ValidationIssue(
+                stage=stage, index=item_index, field=error.field, message=error.message
+            ))
+
+def _stream_items(key: str, on_item: Callable[[dict], None]) -> tuple[JSONArrayItemParser, Optional[Callable[[str], None]]]:
+    """Parser for one array of a structured response, and the text callback that streams into it"""
+    parser = JSONArrayItemParser(key, on_item)
+    return parser, parser.feed if STREAMING_ENABLED else None
+
+def _request_skill_assessments(
+    transcript: str,
+    skills: List[str],
+    job_role: str,
+    tier: str,
+    on_item: Callable[[dict], None],
+    provider: str = "openai",
+    metadata: Optional[AnalysisMetadata] = None
+) -> LLMResult:
+    """Request skill assessments from a single model, passing each raw assessment to on_item as it closes"""
+    skills_text = ", ".join(skills)
+    parser, on_text = _stream_items("assessments", on_item)
     
-    # Look for conversation patterns - alternating speakers
-    lines = transcript.split("\n")
-    speaker_pattern = any(
-        (i > 0 and 
-         ((line.startswith("Interviewer:") and lines[i-1].startswith("Candidate:")) or
-          (line.startswith("Candidate:") and lines[i-1].startswith("Interviewer:"))))
-        for i, line in enumerate(lines)
+    result = complete_chat(
+        messages=build_transcript_messages(transcript, f"""This is a {job_role} interview. Assess each skill based on evidence in the transcript.
+Be thorough but fair in your assessment. If a skill is not mentioned or demonstrated, mark it as 'Not Demonstrated'.
+Provide specific evidence and actionable recommendations.
+
+Please assess the following skills based on the interview transcript: {skills_text}
+
+For each skill, provide:
+1. Skill level (Beginner/Intermediate/Advanced/Expert/Not Demonstrated)
+2. Confidence score (0-100)
+3. Specific evidence from the transcript
+4. Recommendations for improvement"""),
+        tier=tier,
+        provider=provider,
+        stage="skills",
+        response_format=SKILL_ASSESSMENT_RESPONSE_FORMAT,
+        temperature=0.3,
+        cache_key=transcript_cache_key(transcript),
+        on_text=on_text
     )
+    if on_text is None:
+        parser.feed(result.text)
     
-    # Accept either question indicators or speaker patterns
-    if not (has_questions or speaker_pattern):
-        return False, "Content does not appear to be an interview format"
-    
-    return True, "Transcript quality acceptable"
+    _record_token_usage(metadata, "skills", result)
+    return result
 
-def assess_skills_with_openai(transcript: str, skills: List[str], job_role: str = "Software Developer") -> List[SkillAssessment]:
-    """Assess skills from transcript using OpenAI structured response"""
-    api_key = os.getenv("OPENAI_API_KEY")
-    if not api_key:
-        raise HTTPException(status_code=500, detail="OpenAI API key not configured.")
-    
-    client = openai.OpenAI(api_key=api_key)
-    
+@stage_span("skills")
+def assess_skills(
+    transcript: str,
+    skills: List[str],
+    job_role: str = "Software Developer",
+    provider: str = "openai",
+    metadata: Optional[AnalysisMetadata] = None,
+    on_result: Optional[Callable[[str, Any], None]] = None
+) -> List[SkillAssessment]:
+    """
+    Assess skills from transcript using a structured response, escalating uncertain skills to the strong model.
+    Assessments that need no escalation are passed to on_result while the response is still streaming.
+    """
     # Validate inputs
     if not skills:
         raise HTTPException(status_code=400, detail="No skills provided for assessment")
@@ -404,102 +735,83 @@ def assess_skills_with_openai(transcript: str, skills: List[str], job_role: str
     if len(skills) > 20:
         raise HTTPException(status_code=400, detail="Too many skills requested. Maximum 20 skills allowed.")
     
-    skills_text = ", ".join(skills)
+    first_tier = "fast" if CASCADE_ENABLED else "strong"
+    requested = {skill.strip().lower() for skill in skills}
     
     try:
-        response = client.chat.completions.create(
-            model="gpt-4.1",  # Using GPT-4 for better analysis
-            messages=[
-                {
-                    "role": "system", 
-                    "content": f"""You are an expert technical interviewer analyzing a {job_role} interview transcript. 
-                    Assess each skill based on evidence in the transcript. Be thorough but fair in your assessment.
-                    If a skill is not mentioned or demonstrated, mark it as 'Not Demonstrated'.
-                    Provide specific evidence and actionable recommendations."""
-                },
-                {
-                    "role": "user", 
-                    "content": f"""Please assess the following skills based on this interview transcript: {skills_text}
-
-For each skill, provide:
-1. Skill level (Beginner/Intermediate/Advanced/Expert/Not Demonstrated)
-2. Confidence score (0-100)
-3. Specific evidence from the transcript
-4. Recommendations for improvement
-
-Transcript:
-{transcript}"""
-                }
-            ],
-            response_format={
-                "type": "json_schema",
-                "json_schema": {
-                    "name": "skill_assessment",
-                    "schema": {
-                        "type": "object",
-                        "properties": {
-                            "assessments": {
-                                "type": "array",
-                                "items": {
-                                    "type": "object",
-                                    "properties": {
-                                        "skill": {"type": "string"},
-                                        "level": {
-                                            "type": "string",
-                                            "enum": ["Beginner", "Intermediate", "Advanced", "Expert", "Not Demonstrated"]
-                                        },
-                                        "confidence_score": {"type": "number", "minimum": 0, "maximum": 100},
-                                        "evidence": {"type": "string"},
-                                        "recommendations": {"type": "string"}
-                                    },
-                                    "required": ["skill", "level", "confidence_score", "evidence", "recommendations"]
-                                }
-                            }
-                        },
-                        "required": ["assessments"]
-                    }
-                }
-            },
-            temperature=0.3
-        )
-        
-        result = json.loads(response.choices[0].message.content)
+        # Validated assessments keyed by normalized skill name, with the tier that produced them
+        assessments_by_skill: Dict[str, tuple[SkillAssessment, str]] = {}
+        emitted = set()
+        
+        def accept(assessment: dict, tier: str) -> None:
+            parsed, errors = validate_item(SkillAssessment, assessment)
+            if parsed is None:
+                _record_validation_issues(metadata, "skills", errors)
+                return
+            key = parsed.skill.strip().lower()
+            assessments_by_skill[key] = (parsed, tier)
+            final = tier == "strong" or parsed.confidence_score >= CASCADE_MIN_CONFIDENCE
+            if on_result and final and key in requested and key not in emitted:
+                emitted.add(key)
+                on_result("skill_assessment", parsed)
+        
+        # First pass: every requested skill
+        results = {first_tier: _request_skill_assessments(
+            transcript, skills, job_role, first_tier, lambda item: accept(item, first_tier), provider, metadata
+        )}
+        
+        # Decide which skills need the strong model
+        escalations = {}
+        for skill in skills:
+            entry = assessments_by_skill.get(skill.strip().lower())
+            if entry is None:
+                escalations[skill] = "missing or invalid in first pass"
+            elif CASCADE_ENABLED and entry[0].confidence_score < CASCADE_MIN_CONFIDENCE:
+                escalations[skill] = f"confidence {entry[0].confidence_score:.0f} below {CASCADE_MIN_CONFIDENCE:.0f}"
+        
+        if CASCADE_ENABLED and escalations:
+            logger.info("Escalating %d skill(s) to the strong model: %s", len(escalations), escalations)
+            results["strong"] = _request_skill_assessments(
+                transcript, list(escalations), job_role, "strong", lambda item: accept(item, "strong"), provider, metadata
+            )
         
-        # Validate and convert to SkillAssessment objects
         skill_assessments = []
-        for assessment in result["assessments"]:
-            try:
-                skill_assessments.append(SkillAssessment(**assessment))
-            except Exception as e:
-                print(f"Error parsing skill assessment: {e}")
+        for skill in skills:
+            entry = assessments_by_skill.get(skill.strip().lower())
+            if entry is None:
                 continue
+            parsed, tier = entry
+            # Low-confidence first-pass results the strong model did not replace are final now
+            if on_result and skill.strip().lower() not in emitted:
+                emitted.add(skill.strip().lower())
+                on_result("skill_assessment", parsed)
+            _record_cascade_decision(
+                metadata, "skills", skill, tier, results[tier],
+                escalations.get(skill) if tier == "strong" and CASCADE_ENABLED else None
+            )
+            skill_assessments.append(parsed)
         
         return skill_assessments
         
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Skill assessment error: {str(e)}")
 
-def extract_qa_with_openai(transcript: str, job_role: str = "Software Developer") -> List[QuestionAnswer]:
-    """Extract and grade Q&A pairs from transcript using OpenAI"""
-    api_key = os.getenv("OPENAI_API_KEY")
-    if not api_key:
-        raise HTTPException(status_code=500, detail="OpenAI API key not configured.")
+def _request_qa_pairs(
+    transcript: str,
+    job_role: str,
+    tier: str,
+    on_item: Callable[[dict], None],
+    provider: str = "openai",
+    metadata: Optional[AnalysisMetadata] = None
+) -> LLMResult:
+    """Request graded Q&A pairs extracted from the transcript, passing each raw pair to on_item as it closes"""
+    parser, on_text = _stream_items("qa_pairs", on_item)
     
-    client = openai.OpenAI(api_key=api_key)
-    
-    try:
-        response = client.chat.completions.create(
-            model="gpt-4.1",
-            messages=[
-                {
-                    "role": "system", 
-                    "content": f"""You are an expert technical interviewer analyzing a {job_role} interview transcript.
-                    Extract all question-answer pairs and grade each answer objectively.
-                    Focus on technical accuracy, communication clarity, and completeness of answers."""
-                },
-                {
-                    "role": "user", 
-                    "content": f"""Please extract all interview questions and answers from this transcript and grade each answer.
+    result = complete_chat(
+        messages=build_transcript_messages(transcript, f"""This is a {job_role} interview. Extract all question-answer pairs and grade each answer objectively.
+Focus on technical accuracy, communication clarity, and completeness of answers.
 
 For each Q&A pair, provide:
 1. The exact question asked
@@ -508,89 +820,182 @@ For each Q&A pair, provide:
 4. Numerical score (0-100)
 5. Detailed feedback
 6. Key points the candidate covered well
-7. Areas for improvement
+7. Areas for improvement"""),
+        tier=tier,
+        provider=provider,
+        stage="qa",
+        response_format=QA_PAIRS_RESPONSE_FORMAT,
+        temperature=0.3,
+        cache_key=transcript_cache_key(transcript),
+        on_text=on_text
+    )
+    if on_text is None:
+        parser.feed(result.text)
+    
+    _record_token_usage(metadata, "qa", result)
+    return result
 
-Transcript:
-{transcript}"""
-                }
-            ],
-            response_format={
-                "type": "json_schema",
-                "json_schema": {
-                    "name": "qa_extraction",
-                    "schema": {
-                        "type": "object",
-                        "properties": {
-                            "qa_pairs": {
-                                "type": "array",
-                                "items": {
-                                    "type": "object",
-                                    "properties": {
-                                        "question": {"type": "string"},
-                                        "answer": {"type": "string"},
-                                        "grade": {
-                                            "type": "string",
-                                            "enum": ["Excellent", "Good", "Average", "Below Average", "Poor"]
-                                        },
-                                        "score": {"type": "number", "minimum": 0, "maximum": 100},
-                                        "feedback": {"type": "string"},
-                                        "key_points_covered": {
-                                            "type": "array",
-                                            "items": {"type": "string"}
-                                        },
-                                        "areas_for_improvement": {
-                                            "type": "array",
-                                            "items": {"type": "string"}
-                                        }
-                                    },
-                                    "required": ["question", "answer", "grade", "score", "feedback", "key_points_covered", "areas_for_improvement"]
-                                }
-                            }
-                        },
-                        "required": ["qa_pairs"]
-                    }
-                }
-            },
-            temperature=0.3
-        )
-        
-        result = json.loads(response.choices[0].message.content)
+def _request_qa_regrade(
+    transcript: str,
+    qa_pairs: List[dict],
+    job_role: str,
+    tier: str,
+    on_item: Callable[[dict], None],
+    provider: str = "openai",
+    metadata: Optional[AnalysisMetadata] = None
+) -> LLMResult:
+    """Ask a model to re-grade specific Q&A pairs, passing each re-graded pair to on_item as it closes"""
+    pairs_text = "\n\n".join(
+        f"{i}. Question: {pair.get('question', '')}\n   Answer: {pair.get('answer', '')}"
+        for i, pair in enumerate(qa_pairs, 1)
+    )
+    parser, on_text = _stream_items("qa_pairs", on_item)
+    
+    result = complete_chat(
+        messages=build_transcript_messages(transcript, f"""This is a {job_role} interview. Re-grade each of the following question-answer pairs objectively,
+using the full transcript as context. Focus on technical accuracy, communication clarity, and completeness of answers.
+Return exactly one entry per pair, in the same order, repeating each question exactly as given.
+
+Pairs to grade:
+{pairs_text}"""),
+        tier=tier,
+        provider=provider,
+        stage="qa",
+        response_format=QA_PAIRS_RESPONSE_FORMAT,
+        temperature=0.3,
+        cache_key=transcript_cache_key(transcript),
+        on_text=on_text
+    )
+    if on_text is None:
+        parser.feed(result.text)
+    
+    _record_token_usage(metadata, "qa", result)
+    return result
+
+def _normalize_question(question: str) -> str:
+    return " ".join(re.sub(r"[^\w\s]", " ", str(question).lower()).split())
+
+def _match_question(question: str, candidates: Dict[int, str], cutoff: float = 0.8) -> Optional[int]:
+    """Index of the candidate (normalized question) a re-graded question refers to, if any"""
+    question = _normalize_question(question)
+    if not question or not candidates:
+        return None
+    for i, candidate in candidates.items():
+        if candidate == question:
+            return i
+    # Allow for small rewordings, but never guess between dissimilar questions
+    best, best_ratio = None, cutoff
+    for i, candidate in candidates.items():
+        ratio = difflib.SequenceMatcher(None, candidate, question).ratio()
+        if ratio >= best_ratio:
+            best, best_ratio = i, ratio
+    return best
+
+@stage_span("qa")
+def extract_qa_pairs(
+    transcript: str,
+    job_role: str = "Software Developer",
+    provider: str = "openai",
+    metadata: Optional[AnalysisMetadata] = None,
+    on_result: Optional[Callable[[str, Any], None]] = None
+) -> List[QuestionAnswer]:
+    """
+    Extract and grade Q&A pairs from transcript, re-grading borderline answers with the strong model.
+    Pairs that need no re-grading are passed to on_result while the response is still streaming.
+    """
+    first_tier = "fast" if CASCADE_ENABLED else "strong"
+    
+    try:
+        # First pass: validate each pair as it closes and collect the ones that need the strong model
+        raw_pairs: List[dict] = []
+        qa_slots: List[Optional[QuestionAnswer]] = []
+        escalations = {}
+        
+        def accept_first_pass(qa: dict) -> None:
+            i = len(raw_pairs)
+            raw_pairs.append(qa)
+            parsed, errors = validate_item(QuestionAnswer, qa)
+            if parsed is None:
+                _record_validation_issues(metadata, "qa", errors, i)
+                escalations[i] = "schema violation in first pass"
+            else:
+                if CASCADE_ENABLED and _is_borderline_score(parsed.score):
+                    escalations[i] = f"borderline score {parsed.score:.0f}"
+                elif on_result:
+                    on_result("question_answer", parsed)
+            qa_slots.append(parsed)
+        
+        first_result = _request_qa_pairs(transcript, job_role, first_tier, accept_first_pass, provider, metadata)
+        
+        regraded = {}
+        if CASCADE_ENABLED and escalations:
+            logger.info("Re-grading %d Q&A pair(s) with the strong model", len(escalations))
+            indices = list(escalations)
+            
+            # The strong model may skip or reorder pairs, so re-grades are matched by question
+            unmatched = {i: _normalize_question(raw_pairs[i].get("question", "")) for i in indices}
+            
+            def accept_regrade(qa: dict) -> None:
+                i = _match_question(qa.get("question", "") if isinstance(qa, dict) else "", unmatched)
+                if i is None:
+                    logger.warning("Ignoring a re-graded Q&A pair that matches none of the escalated questions")
+                    return
+                del unmatched[i]
+                parsed, errors = validate_item(QuestionAnswer, qa)
+                if parsed is None:
+                    _record_validation_issues(metadata, "qa", errors, i)
+                    return
+                regraded[i] = parsed
+                if on_result:
+                    on_result("question_answer", parsed)
+            
+            strong_result = _request_qa_regrade(
+                transcript, [raw_pairs[i] for i in indices], job_role, "strong", accept_regrade, provider, metadata
+            )
         
-        # Validate and convert to QuestionAnswer objects
         qa_pairs = []
-        for qa in result["qa_pairs"]:
-            try:
-                qa_pairs.append(QuestionAnswer(**qa))
-            except Exception as e:
-                print(f"Error parsing Q&A pair: {e}")
+        for i, parsed in enumerate(qa_slots):
+            if i in regraded:
+                parsed = regraded[i]
+                _record_cascade_decision(metadata, "qa", parsed.question, "strong", strong_result, escalations[i])
+            elif parsed is not None:
+                _record_cascade_decision(metadata, "qa", parsed.question, first_tier, first_result)
+                # Borderline first-pass pairs whose re-grade failed are final now
+                if on_result and i in escalations:
+                    on_result("question_answer", parsed)
+            else:
                 continue
+            qa_pairs.append(parsed)
         
         return qa_pairs
         
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Q&A extraction error: {str(e)}")
 
-def generate_interview_insights_with_openai(transcript: str, job_role: str = "Software Developer") -> InterviewInsights:
-    """Generate comprehensive interview insights using OpenAI"""
-    api_key = os.getenv("OPENAI_API_KEY")
-    if not api_key:
-        raise HTTPException(status_code=500, detail="OpenAI API key not configured.")
-    
-    client = openai.OpenAI(api_key=api_key)
-    
-    try:
-        response = client.chat.completions.create(
-            model="gpt-4.1",
-            messages=[
-                {
-                    "role": "system", 
-                    "content": f"""You are a senior HR professional and technical interview expert analyzing a {job_role} interview.
-                    Provide comprehensive insights covering all aspects of the candidate's performance.
-                    Be objective, constructive, and provide actionable feedback."""
-                },
-                {
-                    "role": "user", 
-                    "content": f"""Please provide a comprehensive analysis of this interview transcript including:
+def _statistics_facts(statistics: Optional[TranscriptStatistics]) -> str:
+    """Measured transcript statistics appended to a task, after the cached transcript prefix"""
+    if statistics is None:
+        return ""
+    return f"""
+
+Measured conversation statistics (computed from the transcript; use these figures for the
+duration, speech pattern and engagement analysis instead of estimating them):
+{format_statistics_facts(statistics)}"""
+
+def _request_interview_insights(
+    transcript: str,
+    job_role: str,
+    tier: str,
+    provider: str = "openai",
+    metadata: Optional[AnalysisMetadata] = None,
+    statistics: Optional[TranscriptStatistics] = None
+) -> tuple[dict, LLMResult]:
+    """Request raw interview insights from a single model"""
+    result = complete_chat(
+        messages=build_transcript_messages(transcript, f"""This is a {job_role} interview. Provide comprehensive insights covering all aspects of the candidate's performance,
+with actionable feedback. Please include:
 
 1. Overall performance metrics (0-100 scores)
 2. Strengths and weaknesses
@@ -598,74 +1003,218 @@ def generate_interview_insights_with_openai(transcript: str, job_role: str = "So
 4. Cultural fit indicators
 5. Red flags or concerns
 6. Hiring recommendation
-7. Next steps
+7. Next steps{_statistics_facts(statistics)}"""),
+        tier=tier,
+        provider=provider,
+        stage="insights",
+        response_format=INTERVIEW_INSIGHTS_RESPONSE_FORMAT,
+        temperature=0.3,
+        cache_key=transcript_cache_key(transcript)
+    )
+    
+    _record_token_usage(metadata, "insights", result)
+    return json.loads(result.text), result
 
-Transcript:
-{transcript}"""
-                }
-            ],
-            response_format={
-                "type": "json_schema",
-                "json_schema": {
-                    "name": "interview_insights",
-                    "schema": {
-                        "type": "object",
-                        "properties": {
-                            "overall_performance_score": {"type": "number", "minimum": 0, "maximum": 100},
-                            "communication_clarity": {"type": "number", "minimum": 0, "maximum": 100},
-                            "technical_depth": {"type": "number", "minimum": 0, "maximum": 100},
-                            "problem_solving_ability": {"type": "number", "minimum": 0, "maximum": 100},
-                            "confidence_level": {"type": "number", "minimum": 0, "maximum": 100},
-                            "strengths": {"type": "array", "items": {"type": "string"}},
-                            "weaknesses": {"type": "array", "items": {"type": "string"}},
-                            "key_achievements_mentioned": {"type": "array", "items": {"type": "string"}},
-                            "red_flags": {"type": "array", "items": {"type": "string"}},
-                            "interview_duration_analysis": {"type": "string"},
-                            "speech_patterns": {"type": "string"},
-                            "engagement_level": {"type": "string"},
-                            "cultural_fit_indicators": {"type": "array", "items": {"type": "string"}},
-                            "hiring_recommendation": {"type": "string"},
-                            "next_steps": {"type": "array", "items": {"type": "string"}}
-                        },
-                        "required": [
-                            "overall_performance_score", "communication_clarity", "technical_depth",
-                            "problem_solving_ability", "confidence_level", "strengths", "weaknesses",
-                            "key_achievements_mentioned", "red_flags", "interview_duration_analysis",
-                            "speech_patterns", "engagement_level", "cultural_fit_indicators",
-                            "hiring_recommendation", "next_steps"
-                        ]
-                    }
-                }
-            },
-            temperature=0.3
-        )
+@stage_span("insights")
+def generate_interview_insights(
+    transcript: str,
+    job_role: str = "Software Developer",
+    provider: str = "openai",
+    metadata: Optional[AnalysisMetadata] = None,
+    statistics: Optional[TranscriptStatistics] = None
+) -> InterviewInsights:
+    """Generate comprehensive interview insights, escalating invalid or borderline results"""
+    first_tier = "fast" if CASCADE_ENABLED else "strong"
+    
+    try:
+        raw_insights, result = _request_interview_insights(transcript, job_role, first_tier, provider, metadata, statistics)
+        
+        escalation_reason = None
+        insights, errors = validate_item(InterviewInsights, raw_insights)
+        if insights is None:
+            _record_validation_issues(metadata, "insights", errors)
+            if not CASCADE_ENABLED:
+                raise ValueError("response did not match the insights schema")
+            escalation_reason = "schema violation in first pass"
+        else:
+            if CASCADE_ENABLED and _is_borderline_score(insights.overall_performance_score):
+                escalation_reason = f"borderline overall score {insights.overall_performance_score:.0f}"
+        
+        if escalation_reason:
+            logger.info("Escalating interview insights to the strong model: %s", escalation_reason)
+            raw_insights, result = _request_interview_insights(transcript, job_role, "strong", provider, metadata, statistics)
+            insights, errors = validate_item(InterviewInsights, raw_insights)
+            if insights is None:
+                _record_validation_issues(metadata, "insights", errors)
+                raise ValueError("response did not match the insights schema")
+            _record_cascade_decision(metadata, "insights", "interview_insights", "strong", result, escalation_reason)
+        else:
+            _record_cascade_decision(metadata, "insights", "interview_insights", first_tier, result)
         
-        result = json.loads(response.choices[0].message.content)
-        return InterviewInsights(**result)
+        return insights
         
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Interview insights generation error: {str(e)}")
 
-def generate_analysis_summary_with_openai(
-    skill_assessments: List[SkillAssessment], 
-    qa_pairs: List[QuestionAnswer], 
+def run_parallel_analysis(
+    transcript: str,
+    skills: List[str],
+    job_role: str,
+    provider: str = "openai",
+    metadata: Optional[AnalysisMetadata] = None,
+    on_result: Optional[Callable[[str, Any], None]] = None,
+    statistics: Optional[TranscriptStatistics] = None,
+    stage: Optional[BudgetStage] = None
+) -> tuple[List[SkillAssessment], List[QuestionAnswer], Optional[InterviewInsights]]:
+    """
+    Run the skills, Q&A and insights stages concurrently, passing results to on_result as they are ready.
+    Under a budget stage, stages still running at its deadline are cancelled: skills and Q&A return the
+    items finished so far, insights None, and the sections are marked pending.
+    """
+    finished: Dict[str, list] = {"skill_assessment": [], "question_answer": []}
+    
+    def collect(kind: str, item: Any) -> None:
+        if kind in finished:
+            finished[kind].append(item)
+        if on_result:
+            on_result(kind, item)
+    
+    bind = stage.bind if stage is not None else (lambda func: func)
+    forward = collect if on_result or stage is not None else None
+    executor = ThreadPoolExecutor(max_workers=3)
+    try:
+        skills_transcript = prepare_stage_transcript(transcript, "skills", metadata)
+        qa_transcript = prepare_stage_transcript(transcript, "qa", metadata)
+        insights_transcript = prepare_stage_transcript(transcript, "insights", metadata)
+        
+        # Submit all analysis tasks. Their first passes run on the same model, so when a later stage
+        # shares the skills stage's transcript it can start slightly later and read the cached prefix.
+        skill_future = track_submission("analysis", executor.submit(
+            in_current_context(bind(assess_skills)), skills_transcript, skills, job_role, provider, metadata, forward
+        ))
+        if PROMPT_CACHE_STAGGER_SECONDS > 0 and skills_transcript in (qa_transcript, insights_transcript):
+            wait([skill_future], timeout=PROMPT_CACHE_STAGGER_SECONDS)
+        qa_future = track_submission("analysis", executor.submit(
+            in_current_context(bind(extract_qa_pairs)), qa_transcript, job_role, provider, metadata, forward
+        ))
+        insights_future = track_submission("analysis", executor.submit(
+            in_current_context(bind(generate_interview_insights)), insights_transcript, job_role, provider, metadata,
+            statistics
+        ))
+        if on_result:
+            def emit_insights(future):
+                if not future.cancelled() and future.exception() is None:
+                    on_result("interview_insights", future.result())
+            insights_future.add_done_callback(emit_insights)
+        
+        if stage is None:
+            # Wait for all to complete
+            return skill_future.result(), qa_future.result(), insights_future.result()
+        
+        # Wait until the stage deadline and keep what is ready
+        done = stage.wait([skill_future, qa_future, insights_future])
+        stage.finish("completed" if len(done) == 3 else "partial" if done else "timed_out")
+        pending = []
+        if skill_future in done:
+            skill_assessments = skill_future.result()
+        else:
+            skill_assessments = list(finished["skill_assessment"])
+            pending.append("skill_assessments")
+        if qa_future in done:
+            questions_and_answers = qa_future.result()
+        else:
+            questions_and_answers = list(finished["question_answer"])
+            pending.append("questions_and_answers")
+        if insights_future in done:
+            interview_insights = insights_future.result()
+        else:
+            interview_insights = None
+            pending.append("interview_insights")
+        stage.budget.mark_pending(*pending)
+        return skill_assessments, questions_and_answers, interview_insights
+    finally:
+        # Under a budget, stages cancelled at the deadline wind down in the background
+        executor.shutdown(wait=stage is None, cancel_futures=stage is not None)
+
+def _join_items(items: List[str]) -> str:
+    """Join items as an English list, e.g. "a, b and c"."""
+    items = [item.strip().rstrip(".") for item in items if item and item.strip()]
+    if len(items) <= 1:
+        return "".join(items)
+    return f"{', '.join(items[:-1])} and {items[-1]}"
+
+@stage_span("summary")
+def render_analysis_summary(
+    skill_assessments: List[SkillAssessment],
+    qa_pairs: List[QuestionAnswer],
     insights: InterviewInsights,
     job_role: str = "Software Developer"
 ) -> str:
-    """Generate a comprehensive analysis summary"""
-    api_key = os.getenv("OPENAI_API_KEY")
-    if not api_key:
-        raise HTTPException(status_code=500, detail="OpenAI API key not configured.")
+    """Render the executive summary from the structured results with a fixed template, without an LLM call"""
+    avg_skill_score = sum(sa.confidence_score for sa in skill_assessments) / len(skill_assessments) if skill_assessments else 0
+    avg_qa_score = sum(qa.score for qa in qa_pairs) / len(qa_pairs) if qa_pairs else 0
+    
+    paragraphs = []
+    
+    # Scores
+    overview = (
+        f"The candidate for the {job_role} role achieved an overall performance score of "
+        f"{insights.overall_performance_score:.0f}/100, with communication clarity at {insights.communication_clarity:.0f}, "
+        f"technical depth at {insights.technical_depth:.0f} and problem-solving ability at {insights.problem_solving_ability:.0f}."
+    )
+    if skill_assessments:
+        overview += f" Across {len(skill_assessments)} assessed skills the average assessment confidence was {avg_skill_score:.1f}/100"
+        demonstrated = [sa.skill for sa in skill_assessments if sa.level in (SkillLevel.ADVANCED, SkillLevel.EXPERT)]
+        missing = [sa.skill for sa in skill_assessments if sa.level == SkillLevel.NOT_DEMONSTRATED]
+        overview += f", with advanced or expert ability shown in {_join_items(demonstrated)}" if demonstrated else ""
+        overview += f"; {_join_items(missing)} {'was' if len(missing) == 1 else 'were'} not demonstrated." if missing else "."
+    if qa_pairs:
+        strong_answers = sum(1 for qa in qa_pairs if qa.grade in (GradeLevel.EXCELLENT, GradeLevel.GOOD))
+        overview += (
+            f" {len(qa_pairs)} answered {'question' if len(qa_pairs) == 1 else 'questions'} averaged "
+            f"{avg_qa_score:.1f}/100, {strong_answers} of them graded good or excellent."
+        )
+    paragraphs.append(overview)
     
-    client = openai.OpenAI(api_key=api_key)
+    # Strengths, weaknesses and concerns
+    assessment = []
+    if insights.strengths:
+        assessment.append(f"Key strengths include {_join_items(insights.strengths[:3])}.")
+    if insights.weaknesses:
+        assessment.append(f"Areas for development include {_join_items(insights.weaknesses[:3])}.")
+    if insights.red_flags:
+        assessment.append(f"Concerns to follow up on: {_join_items(insights.red_flags[:3])}.")
+    if assessment:
+        paragraphs.append(" ".join(assessment))
     
+    # Recommendation
+    recommendation = f"Hiring recommendation: {insights.hiring_recommendation.strip()}"
+    if not recommendation.endswith((".", "!", "?")):
+        recommendation += "."
+    if insights.next_steps:
+        recommendation += f" Suggested next steps: {_join_items(insights.next_steps[:3])}."
+    paragraphs.append(recommendation)
+    
+    return "\n\n".join(paragraphs)
+
+@stage_span("summary")
+def generate_analysis_summary(
+    skill_assessments: List[SkillAssessment], 
+    qa_pairs: List[QuestionAnswer], 
+    insights: InterviewInsights,
+    job_role: str = "Software Developer",
+    provider: str = "openai",
+    metadata: Optional[AnalysisMetadata] = None
+) -> str:
+    """Generate a comprehensive analysis summary"""
     # Prepare summary data
     avg_skill_score = sum(sa.confidence_score for sa in skill_assessments) / len(skill_assessments) if skill_assessments else 0
     avg_qa_score = sum(qa.score for qa in qa_pairs) / len(qa_pairs) if qa_pairs else 0
     
     try:
-        response = client.chat.completions.create(
-            model="gpt-4.1",
+        result = complete_chat(
             messages=[
                 {
                     "role": "system", 
@@ -686,225 +1235,409 @@ Hiring Recommendation: {insights.hiring_recommendation}
 Please provide a 2-3 paragraph executive summary suitable for hiring managers."""
                 }
             ],
+            tier="strong",
+            provider=provider,
+            stage="summary",
             max_tokens=500,
             temperature=0.7
         )
         
-        return response.choices[0].message.content
+        _record_token_usage(metadata, "summary", result)
+        return result.text
         
     except Exception as e:
         return f"Summary generation failed: {str(e)}"
 
-def extract_text_from_pdf(file_content: bytes) -> str:
-    """Extract text from a PDF file using PyPDF2"""
+@stage_span("fused")
+def analyze_fused(
+    transcript: str,
+    skills: List[str],
+    job_role: str = "Software Developer",
+    provider: str = "openai",
+    metadata: Optional[AnalysisMetadata] = None,
+    statistics: Optional[TranscriptStatistics] = None
+) -> tuple[List[SkillAssessment], List[QuestionAnswer], InterviewInsights, str]:
+    """Produce skills, Q&A, insights and the executive summary from a single structured call"""
+    skills_text = ", ".join(skills)
+    
     try:
-        # Create a PDF reader object
-        pdf_reader = PyPDF2.PdfReader(io.BytesIO(file_content))
+        result = complete_chat(
+            messages=build_transcript_messages(transcript, f"""This is a {job_role} interview. Produce a complete analysis of the candidate in one response:
+
+1. assessments: assess each of these skills: {skills_text}. For each skill give the level (Beginner/Intermediate/Advanced/Expert/Not Demonstrated),
+   a confidence score (0-100), specific evidence from the transcript and recommendations for improvement.
+   If a skill is not mentioned or demonstrated, mark it as 'Not Demonstrated'.
+2. qa_pairs: extract every question-answer pair and grade each answer (Excellent/Good/Average/Below Average/Poor) with a 0-100 score,
+   detailed feedback, key points covered and areas for improvement.
+3. insights: overall performance metrics (0-100 scores), strengths and weaknesses, communication and technical analysis,
+   cultural fit indicators, red flags, hiring recommendation and next steps.
+4. analysis_summary: a 2-3 paragraph executive summary suitable for hiring managers.{_statistics_facts(statistics)}"""),
+            tier=FUSED_ANALYSIS_TIER,
+            provider=provider,
+            stage="fused",
+            response_format=FUSED_ANALYSIS_RESPONSE_FORMAT,
+            temperature=0.3,
+            cache_key=transcript_cache_key(transcript)
+        )
+        
+        _record_token_usage(metadata, "fused", result)
+        fused = json.loads(result.text)
+        
+        # Validate each section in bulk against the same models as the per-stage path
+        skill_assessments, errors = validate_items(SkillAssessment, fused["assessments"])
+        _record_validation_issues(metadata, "skills", errors)
+        for parsed in skill_assessments:
+            _record_cascade_decision(metadata, "skills", parsed.skill, FUSED_ANALYSIS_TIER, result)
         
-        # Extract text from all pages
-        text = []
-        for page in pdf_reader.pages:
-            text.append(page.extract_text())
+        qa_pairs, errors = validate_items(QuestionAnswer, fused["qa_pairs"])
+        _record_validation_issues(metadata, "qa", errors)
+        for parsed in qa_pairs:
+            _record_cascade_decision(metadata, "qa", parsed.question, FUSED_ANALYSIS_TIER, result)
         
-        # Join all text together
-        full_text = "\n".join(text)
+        insights, errors = validate_item(InterviewInsights, fused["insights"])
+        if insights is None:
+            _record_validation_issues(metadata, "insights", errors)
+            raise ValueError("response did not match the insights schema")
+        _record_cascade_decision(metadata, "insights", "interview_insights", FUSED_ANALYSIS_TIER, result)
         
-        # Basic cleanup
-        # Remove excessive newlines
-        full_text = re.sub(r'\n{3,}', '\n\n', full_text)
-        # Remove excessive whitespace
-        full_text = re.sub(r'\s{2,}', ' ', full_text)
+        return skill_assessments, qa_pairs, insights, fused["analysis_summary"]
         
-        return full_text.strip()
+    except HTTPException:
+        raise
     except Exception as e:
-        raise Exception(f"Failed to extract text from PDF: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Fused analysis error: {str(e)}")
 
-# Additional utility functions for PDF comparison
-def download_pdf_from_url(url: str) -> bytes:
-    """Download PDF file from URL"""
-    try:
-        response = requests.get(url)
-        if response.status_code != 200:
-            raise Exception(f"Failed to download PDF. Status code: {response.status_code}")
+ANALYSIS_SECTIONS = ("skill_assessments", "questions_and_answers", "interview_insights", "analysis_summary")
+
+def summarize_analysis(
+    skill_assessments: List[SkillAssessment],
+    questions_and_answers: List[QuestionAnswer],
+    interview_insights: InterviewInsights,
+    job_role: str,
+    provider: str = "openai",
+    metadata: Optional[AnalysisMetadata] = None,
+    budget: Optional[LatencyBudget] = None
+) -> str:
+    """The executive summary: written by an LLM when enabled and the budget allows, else rendered from the results"""
+    if LLM_SUMMARY_ENABLED:
+        logger.info("Generating analysis summary")
+        if budget is None:
+            return generate_analysis_summary(
+                skill_assessments, questions_and_answers, interview_insights, job_role, provider, metadata
+            )
+        stage = budget.stage("summary")
+        if stage.skipped:
+            stage.finish("skipped")
+        else:
+            try:
+                with budgeted_metadata(metadata, budget) as summary_metadata:
+                    return stage.call(
+                        generate_analysis_summary,
+                        skill_assessments, questions_and_answers, interview_insights, job_role, provider, summary_metadata
+                    )
+            except BudgetExceeded:
+                pass
+        # Out of budget: the rendered summary needs no further call
+    return render_analysis_summary(skill_assessments, questions_and_answers, interview_insights, job_role)
+
+def run_analysis(
+    transcript: str,
+    skills: List[str],
+    job_role: str,
+    analysis_mode: str = "parallel",
+    provider: str = "openai",
+    metadata: Optional[AnalysisMetadata] = None,
+    on_result: Optional[Callable[[str, Any], None]] = None,
+    statistics: Optional[TranscriptStatistics] = None,
+    budget: Optional[LatencyBudget] = None
+) -> tuple[List[SkillAssessment], List[QuestionAnswer], Optional[InterviewInsights], Optional[str]]:
+    """
+    Run the structured analysis and executive summary in the requested mode.
+    on_result receives ("skill_assessment" | "question_answer" | "interview_insights" | "analysis_summary", item)
+    as each result becomes final, from worker threads.
+    With a latency budget the analysis gets what remains of it; sections not ready by then come back
+    partial, or as None, and are marked pending on the budget.
+    """
+    started = time.perf_counter()
+    stage = budget.stage("analysis") if budget is not None else None
+    
+    if stage is not None and stage.skipped:
+        stage.finish("skipped")
+        budget.mark_pending(*ANALYSIS_SECTIONS)
+        result = ([], [], None, None)
+    elif analysis_mode == "fused":
+        logger.info("Performing fused analysis")
+        fused_transcript = prepare_stage_transcript(transcript, "fused", metadata)
+        if stage is None:
+            result = analyze_fused(fused_transcript, skills, job_role, provider, metadata, statistics)
+        else:
+            try:
+                with budgeted_metadata(metadata, budget) as fused_metadata:
+                    result = stage.call(analyze_fused, fused_transcript, skills, job_role, provider, fused_metadata, statistics)
+            except BudgetExceeded:
+                budget.mark_pending(*ANALYSIS_SECTIONS)
+                result = ([], [], None, None)
+        if on_result:
+            for assessment in result[0]:
+                on_result("skill_assessment", assessment)
+            for qa in result[1]:
+                on_result("question_answer", qa)
+            if result[2] is not None:
+                on_result("interview_insights", result[2])
+    else:
+        logger.info("Performing comprehensive analysis")
+        with budgeted_metadata(metadata, budget) as parallel_metadata:
+            skill_assessments, questions_and_answers, interview_insights = run_parallel_analysis(
+                transcript, skills, job_role, provider, parallel_metadata, on_result, statistics, stage
+            )
         
-        return response.content
-    except Exception as e:
-        raise HTTPException(status_code=400, detail=f"Failed to download PDF: {str(e)}")
+        if interview_insights is None:
+            # The summary is built on the insights
+            analysis_summary = None
+            budget.mark_pending("analysis_summary")
+        else:
+            analysis_summary = summarize_analysis(
+                skill_assessments, questions_and_answers, interview_insights, job_role, provider, metadata, budget
+            )
+        result = (skill_assessments, questions_and_answers, interview_insights, analysis_summary)
+    
+    if on_result and result[3] is not None:
+        on_result("analysis_summary", result[3])
+    
+    if metadata is not None:
+        metadata.analysis_mode = analysis_mode
+        metadata.analysis_seconds = round(time.perf_counter() - started, 3)
+    
+    return result
 
-def compare_analyses_with_openai(original_text: str, ai_text: str) -> ComparisonResponse:
-    """Compare two interview analysis texts using OpenAI"""
-    api_key = os.getenv("OPENAI_API_KEY")
-    if not api_key:
-        raise HTTPException(status_code=500, detail="OpenAI API key not configured.")
+async def save_upload(file: UploadFile, destination: str, max_bytes: int = MAX_UPLOAD_BYTES) -> tuple[int, str]:
+    """
+    Stream an upload to destination chunk by chunk, enforcing the size limit; returns the size
+    in bytes and the SHA-256 of the content
+    """
+    file_size = 0
+    digest = hashlib.sha256()
+    try:
+        with open(destination, "wb") as buffer:
+            while chunk := await file.read(UPLOAD_CHUNK_BYTES):
+                file_size += len(chunk)
+                if file_size > max_bytes:
+                    raise HTTPException(
+                        status_code=413,
+                        detail=f"File too large. Maximum size allowed is {max_bytes / (1024*1024):.0f}MB, but file is over {file_size / (1024*1024):.1f}MB"
+                    )
+                digest.update(chunk)
+                buffer.write(chunk)
+    except HTTPException:
+        os.remove(destination)
+        raise
+    return file_size, digest.hexdigest()
+
+def report_budget(budget: Optional[LatencyBudget], metadata: AnalysisMetadata) -> List[str]:
+    """Attach the budget decisions to the analysis metadata and return the pending sections"""
+    if budget is None:
+        return []
+    metadata.budget = budget.report()
+    return metadata.budget.pending
+
+async def run_coalesced(
+    endpoint: str,
+    fingerprint: str,
+    pipeline: Callable[[], Any],
+    idempotency_key: Optional[str] = None,
+    scratch_dir: Optional[str] = None
+) -> Any:
+    """
+    Run pipeline once for identical concurrent requests. The pipeline owns the leader's scratch
+    files; a request that joins another removes its own scratch_dir straight away.
+    """
+    leader = False
     
-    client = openai.OpenAI(api_key=api_key)
+    def start():
+        nonlocal leader
+        leader = True
+        return pipeline()
     
     try:
-        # Generate summary comparison
-        summary_response = client.chat.completions.create(
-            model="gpt-4.1",
-            messages=[
-                {
-                    "role": "system", 
-                    "content": """You are an expert at comparing interview analyses. 
-                    Compare the original human analysis with the AI-generated analysis of the same interview transcript.
-                    Provide a fair, objective comparison highlighting similarities, differences, strengths and weaknesses of each approach."""
-                },
-                {
-                    "role": "user", 
-                    "content": f"""I have two analyses of the same interview transcript:
-                    
-                    ORIGINAL HUMAN ANALYSIS:
-                    {original_text}
-                    
-                    AI-GENERATED ANALYSIS:
-                    {ai_text}
-                    
-                    Please provide a summary comparison with:
-                    1. Overall comparison
-                    2. Agreement score (0-100%)
-                    3. Key similarities (list)
-                    4. Key differences (list)"""
-                }
-            ],
-            response_format={
-                "type": "json_schema",
-                "json_schema": {
-                    "name": "summary_comparison",
-                    "schema": {
-                        "type": "object",
-                        "properties": {
-                            "overall_comparison": {"type": "string"},
-                            "agreement_score": {"type": "number", "minimum": 0, "maximum": 100},
-                            "key_similarities": {"type": "array", "items": {"type": "string"}},
-                            "key_differences": {"type": "array", "items": {"type": "string"}}
-                        },
-                        "required": ["overall_comparison", "agreement_score", "key_similarities", "key_differences"]
-                    }
-                }
+        return await SINGLE_FLIGHT.run(endpoint, fingerprint, start, idempotency_key)
+    finally:
+        if scratch_dir and not leader:
+            shutil.rmtree(scratch_dir, ignore_errors=True)
+
+@stage_span("pdf_parse")
+def extract_text_from_pdf(file_content: bytes) -> str:
+    """Extract text from a PDF file with the configured extraction backend, cached by file hash"""
+    try:
+        text = extract_pdf_text(file_content)
+        set_span_attributes({"pdf.bytes": len(file_content), "pdf.text_chars": len(text)})
+        return text
+    except Exception as e:
+        raise Exception(f"Failed to extract text from PDF: {str(e)}")
+
+# Additional utility functions for PDF comparison
+async def download_pdf_from_url(url: str) -> bytes:
+    """Download PDF file from URL over the pooled session, bounded in time and size"""
+    try:
+        result = await DOWNLOADER.fetch(url)
+        return result.content
+    except DownloadError as e:
+        raise HTTPException(status_code=e.status_code, detail=f"Failed to download PDF: {str(e)}")
+
+def _format_similarity(similarity: SimilarityReport) -> str:
+    """Locally computed similarity scores as prompt context for the narrative"""
+    lines = [f"Agreement score: {similarity.agreement_score}/100"]
+    for category in similarity.categories:
+        score = category.semantic_similarity if category.semantic_similarity is not None else category.lexical_similarity
+        if not category.present_in_original or not category.present_in_ai:
+            missing = "AI" if category.present_in_original else "original"
+            lines.append(f"- {category.category}: not covered by the {missing} analysis")
+        else:
+            lines.append(f"- {category.category}: similarity {score:.2f}")
+    return "\n".join(lines)
+
+def _request_summary_comparison(original_text: str, ai_text: str, similarity: SimilarityReport) -> dict:
+    """Overall comparison, similarities and differences, explaining the locally computed scores"""
+    response = complete_chat(
+        messages=[
+            {
+                "role": "system", 
+                "content": """You are an expert at comparing interview analyses. 
+                Compare the original human analysis with the AI-generated analysis of the same interview transcript.
+                Provide a fair, objective comparison highlighting similarities, differences, strengths and weaknesses of each approach."""
             },
-            temperature=0.5
-        )
-        
-        summary = json.loads(summary_response.choices[0].message.content)
-        
-        # Generate detailed category comparisons
-        detailed_response = client.chat.completions.create(
-            model="gpt-4.1",
-            messages=[
-                {
-                    "role": "system", 
-                    "content": """You are an expert at comparing interview analyses in detail.
-                    Compare the original human analysis with the AI-generated analysis across multiple categories.
-                    For each category, extract the relevant sections from each analysis and provide a detailed comparison."""
-                },
-                {
-                    "role": "user", 
-                    "content": f"""Compare these two analyses of the same interview transcript:
-                    
-                    ORIGINAL HUMAN ANALYSIS:
-                    {original_text}
-                    
-                    AI-GENERATED ANALYSIS:
-                    {ai_text}
-                    
-                    Please compare across these categories:
-                    1. Technical Skills Assessment
-                    2. Communication Skills
-                    3. Problem-solving Abilities
-                    4. Overall Performance
-                    5. Recommendations
-                    
-                    For each category, provide:
-                    - The relevant section from the original analysis
-                    - The relevant section from the AI analysis
-                    - A detailed comparison between them"""
-                }
-            ],
-            response_format={
-                "type": "json_schema",
-                "json_schema": {
-                    "name": "detailed_comparison",
-                    "schema": {
-                        "type": "object",
-                        "properties": {
-                            "detailed_comparison": {
-                                "type": "array",
-                                "items": {
-                                    "type": "object",
-                                    "properties": {
-                                        "category": {"type": "string"},
-                                        "original": {"type": "string"},
-                                        "ai_generated": {"type": "string"},
-                                        "comparison": {"type": "string"}
-                                    },
-                                    "required": ["category", "original", "ai_generated", "comparison"]
-                                }
-                            }
-                        },
-                        "required": ["detailed_comparison"]
-                    }
-                }
+            {
+                "role": "user", 
+                "content": f"""I have two analyses of the same interview transcript:
+                
+                ORIGINAL HUMAN ANALYSIS:
+                {original_text}
+                
+                AI-GENERATED ANALYSIS:
+                {ai_text}
+                
+                LOCALLY COMPUTED SIMILARITY:
+                {_format_similarity(similarity)}
+                
+                Please provide a summary comparison that explains these scores with:
+                1. Overall comparison
+                2. Key similarities (list)
+                3. Key differences (list)"""
+            }
+        ],
+        response_format=SUMMARY_COMPARISON_RESPONSE_FORMAT,
+        temperature=0.5,
+        stage="comparison_summary"
+    )
+    return json.loads(response.text)
+
+def _request_detailed_comparison(original_text: str, ai_text: str) -> dict:
+    """Category-by-category comparison of the two analyses"""
+    response = complete_chat(
+        messages=[
+            {
+                "role": "system", 
+                "content": """You are an expert at comparing interview analyses in detail.
+                Compare the original human analysis with the AI-generated analysis across multiple categories.
+                For each category, extract the relevant sections from each analysis and provide a detailed comparison."""
             },
-            temperature=0.5
-        )
-        
-        detailed = json.loads(detailed_response.choices[0].message.content)
-        
-        # Generate recommendations
-        recommendations_response = client.chat.completions.create(
-            model="gpt-4.1",
-            messages=[
-                {
-                    "role": "system", 
-                    "content": """You are an expert at evaluating interview analyses.
-                    After comparing the original human analysis with the AI-generated analysis, provide recommendations and insights.
-                    Be fair, objective, and constructive."""
-                },
-                {
-                    "role": "user", 
-                    "content": f"""Based on these two analyses of the same interview transcript:
-                    
-                    ORIGINAL HUMAN ANALYSIS:
-                    {original_text}
-                    
-                    AI-GENERATED ANALYSIS:
-                    {ai_text}
-                    
-                    Please provide:
-                    1. Overall recommendation and insights
-                    2. Strengths of the original human analysis
-                    3. Strengths of the AI-generated analysis
-                    4. Suggestions for improving both approaches"""
-                }
-            ],
-            response_format={
-                "type": "json_schema",
-                "json_schema": {
-                    "name": "comparison_recommendations",
-                    "schema": {
-                        "type": "object",
-                        "properties": {
-                            "overall": {"type": "string"},
-                            "original_strengths": {"type": "array", "items": {"type": "string"}},
-                            "ai_strengths": {"type": "array", "items": {"type": "string"}},
-                            "improvement_suggestions": {"type": "array", "items": {"type": "string"}}
-                        },
-                        "required": ["overall", "original_strengths", "ai_strengths", "improvement_suggestions"]
-                    }
-                }
+            {
+                "role": "user", 
+                "content": f"""Compare these two analyses of the same interview transcript:
+                
+                ORIGINAL HUMAN ANALYSIS:
+                {original_text}
+                
+                AI-GENERATED ANALYSIS:
+                {ai_text}
+                
+                Please compare across these categories:
+                1. Technical Skills Assessment
+                2. Communication Skills
+                3. Problem-solving Abilities
+                4. Overall Performance
+                5. Recommendations
+                
+                For each category, provide:
+                - The relevant section from the original analysis
+                - The relevant section from the AI analysis
+                - A detailed comparison between them"""
+            }
+        ],
+        response_format=DETAILED_COMPARISON_RESPONSE_FORMAT,
+        temperature=0.5,
+        stage="comparison_detailed"
+    )
+    return json.loads(response.text)
+
+def _request_comparison_recommendations(original_text: str, ai_text: str) -> dict:
+    """Recommendations and the strengths of each analysis"""
+    response = complete_chat(
+        messages=[
+            {
+                "role": "system", 
+                "content": """You are an expert at evaluating interview analyses.
+                After comparing the original human analysis with the AI-generated analysis, provide recommendations and insights.
+                Be fair, objective, and constructive."""
             },
-            temperature=0.5
-        )
+            {
+                "role": "user", 
+                "content": f"""Based on these two analyses of the same interview transcript:
+                
+                ORIGINAL HUMAN ANALYSIS:
+                {original_text}
+                
+                AI-GENERATED ANALYSIS:
+                {ai_text}
+                
+                Please provide:
+                1. Overall recommendation and insights
+                2. Strengths of the original human analysis
+                3. Strengths of the AI-generated analysis
+                4. Suggestions for improving both approaches"""
+            }
+        ],
+        response_format=COMPARISON_RECOMMENDATIONS_RESPONSE_FORMAT,
+        temperature=0.5,
+        stage="comparison_recommendations"
+    )
+    return json.loads(response.text)
+
+@stage_span("comparison")
+def compare_analyses_with_openai(original_text: str, ai_text: str) -> ComparisonResponse:
+    """
+    Compare two interview analysis texts. The agreement score comes from the local similarity
+    engine; the three independent LLM calls only write the narrative and run concurrently.
+    """
+    try:
+        similarity = compare_documents(original_text, ai_text)
         
-        recommendations = json.loads(recommendations_response.choices[0].message.content)
+        with ThreadPoolExecutor(max_workers=3) as executor:
+            summary_future = track_submission(
+                "comparison", executor.submit(in_current_context(_request_summary_comparison), original_text, ai_text, similarity)
+            )
+            detailed_future = track_submission(
+                "comparison", executor.submit(in_current_context(_request_detailed_comparison), original_text, ai_text)
+            )
+            recommendations_future = track_submission(
+                "comparison", executor.submit(in_current_context(_request_comparison_recommendations), original_text, ai_text)
+            )
+            
+            summary = summary_future.result()
+            detailed = detailed_future.result()
+            recommendations = recommendations_future.result()
+        
+        detailed_comparison, errors = validate_items(DetailedComparison, detailed["detailed_comparison"])
+        _record_validation_issues(None, "comparison", errors)
         
         return ComparisonResponse(
-            summary=ComparisonSummary(**summary),
-            detailed_comparison=detailed["detailed_comparison"],
-            recommendations=ComparisonRecommendations(**recommendations)
+            summary=ComparisonSummary(**summary, agreement_score=similarity.agreement_score),
+            detailed_comparison=detailed_comparison,
+            recommendations=ComparisonRecommendations(**recommendations),
+            local_similarity=similarity
         )
         
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Comparison analysis error: {str(e)}")
 
@@ -917,6 +1650,12 @@ async def root():
         message="AI Video Transcript API is running"
     )
 
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    """Prometheus metrics: stage latencies, tokens, cache hits, retries, in-flight requests and queue depths"""
+    body, content_type = render_metrics()
+    return Response(content=body, media_type=content_type)
+
 @app.get("/health", response_model=HealthResponse)
 async def health_check():
     """Detailed health check"""
@@ -931,7 +1670,7 @@ async def extract_and_format_transcript(request: TranscriptRequest):
     Extract transcript from video URL using Whisper and format it using AI
     
     - **video_url**: Video URL (YouTube, etc.)
-    - **ai_provider**: Choose between 'openai' or 'gemini'
+    - **ai_provider**: Choose between 'openai', 'gemini' or 'auto' (fastest healthy provider)
     - **format_prompt**: Custom prompt for AI formatting (optional)
     """
     try:
@@ -940,16 +1679,18 @@ async def extract_and_format_transcript(request: TranscriptRequest):
         
         # Use Whisper API for transcription
         print("Using Whisper API for transcription...")
-        audio_file_path = download_audio_from_url(request.video_url)
-        raw_transcript, num_chunks = transcribe_with_whisper(audio_file_path)
+        audio_file_path = await run_in_threadpool(download_audio_from_url, request.video_url)
+        try:
+            raw_transcript, num_chunks = await run_in_threadpool(transcribe_with_whisper, audio_file_path)
+        finally:
+            # Transcription removes the download itself; this covers a request cancelled before that
+            shutil.rmtree(os.path.dirname(audio_file_path), ignore_errors=True)
         
         # Format with AI
-        if request.ai_provider == "openai":
-            formatted_response = format_with_openai(raw_transcript, request.format_prompt)
-        elif request.ai_provider == "gemini":
-            formatted_response = format_with_gemini(raw_transcript, request.format_prompt)
-        else:
-            raise HTTPException(status_code=400, detail="Invalid AI provider. Choose 'openai' or 'gemini'")
+        formatted_response = await run_in_threadpool(
+            format_transcript,
+            prepare_stage_transcript(raw_transcript, "format"), request.format_prompt, request.ai_provider
+        )
         
         return TranscriptResponse(
             video_id=video_id,
@@ -959,20 +1700,22 @@ async def extract_and_format_transcript(request: TranscriptRequest):
             file_chunks=num_chunks
         )
         
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error: {str(e)}")
 
 @app.post("/upload-audio", response_model=TranscriptResponse)
 async def upload_and_transcribe_audio(
     file: UploadFile = File(...),
-    ai_provider: Literal["openai", "gemini"] = "openai",
+    ai_provider: Literal["openai", "gemini", "auto"] = "openai",
     format_prompt: str = "Please format this transcript into a clear, well-structured summary with key points and main topics."
 ):
     """
     Upload audio file and transcribe using Whisper, then format with AI
     
     - **file**: Audio file (mp3, wav, m4a, etc.) - Max size: 100MB
-    - **ai_provider**: Choose between 'openai' or 'gemini'
+    - **ai_provider**: Choose between 'openai', 'gemini' or 'auto' (fastest healthy provider)
     - **format_prompt**: Custom prompt for AI formatting
     """
     try:
@@ -983,42 +1726,22 @@ async def upload_and_transcribe_audio(
         if file_extension not in allowed_extensions:
             raise HTTPException(status_code=400, detail=f"Unsupported file type. Allowed: {', '.join(allowed_extensions)}")
         
-        # Check file size (100MB limit)
-        max_file_size = 100 * 1024 * 1024  # 100MB in bytes
-        file_size = 0
-        file_content = b""
-        
-        # Read file in chunks to get size and content
-        chunk_size = 1024 * 1024  # 1MB chunks
-        while chunk := await file.read(chunk_size):
-            file_size += len(chunk)
-            if file_size > max_file_size:
-                raise HTTPException(
-                    status_code=413, 
-                    detail=f"File too large. Maximum size allowed is 100MB, but file is {file_size / (1024*1024):.1f}MB"
-                )
-            file_content += chunk
-        
-        # Reset file position for processing
-        await file.seek(0)
-        
-        # Save uploaded file temporarily
+        # Save uploaded file temporarily, checking the size limit as it streams in
         temp_dir = tempfile.mkdtemp()
-        temp_file_path = os.path.join(temp_dir, file.filename)
-        
-        with open(temp_file_path, "wb") as buffer:
-            buffer.write(file_content)
-        
-        # Transcribe with Whisper
-        raw_transcript, num_chunks = transcribe_with_whisper(temp_file_path)
+        try:
+            temp_file_path = os.path.join(temp_dir, file.filename)
+            await save_upload(file, temp_file_path)
+            
+            # Transcribe with Whisper
+            raw_transcript, num_chunks = await run_in_threadpool(transcribe_with_whisper, temp_file_path)
+        finally:
+            shutil.rmtree(temp_dir, ignore_errors=True)
         
         # Format with AI
-        if ai_provider == "openai":
-            formatted_response = format_with_openai(raw_transcript, format_prompt)
-        elif ai_provider == "gemini":
-            formatted_response = format_with_gemini(raw_transcript, format_prompt)
-        else:
-            raise HTTPException(status_code=400, detail="Invalid AI provider. Choose 'openai' or 'gemini'")
+        formatted_response = await run_in_threadpool(
+            format_transcript,
+            prepare_stage_transcript(raw_transcript, "format"), format_prompt, ai_provider
+        )
         
         return TranscriptResponse(
             filename=file.filename,
@@ -1028,6 +1751,8 @@ async def upload_and_transcribe_audio(
             file_chunks=num_chunks
         )
         
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error processing audio file: {str(e)}")
 
@@ -1037,7 +1762,11 @@ async def analyze_interview_comprehensive(
     skills_to_assess: str = Form(..., description="Comma-separated list of skills to assess"),
     job_role: str = Form(default="Software Developer", description="Job role for context"),
     company_name: str = Form(default="Company", description="Company name for context"),
-    ai_provider: Literal["openai", "gemini"] = Form(default="openai")
+    ai_provider: Literal["openai", "gemini", "auto"] = Form(default="openai"),
+    analysis_mode: Literal["parallel", "fused"] = Form(default=ANALYSIS_MODE),
+    latency_budget_seconds: Optional[float] = Form(default=None, gt=0, description="Respond within about this many seconds, with unfinished sections pending"),
+    fields: Optional[str] = Query(default=None, description="Comma-separated response fields to return; prefix a field with '-' to omit it"),
+    idempotency_key: Optional[str] = Header(default=None, alias="Idempotency-Key", description="Retries with the same key get the same result")
 ):
     """
     Comprehensive interview analysis with skill assessment, Q&A extraction, and insights
@@ -1046,9 +1775,15 @@ async def analyze_interview_comprehensive(
     - **skills_to_assess**: Comma-separated skills to evaluate (e.g., "Python, React, Problem Solving, Communication")
     - **job_role**: Job role for context in analysis
     - **company_name**: Company name for context
-    - **ai_provider**: AI provider for analysis (currently only OpenAI supports structured responses)
+    - **ai_provider**: AI provider for analysis: 'openai', 'gemini' or 'auto' (fastest healthy provider)
+    - **analysis_mode**: 'parallel' for separate stage calls, 'fused' for a single combined call
+    - **latency_budget_seconds**: Latency budget; sections not ready in time are returned as pending
+    - **fields**: Response fields to return, e.g. '-raw_transcript,-formatted_transcript' to omit the transcripts
     """
     try:
+        # Reject an unknown projection before any work is done
+        parse_fields(ComprehensiveAnalysisResponse, fields)
+        
         # Validate file type
         allowed_extensions = {'.mp3', '.wav', '.m4a', '.mp4', '.avi', '.mov', '.webm', '.mkv'}
         file_extension = os.path.splitext(file.filename)[1].lower()
@@ -1067,91 +1802,85 @@ async def analyze_interview_comprehensive(
         if len(skills_list) > 20:
             raise HTTPException(status_code=400, detail="Maximum 20 skills allowed per analysis")
         
-        # Validate AI provider for structured responses
-        if ai_provider != "openai":
-            raise HTTPException(
-                status_code=400, 
-                detail="Currently only OpenAI supports comprehensive structured analysis"
-            )
-        
-        # Check file size (100MB limit)
-        max_file_size = 100 * 1024 * 1024  # 100MB in bytes
-        file_size = 0
-        file_content = b""
-        
-        # Read file in chunks to get size and content
-        chunk_size = 1024 * 1024  # 1MB chunks
-        while chunk := await file.read(chunk_size):
-            file_size += len(chunk)
-            if file_size > max_file_size:
-                raise HTTPException(
-                    status_code=413, 
-                    detail=f"File too large. Maximum size allowed is 100MB, but file is {file_size / (1024*1024):.1f}MB"
-                )
-            file_content += chunk
-        
-        # Reset file position for processing
-        await file.seek(0)
-        
-        # Save uploaded file temporarily
+        # Save uploaded file temporarily, checking the size limit as it streams in
         temp_dir = tempfile.mkdtemp()
         temp_file_path = os.path.join(temp_dir, file.filename)
+        try:
+            _, content_hash = await save_upload(file, temp_file_path)
+        except Exception:
+            # The pipeline that owns the directory never starts
+            shutil.rmtree(temp_dir, ignore_errors=True)
+            raise
         
-        with open(temp_file_path, "wb") as buffer:
-            buffer.write(file_content)
-        
-        # Step 1: Transcribe with Whisper
-        print("Transcribing audio with Whisper...")
-        raw_transcript, num_chunks = transcribe_with_whisper(temp_file_path)
-        
-        # Step 2: Validate transcript quality
-        is_valid, validation_message = validate_transcript_quality(raw_transcript)
-        if not is_valid:
-            raise HTTPException(status_code=400, detail=f"Transcript validation failed: {validation_message}")
+        budget = LatencyBudget.for_request(latency_budget_seconds)
         
-        # Step 3: Format transcript
-        print("Formatting transcript...")
-        formatted_transcript = format_with_openai(
-            raw_transcript, 
-            f"Please format this {job_role} interview transcript for {company_name} into a clear, well-structured format with proper paragraphs and speaker identification where possible, Dont include any other text in the response, just the formatted transcript. Dont use markdown formatting."
-        )
+        async def analyze_upload() -> ComprehensiveAnalysisResponse:
+            try:
+                # Step 1: Transcribe with Whisper
+                print("Transcribing audio with Whisper...")
+                audio_duration = await run_in_threadpool(probe_audio_duration, temp_file_path)
+                try:
+                    raw_transcript, num_chunks = await run_stage(budget, "transcribe", transcribe_with_whisper, temp_file_path)
+                except BudgetExceeded:
+                    # Nothing can be returned without the transcript
+                    raise HTTPException(status_code=504, detail="Transcription did not finish within the latency budget")
         
-        # Step 4: Parallel analysis (can be done concurrently)
-        print("Performing comprehensive analysis...")
+                # Step 2: Validate transcript quality and measure the conversation
+                transcript_scan = scan_transcript(raw_transcript, audio_duration)
+                if not transcript_scan.is_valid:
+                    raise HTTPException(status_code=400, detail=f"Transcript validation failed: {transcript_scan.message}")
         
-        # Run analyses in parallel for efficiency
-        import asyncio
-        from concurrent.futures import ThreadPoolExecutor
+                analysis_metadata = AnalysisMetadata()
         
-        with ThreadPoolExecutor(max_workers=3) as executor:
-            # Submit all analysis tasks
-            skill_future = executor.submit(assess_skills_with_openai, raw_transcript, skills_list, job_role)
-            qa_future = executor.submit(extract_qa_with_openai, raw_transcript, job_role)
-            insights_future = executor.submit(generate_interview_insights_with_openai, raw_transcript, job_role)
-            
-            # Wait for all to complete
-            skill_assessments = skill_future.result()
-            questions_and_answers = qa_future.result()
-            interview_insights = insights_future.result()
+                # Step 3: Format transcript
+                print("Formatting transcript...")
+                try:
+                    with budgeted_metadata(analysis_metadata, budget) as format_metadata:
+                        formatted_transcript = await run_stage(
+                            budget, "format", format_transcript,
+                            prepare_stage_transcript(raw_transcript, "format", analysis_metadata), 
+                            f"Please format this {job_role} interview transcript for {company_name} into a clear, well-structured format with proper paragraphs and speaker identification where possible, Dont include any other text in the response, just the formatted transcript. Dont use markdown formatting.",
+                            ai_provider,
+                            format_metadata
+                        )
+                except BudgetExceeded:
+                    # Out of budget: the raw transcript stands in for the formatted one
+                    formatted_transcript = raw_transcript
+                    budget.mark_pending("formatted_transcript")
+        
+                # Step 4: Structured analysis and executive summary (parallel stages or one fused call)
+                transcript_statistics = conversation_statistics(transcript_scan, formatted_transcript, audio_duration)
+                skill_assessments, questions_and_answers, interview_insights, analysis_summary = await run_in_threadpool(
+                    run_analysis,
+                    raw_transcript, skills_list, job_role, analysis_mode, ai_provider, analysis_metadata,
+                    statistics=transcript_statistics,
+                    budget=budget
+                )
         
-        # Step 5: Generate executive summary
-        print("Generating analysis summary...")
-        analysis_summary = generate_analysis_summary_with_openai(
-            skill_assessments, questions_and_answers, interview_insights, job_role
-        )
+                # Step 5: Return comprehensive response
+                return ComprehensiveAnalysisResponse(
+                    filename=file.filename,
+                    raw_transcript=raw_transcript,
+                    formatted_transcript=formatted_transcript,
+                    ai_provider=ai_provider,
+                    file_chunks=num_chunks,
+                    skill_assessments=skill_assessments,
+                    questions_and_answers=questions_and_answers,
+                    interview_insights=interview_insights,
+                    analysis_summary=analysis_summary,
+                    transcript_statistics=transcript_statistics,
+                    analysis_metadata=analysis_metadata,
+                    pending_sections=report_budget(budget, analysis_metadata)
+                )
+            finally:
+                shutil.rmtree(temp_dir, ignore_errors=True)
         
-        # Step 6: Return comprehensive response
-        return ComprehensiveAnalysisResponse(
-            filename=file.filename,
-            raw_transcript=raw_transcript,
-            formatted_transcript=formatted_transcript,
-            ai_provider=ai_provider,
-            file_chunks=num_chunks,
-            skill_assessments=skill_assessments,
-            questions_and_answers=questions_and_answers,
-            interview_insights=interview_insights,
-            analysis_summary=analysis_summary
+        # Identical submissions in flight at the same time share one pipeline
+        fingerprint = request_fingerprint(
+            "/analyze-interview", content_hash, file.filename, skills_list, job_role, company_name, ai_provider, analysis_mode, latency_budget_seconds
         )
+        analysis = await run_coalesced("/analyze-interview", fingerprint, analyze_upload, idempotency_key, temp_dir)
+        return projected_response(analysis, fields)
         
     except HTTPException:
         # Re-raise HTTP exceptions as-is
@@ -1166,7 +1895,11 @@ async def analyze_interview_from_url(
     skills_to_assess: str = Form(..., description="Comma-separated list of skills to assess"),
     job_role: str = Form(default="Software Developer", description="Job role for context"),
     company_name: str = Form(default="Company", description="Company name for context"),
-    ai_provider: Literal["openai", "gemini"] = Form(default="openai")
+    ai_provider: Literal["openai", "gemini", "auto"] = Form(default="openai"),
+    analysis_mode: Literal["parallel", "fused"] = Form(default=ANALYSIS_MODE),
+    latency_budget_seconds: Optional[float] = Form(default=None, gt=0, description="Respond within about this many seconds, with unfinished sections pending"),
+    fields: Optional[str] = Query(default=None, description="Comma-separated response fields to return; prefix a field with '-' to omit it"),
+    idempotency_key: Optional[str] = Header(default=None, alias="Idempotency-Key", description="Retries with the same key get the same result")
 ):
     """
     Comprehensive interview analysis from video URL with skill assessment and insights
@@ -1175,9 +1908,15 @@ async def analyze_interview_from_url(
     - **skills_to_assess**: Comma-separated skills to evaluate
     - **job_role**: Job role for context in analysis
     - **company_name**: Company name for context
-    - **ai_provider**: AI provider for analysis
+    - **ai_provider**: AI provider for analysis: 'openai', 'gemini' or 'auto' (fastest healthy provider)
+    - **analysis_mode**: 'parallel' for separate stage calls, 'fused' for a single combined call
+    - **latency_budget_seconds**: Latency budget; sections not ready in time are returned as pending
+    - **fields**: Response fields to return, e.g. '-raw_transcript,-formatted_transcript' to omit the transcripts
     """
     try:
+        # Reject an unknown projection before any work is done
+        parse_fields(ComprehensiveAnalysisResponse, fields)
+        
         # Parse and validate skills
         skills_list = [skill.strip() for skill in skills_to_assess.split(',') if skill.strip()]
         if not skills_list:
@@ -1186,64 +1925,79 @@ async def analyze_interview_from_url(
         if len(skills_list) > 20:
             raise HTTPException(status_code=400, detail="Maximum 20 skills allowed per analysis")
         
-        # Validate AI provider
-        if ai_provider != "openai":
-            raise HTTPException(
-                status_code=400, 
-                detail="Currently only OpenAI supports comprehensive structured analysis"
-            )
-        
         # Extract video ID for reference
         video_id = extract_video_id_from_url(video_url)
         
-        # Step 1: Download and transcribe
-        print("Downloading and transcribing video...")
-        audio_file_path = download_audio_from_url(video_url)
-        raw_transcript, num_chunks = transcribe_with_whisper(audio_file_path)
-        
-        # Step 2: Validate transcript quality
-        is_valid, validation_message = validate_transcript_quality(raw_transcript)
-        if not is_valid:
-            raise HTTPException(status_code=400, detail=f"Transcript validation failed: {validation_message}")
-        
-        # Step 3: Format transcript
-        print("Formatting transcript...")
-        formatted_transcript = format_with_openai(
-            raw_transcript, 
-            f"Please format this {job_role} interview transcript for {company_name} into a clear, well-structured format."
-        )
-        
-        # Step 4: Comprehensive analysis
-        print("Performing comprehensive analysis...")
-        
-        import asyncio
-        from concurrent.futures import ThreadPoolExecutor
+        budget = LatencyBudget.for_request(latency_budget_seconds)
         
-        with ThreadPoolExecutor(max_workers=3) as executor:
-            skill_future = executor.submit(assess_skills_with_openai, raw_transcript, skills_list, job_role)
-            qa_future = executor.submit(extract_qa_with_openai, raw_transcript, job_role)
-            insights_future = executor.submit(generate_interview_insights_with_openai, raw_transcript, job_role)
-            
-            skill_assessments = skill_future.result()
-            questions_and_answers = qa_future.result()
-            interview_insights = insights_future.result()
+        async def analyze_url() -> ComprehensiveAnalysisResponse:
+            # Step 1: Download and transcribe
+            print("Downloading and transcribing video...")
+            try:
+                audio_file_path = await run_stage(budget, "download", download_audio_from_url, video_url)
+                try:
+                    audio_duration = await run_in_threadpool(probe_audio_duration, audio_file_path)
+                    raw_transcript, num_chunks = await run_stage(budget, "transcribe", transcribe_with_whisper, audio_file_path)
+                finally:
+                    # Transcription removes the download itself; this covers a request cancelled before that
+                    shutil.rmtree(os.path.dirname(audio_file_path), ignore_errors=True)
+            except BudgetExceeded:
+                # Nothing can be returned without the transcript
+                raise HTTPException(status_code=504, detail="Transcription did not finish within the latency budget")
+        
+            # Step 2: Validate transcript quality and measure the conversation
+            transcript_scan = scan_transcript(raw_transcript, audio_duration)
+            if not transcript_scan.is_valid:
+                raise HTTPException(status_code=400, detail=f"Transcript validation failed: {transcript_scan.message}")
+        
+            analysis_metadata = AnalysisMetadata()
+        
+            # Step 3: Format transcript
+            print("Formatting transcript...")
+            try:
+                with budgeted_metadata(analysis_metadata, budget) as format_metadata:
+                    formatted_transcript = await run_stage(
+                        budget, "format", format_transcript,
+                        prepare_stage_transcript(raw_transcript, "format", analysis_metadata), 
+                        f"Please format this {job_role} interview transcript for {company_name} into a clear, well-structured format.",
+                        ai_provider,
+                        format_metadata
+                    )
+            except BudgetExceeded:
+                # Out of budget: the raw transcript stands in for the formatted one
+                formatted_transcript = raw_transcript
+                budget.mark_pending("formatted_transcript")
+        
+            # Step 4: Structured analysis and executive summary (parallel stages or one fused call)
+            transcript_statistics = conversation_statistics(transcript_scan, formatted_transcript, audio_duration)
+            skill_assessments, questions_and_answers, interview_insights, analysis_summary = await run_in_threadpool(
+                run_analysis,
+                raw_transcript, skills_list, job_role, analysis_mode, ai_provider, analysis_metadata,
+                statistics=transcript_statistics,
+                budget=budget
+            )
         
-        # Step 5: Generate summary
-        analysis_summary = generate_analysis_summary_with_openai(
-            skill_assessments, questions_and_answers, interview_insights, job_role
-        )
+            return ComprehensiveAnalysisResponse(
+                video_id=video_id,
+                raw_transcript=raw_transcript,
+                formatted_transcript=formatted_transcript,
+                ai_provider=ai_provider,
+                file_chunks=num_chunks,
+                skill_assessments=skill_assessments,
+                questions_and_answers=questions_and_answers,
+                interview_insights=interview_insights,
+                analysis_summary=analysis_summary,
+                transcript_statistics=transcript_statistics,
+                analysis_metadata=analysis_metadata,
+                pending_sections=report_budget(budget, analysis_metadata)
+            )
         
-        return ComprehensiveAnalysisResponse(
-            video_id=video_id,
-            raw_transcript=raw_transcript,
-            formatted_transcript=formatted_transcript,
-            ai_provider=ai_provider,
-            file_chunks=num_chunks,
-            skill_assessments=skill_assessments,
-            questions_and_answers=questions_and_answers,
-            interview_insights=interview_insights,
-            analysis_summary=analysis_summary
+        # Identical submissions in flight at the same time share one pipeline
+        fingerprint = request_fingerprint(
+            "/analyze-interview-url", video_url, skills_list, job_role, company_name, ai_provider, analysis_mode, latency_budget_seconds
         )
+        analysis = await run_coalesced("/analyze-interview-url", fingerprint, analyze_url, idempotency_key)
+        return projected_response(analysis, fields)
         
     except HTTPException:
         raise
@@ -1256,7 +2010,11 @@ async def analyze_transcript(
     skills_to_assess: str = Form(default="Communication, Technical Knowledge, Problem Solving, Collaboration, Leadership", description="Comma-separated list of skills to assess"),
     job_role: str = Form(default="Software Developer", description="Job role for context"),
     company_name: str = Form(default="Company", description="Company name for context"),
-    ai_provider: Literal["openai", "gemini"] = Form(default="openai")
+    ai_provider: Literal["openai", "gemini", "auto"] = Form(default="openai"),
+    analysis_mode: Literal["parallel", "fused"] = Form(default=ANALYSIS_MODE),
+    latency_budget_seconds: Optional[float] = Form(default=None, gt=0, description="Respond within about this many seconds, with unfinished sections pending"),
+    fields: Optional[str] = Query(default=None, description="Comma-separated response fields to return; prefix a field with '-' to omit it"),
+    idempotency_key: Optional[str] = Header(default=None, alias="Idempotency-Key", description="Retries with the same key get the same result")
 ):
     """
     Comprehensive interview analysis from transcript text
@@ -1265,9 +2023,15 @@ async def analyze_transcript(
     - **skills_to_assess**: Comma-separated skills to evaluate (optional, has default value)
     - **job_role**: Job role for context in analysis (optional)
     - **company_name**: Company name for context (optional)
-    - **ai_provider**: AI provider for analysis (optional)
+    - **ai_provider**: AI provider for analysis: 'openai', 'gemini' or 'auto' (optional)
+    - **analysis_mode**: 'parallel' for separate stage calls, 'fused' for a single combined call (optional)
+    - **latency_budget_seconds**: Latency budget; sections not ready in time are returned as pending (optional)
+    - **fields**: Response fields to return, e.g. '-raw_transcript,-formatted_transcript' to omit the transcripts (optional)
     """
     try:
+        # Reject an unknown projection before any work is done
+        parse_fields(ComprehensiveAnalysisResponse, fields)
+        
         # Parse and validate skills
         skills_list = [skill.strip() for skill in skills_to_assess.split(',') if skill.strip()]
         
@@ -1282,78 +2046,90 @@ async def analyze_transcript(
             print("Too many skills provided, limiting to first 20")
             skills_list = skills_list[:20]
         
-        # Validate AI provider
-        if ai_provider != "openai":
-            print("Warning: Only OpenAI is supported, switching to OpenAI")
-            ai_provider = "openai"
-        
         # Save uploaded file temporarily
+        content = await file.read()
         temp_dir = tempfile.mkdtemp()
         temp_file_path = os.path.join(temp_dir, file.filename)
-        
-        content = await file.read()
-        with open(temp_file_path, "wb") as buffer:
-            buffer.write(content)
-        
-        # Read the text or PDF file
         try:
-            if file.filename.lower().endswith('.pdf'):
-                raw_transcript = extract_text_from_pdf(content)
-            else:
-                with open(temp_file_path, "r", encoding="utf-8", errors="ignore") as f:
-                    raw_transcript = f.read()
-        except Exception as e:
-            raise HTTPException(status_code=400, detail=f"Error reading file: {str(e)}")
-        
-        # Step 1: Validate transcript quality
-        is_valid, validation_message = validate_transcript_quality(raw_transcript)
-        if not is_valid:
-            print(f"Warning: Transcript quality issue: {validation_message}, proceeding anyway")
-            # Continue processing instead of raising an exception
-        
-        # Step 2: Format transcript
-        print("Formatting transcript...")
-        formatted_transcript = format_with_openai(
-            raw_transcript, 
-            f"Please format this {job_role} interview transcript for {company_name} into a clear, well-structured format with proper paragraphs and speaker identification where possible, Dont include any other text in the response, just the formatted transcript. Dont use markdown formatting."
-        )
-        
-        # Step 3: Parallel analysis (can be done concurrently)
-        print("Performing comprehensive analysis...")
+            with open(temp_file_path, "wb") as buffer:
+                buffer.write(content)
+        except Exception:
+            shutil.rmtree(temp_dir, ignore_errors=True)
+            raise
         
-        # Run analyses in parallel for efficiency
-        import asyncio
-        from concurrent.futures import ThreadPoolExecutor
-        
-        with ThreadPoolExecutor(max_workers=3) as executor:
-            # Submit all analysis tasks
-            skill_future = executor.submit(assess_skills_with_openai, raw_transcript, skills_list, job_role)
-            qa_future = executor.submit(extract_qa_with_openai, raw_transcript, job_role)
-            insights_future = executor.submit(generate_interview_insights_with_openai, raw_transcript, job_role)
-            
-            # Wait for all to complete
-            skill_assessments = skill_future.result()
-            questions_and_answers = qa_future.result()
-            interview_insights = insights_future.result()
+        budget = LatencyBudget.for_request(latency_budget_seconds)
         
-        # Step 4: Generate executive summary
-        print("Generating analysis summary...")
-        analysis_summary = generate_analysis_summary_with_openai(
-            skill_assessments, questions_and_answers, interview_insights, job_role
-        )
+        async def analyze_file() -> ComprehensiveAnalysisResponse:
+            try:
+                # Read the text or PDF file
+                try:
+                    if file.filename.lower().endswith('.pdf'):
+                        raw_transcript = await run_in_threadpool(extract_text_from_pdf, content)
+                    else:
+                        with open(temp_file_path, "r", encoding="utf-8", errors="ignore") as f:
+                            raw_transcript = f.read()
+                except Exception as e:
+                    raise HTTPException(status_code=400, detail=f"Error reading file: {str(e)}")
+        
+                # Step 1: Validate transcript quality and measure the conversation
+                transcript_scan = scan_transcript(raw_transcript)
+                if not transcript_scan.is_valid:
+                    print(f"Warning: Transcript quality issue: {transcript_scan.message}, proceeding anyway")
+                    # Continue processing instead of raising an exception
+        
+                analysis_metadata = AnalysisMetadata()
+        
+                # Step 2: Format transcript
+                print("Formatting transcript...")
+                try:
+                    with budgeted_metadata(analysis_metadata, budget) as format_metadata:
+                        formatted_transcript = await run_stage(
+                            budget, "format", format_transcript,
+                            prepare_stage_transcript(raw_transcript, "format", analysis_metadata), 
+                            f"Please format this {job_role} interview transcript for {company_name} into a clear, well-structured format with proper paragraphs and speaker identification where possible, Dont include any other text in the response, just the formatted transcript. Dont use markdown formatting.",
+                            ai_provider,
+                            format_metadata
+                        )
+                except BudgetExceeded:
+                    # Out of budget: the raw transcript stands in for the formatted one
+                    formatted_transcript = raw_transcript
+                    budget.mark_pending("formatted_transcript")
+        
+                # Step 3: Structured analysis and executive summary (parallel stages or one fused call)
+                transcript_statistics = conversation_statistics(transcript_scan, formatted_transcript)
+                skill_assessments, questions_and_answers, interview_insights, analysis_summary = await run_in_threadpool(
+                    run_analysis,
+                    raw_transcript, skills_list, job_role, analysis_mode, ai_provider, analysis_metadata,
+                    statistics=transcript_statistics,
+                    budget=budget
+                )
         
-        # Step 5: Return comprehensive response
-        return ComprehensiveAnalysisResponse(
-            filename=file.filename,
-            raw_transcript=raw_transcript,
-            formatted_transcript=formatted_transcript,
-            ai_provider=ai_provider,
-            file_chunks=1,  # Since we're not chunking the transcript
-            skill_assessments=skill_assessments,
-            questions_and_answers=questions_and_answers,
-            interview_insights=interview_insights,
-            analysis_summary=analysis_summary
+                # Step 4: Return comprehensive response
+                return ComprehensiveAnalysisResponse(
+                    filename=file.filename,
+                    raw_transcript=raw_transcript,
+                    formatted_transcript=formatted_transcript,
+                    ai_provider=ai_provider,
+                    file_chunks=1,  # Since we're not chunking the transcript
+                    skill_assessments=skill_assessments,
+                    questions_and_answers=questions_and_answers,
+                    interview_insights=interview_insights,
+                    analysis_summary=analysis_summary,
+                    transcript_statistics=transcript_statistics,
+                    analysis_metadata=analysis_metadata,
+                    pending_sections=report_budget(budget, analysis_metadata)
+                )
+            finally:
+                # Clean up temporary files
+                shutil.rmtree(temp_dir, ignore_errors=True)
+        
+        # Identical submissions in flight at the same time share one pipeline
+        fingerprint = request_fingerprint(
+            "/analyze-transcript", hashlib.sha256(content).hexdigest(), file.filename,
+            skills_list, job_role, company_name, ai_provider, analysis_mode, latency_budget_seconds
         )
+        analysis = await run_coalesced("/analyze-transcript", fingerprint, analyze_file, idempotency_key, temp_dir)
+        return projected_response(analysis, fields)
         
     except HTTPException:
         # Re-raise HTTP exceptions as-is
@@ -1361,18 +2137,120 @@ async def analyze_transcript(
     except Exception as e:
         # Handle unexpected errors
         raise HTTPException(status_code=500, detail=f"Error during transcript analysis: {str(e)}")
-    finally:
-        # Clean up temporary files
+
+@app.post("/analyze-transcript-stream")
+async def analyze_transcript_stream(
+    file: UploadFile = File(...),
+    skills_to_assess: str = Form(default="Communication, Technical Knowledge, Problem Solving, Collaboration, Leadership", description="Comma-separated list of skills to assess"),
+    job_role: str = Form(default="Software Developer", description="Job role for context"),
+    company_name: str = Form(default="Company", description="Company name for context"),
+    ai_provider: Literal["openai", "gemini", "auto"] = Form(default="openai"),
+    analysis_mode: Literal["parallel", "fused"] = Form(default=ANALYSIS_MODE),
+    fields: Optional[str] = Query(default=None, description="Comma-separated fields of the complete event to return; prefix a field with '-' to omit it")
+):
+    """
+    Transcript analysis that streams results as newline-delimited JSON while they are generated
+    
+    Takes the same form fields as /analyze-transcript. Each line is an event object
+    {"event": ..., "data": ...} with event one of: formatted_transcript, skill_assessment,
+    question_answer, interview_insights, analysis_summary, complete (the full
+    ComprehensiveAnalysisResponse, projected by fields) or error.
+    """
+    parse_fields(ComprehensiveAnalysisResponse, fields)
+    skills_list = [skill.strip() for skill in skills_to_assess.split(',') if skill.strip()]
+    if not skills_list:
+        skills_list = ["Communication", "Technical Knowledge", "Problem Solving", "Collaboration", "Leadership"]
+    skills_list = skills_list[:20]
+    
+    content = await file.read()
+    try:
+        if file.filename.lower().endswith('.pdf'):
+            raw_transcript = await run_in_threadpool(extract_text_from_pdf, content)
+        else:
+            raw_transcript = content.decode("utf-8", errors="ignore").replace("\r\n", "\n")
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=f"Error reading file: {str(e)}")
+    
+    loop = asyncio.get_running_loop()
+    events: asyncio.Queue = asyncio.Queue()
+    
+    def emit(event: str, data: Any) -> None:
+        # Called from worker threads; hand the serialized line to the event loop
+        payload = encode_model(data, fields if event == "complete" else None) if isinstance(data, BaseModel) else dumps(data)
+        line = b'{"event":' + dumps(event) + b',"data":' + payload + b'}\n'
+        loop.call_soon_threadsafe(events.put_nowait, line)
+    
+    def run_pipeline() -> None:
         try:
-            if temp_dir and os.path.exists(temp_dir):
-                shutil.rmtree(temp_dir)
-        except Exception as cleanup_error:
-            print(f"Warning: Cleanup failed: {cleanup_error}")
+            transcript_scan = scan_transcript(raw_transcript)
+            if not transcript_scan.is_valid:
+                print(f"Warning: Transcript quality issue: {transcript_scan.message}, proceeding anyway")
+            
+            analysis_metadata = AnalysisMetadata()
+            formatted_transcript = format_transcript(
+                prepare_stage_transcript(raw_transcript, "format", analysis_metadata), 
+                f"Please format this {job_role} interview transcript for {company_name} into a clear, well-structured format with proper paragraphs and speaker identification where possible, Dont include any other text in the response, just the formatted transcript. Dont use markdown formatting.",
+                ai_provider,
+                analysis_metadata
+            )
+            emit("formatted_transcript", formatted_transcript)
+            
+            transcript_statistics = conversation_statistics(transcript_scan, formatted_transcript)
+            skill_assessments, questions_and_answers, interview_insights, analysis_summary = run_analysis(
+                raw_transcript, skills_list, job_role, analysis_mode, ai_provider, analysis_metadata, emit,
+                statistics=transcript_statistics
+            )
+            
+            emit("complete", ComprehensiveAnalysisResponse(
+                filename=file.filename,
+                raw_transcript=raw_transcript,
+                formatted_transcript=formatted_transcript,
+                ai_provider=ai_provider,
+                file_chunks=1,
+                skill_assessments=skill_assessments,
+                questions_and_answers=questions_and_answers,
+                interview_insights=interview_insights,
+                analysis_summary=analysis_summary,
+                transcript_statistics=transcript_statistics,
+                analysis_metadata=analysis_metadata
+            ))
+        except HTTPException as e:
+            emit("error", {"status_code": e.status_code, "detail": e.detail})
+        except Exception as e:
+            emit("error", {"status_code": 500, "detail": f"Error during transcript analysis: {str(e)}"})
+        finally:
+            loop.call_soon_threadsafe(events.put_nowait, None)
+    
+    async def event_stream():
+        pipeline = loop.run_in_executor(None, in_current_context(run_pipeline))
+        while (line := await events.get()) is not None:
+            yield line
+        await pipeline
+    
+    return StreamingResponse(event_stream(), media_type="application/x-ndjson")
+
+async def compare_pdf_contents(original_content: bytes, ai_content: bytes) -> ComparisonResponse:
+    """Extract both PDFs in parallel, off the event loop, and compare the analyses"""
+    original_text, ai_text = await asyncio.gather(
+        run_in_threadpool(extract_text_from_pdf, original_content),
+        run_in_threadpool(extract_text_from_pdf, ai_content)
+    )
+    
+    # Validate extracted text
+    if len(original_text) < 100 or len(ai_text) < 100:
+        raise HTTPException(
+            status_code=400, 
+            detail="Failed to extract sufficient text from one or both PDFs"
+        )
+    
+    # Compare analyses using OpenAI
+    return await run_in_threadpool(compare_analyses_with_openai, original_text, ai_text)
 
 @app.post("/compare-analyses", response_model=ComparisonResponse)
 async def compare_pdf_analyses(
     original_analysis: UploadFile = File(...),
     ai_analysis: UploadFile = File(...),
+    idempotency_key: Optional[str] = Header(default=None, alias="Idempotency-Key", description="Retries with the same key get the same result")
 ):
     """
     Compare original and AI-generated interview analyses
@@ -1382,34 +2260,86 @@ async def compare_pdf_analyses(
     """
     try:
         # Read uploaded files
-        original_content = await original_analysis.read()
-        await original_analysis.seek(0)  # Reset file pointer
+        original_content, ai_content = await asyncio.gather(original_analysis.read(), ai_analysis.read())
         
-        ai_content = await ai_analysis.read()
-        await ai_analysis.seek(0)  # Reset file pointer
+        fingerprint = request_fingerprint(
+            "/compare-analyses", hashlib.sha256(original_content).hexdigest(), hashlib.sha256(ai_content).hexdigest()
+        )
+        return await run_coalesced(
+            "/compare-analyses", fingerprint, lambda: compare_pdf_contents(original_content, ai_content), idempotency_key
+        )
         
-        # Extract text from PDFs
-        original_text = extract_text_from_pdf(original_content)
-        ai_text = extract_text_from_pdf(ai_content)
+    except HTTPException:
+        # Re-raise HTTP exceptions as-is
+        raise
+    except Exception as e:
+        # Handle unexpected errors
+        raise HTTPException(status_code=500, detail=f"Error comparing analyses: {str(e)}")
+
+@app.post("/compare-analyses-url", response_model=ComparisonResponse)
+async def compare_pdf_analyses_from_urls(
+    request: ComparisonRequest,
+    idempotency_key: Optional[str] = Header(default=None, alias="Idempotency-Key", description="Retries with the same key get the same result")
+):
+    """
+    Compare original and AI-generated interview analyses downloaded from URLs
+    
+    - **original_analysis_url**: URL of the PDF with the original human analysis
+    - **ai_analysis_url**: URL of the PDF with the AI-generated analysis
+    """
+    try:
+        async def compare_urls() -> ComparisonResponse:
+            original_content, ai_content = await asyncio.gather(
+                download_pdf_from_url(str(request.original_analysis_url)),
+                download_pdf_from_url(str(request.ai_analysis_url))
+            )
+            return await compare_pdf_contents(original_content, ai_content)
         
-        # Validate extracted text
-        if len(original_text) < 100 or len(ai_text) < 100:
+        fingerprint = request_fingerprint(
+            "/compare-analyses-url", str(request.original_analysis_url), str(request.ai_analysis_url)
+        )
+        return await run_coalesced("/compare-analyses-url", fingerprint, compare_urls, idempotency_key)
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error comparing analyses: {str(e)}")
+
+@app.post("/score-analyses", response_model=List[SimilarityReport])
+async def score_pdf_analyses(
+    original_analyses: List[UploadFile] = File(...),
+    ai_analyses: List[UploadFile] = File(...),
+):
+    """
+    Score agreement between original and AI-generated analyses locally, without LLM calls
+    
+    - **original_analyses**: PDF files with original human analyses
+    - **ai_analyses**: PDF files with AI-generated analyses, paired with the originals by position
+    """
+    try:
+        if len(original_analyses) != len(ai_analyses):
             raise HTTPException(
-                status_code=400, 
-                detail="Failed to extract sufficient text from one or both PDFs"
+                status_code=400,
+                detail="original_analyses and ai_analyses must contain the same number of files"
             )
         
-        # Compare analyses using OpenAI
-        comparison_result = compare_analyses_with_openai(original_text, ai_text)
+        contents = await asyncio.gather(*(upload.read() for upload in original_analyses + ai_analyses))
+        texts = await asyncio.gather(*(run_in_threadpool(extract_text_from_pdf, content) for content in contents))
+        pairs = list(zip(texts[:len(original_analyses)], texts[len(original_analyses):]))
+        
+        for i, (original_text, ai_text) in enumerate(pairs):
+            if len(original_text) < 100 or len(ai_text) < 100:
+                raise HTTPException(
+                    status_code=400,
+                    detail=f"Failed to extract sufficient text from one or both PDFs in pair {i}"
+                )
         
-        return comparison_result
+        return await run_in_threadpool(lambda: [compare_documents(original, ai) for original, ai in pairs])
         
     except HTTPException:
-        # Re-raise HTTP exceptions as-is
         raise
     except Exception as e:
-        # Handle unexpected errors
-        raise HTTPException(status_code=500, detail=f"Error comparing analyses: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Error scoring analyses: {str(e)}")
 
 if __name__ == "__main__":
     import uvicorn
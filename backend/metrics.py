@@ -0,0 +1,152 @@
+"""
+Metrics Module
+Prometheus metrics for the analysis pipeline: stage latencies, tokens, cache hits, retries and load
+"""
+
+import time
+from concurrent.futures import Future
+from typing import Callable
+
+import anyio.to_thread
+from prometheus_client import CONTENT_TYPE_LATEST, Counter, Gauge, Histogram, generate_latest
+
+# Stages run from milliseconds (local parsing) to minutes (long Whisper transcriptions)
+STAGE_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60, 120, 300, 600)
+
+STAGE_SECONDS = Histogram(
+    "interview_stage_duration_seconds",
+    "Duration of a pipeline stage (download, split, whisper_chunk, format, skills, qa, insights, summary, pdf_parse, ...)",
+    ["stage"],
+    buckets=STAGE_BUCKETS
+)
+LLM_CALL_SECONDS = Histogram(
+    "interview_llm_call_duration_seconds",
+    "Duration of a chat completion, including routing, retries and hedging",
+    ["stage", "tier"],
+    buckets=STAGE_BUCKETS
+)
+HTTP_REQUEST_SECONDS = Histogram(
+    "interview_http_request_duration_seconds",
+    "Duration of an API request",
+    ["endpoint", "status"],
+    buckets=STAGE_BUCKETS
+)
+
+LLM_TOKENS = Counter(
+    "interview_llm_tokens_total",
+    "Tokens reported by the providers; kind is prompt, cached (prompt tokens served from the prefix cache) or completion",
+    ["stage", "provider", "model", "kind"]
+)
+CACHE_LOOKUPS = Counter(
+    "interview_cache_lookups_total",
+    "Local cache lookups by cache and result (hit or miss)",
+    ["cache", "result"]
+)
+COALESCED_REQUESTS = Counter(
+    "interview_coalesced_requests_total",
+    "Analysis requests by how they were served: leader (ran the pipeline), joined (shared an identical "
+    "in-flight pipeline) or replayed (finished result returned for a repeated Idempotency-Key)",
+    ["endpoint", "outcome"]
+)
+CANCELLED_REQUESTS = Counter(
+    "interview_cancelled_requests_total",
+    "Requests whose work was cancelled, by reason: disconnect (the client went away) or deadline",
+    ["endpoint", "reason"]
+)
+BUDGET_STAGE_OUTCOMES = Counter(
+    "interview_budget_stage_outcomes_total",
+    "Stages run under a caller's latency budget by outcome: completed, partial (some sections "
+    "ready), timed_out, skipped (too little budget left to start) or failed (raised an error)",
+    ["stage", "outcome"]
+)
+BUDGET_RESPONSES = Counter(
+    "interview_budget_responses_total",
+    "Responses to requests with a latency budget: complete, or partial with sections pending",
+    ["outcome"]
+)
+RETRIES = Counter(
+    "interview_provider_retries_total",
+    "Provider calls retried after a transient failure",
+    ["provider"]
+)
+
+IN_FLIGHT = Gauge(
+    "interview_requests_in_flight",
+    "API requests currently being processed",
+    ["endpoint"]
+)
+ADMISSION_QUEUE_DEPTH = Gauge(
+    "interview_admission_queue_depth",
+    "Requests waiting for admission to the heavy endpoints"
+)
+ADMISSION_RESERVED = Gauge(
+    "interview_admission_reserved",
+    "Estimated resources held by admitted requests; resource is memory_bytes or cpu (cores)",
+    ["resource"]
+)
+ADMISSION_WAIT_SECONDS = Histogram(
+    "interview_admission_wait_seconds",
+    "Time a request waited in the admission queue",
+    ["endpoint"],
+    buckets=STAGE_BUCKETS
+)
+ADMISSION_DECISIONS = Counter(
+    "interview_admission_decisions_total",
+    "Admission outcomes: admitted, queued (admitted after waiting), rejected_queue_full or rejected_timeout",
+    ["endpoint", "outcome"]
+)
+EXECUTOR_QUEUE_DEPTH = Gauge(
+    "interview_executor_queue_depth",
+    "Tasks submitted to an executor and not yet finished",
+    ["executor"]
+)
+
+def record_cache_lookup(cache: str, hit: bool) -> None:
+    CACHE_LOOKUPS.labels(cache=cache, result="hit" if hit else "miss").inc()
+
+def track_submission(executor: str, future: Future) -> Future:
+    """Count a submitted task in the executor's queue depth until it finishes"""
+    gauge = EXECUTOR_QUEUE_DEPTH.labels(executor=executor)
+    gauge.inc()
+    future.add_done_callback(lambda _: gauge.dec())
+    return future
+
+def render_metrics() -> tuple[bytes, str]:
+    """The current metrics in the Prometheus text format, with its content type; call from the event loop"""
+    # Work handed to run_in_threadpool: running in a worker thread or waiting for one
+    statistics = anyio.to_thread.current_default_thread_limiter().statistics()
+    EXECUTOR_QUEUE_DEPTH.labels(executor="threadpool").set(statistics.borrowed_tokens + statistics.tasks_waiting)
+    return generate_latest(), CONTENT_TYPE_LATEST
+
+class RequestMetricsMiddleware:
+    """
+    ASGI middleware counting in-flight requests and timing each one until its response body
+    is fully sent, so streamed responses are measured to the end
+    """
+
+    def __init__(self, app, endpoint_label: Callable[[str], str]):
+        self.app = app
+        self.endpoint_label = endpoint_label
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        endpoint = self.endpoint_label(scope["path"])
+        status = "500"
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = str(message["status"])
+            await send(message)
+
+        in_flight = IN_FLIGHT.labels(endpoint=endpoint)
+        in_flight.inc()
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            in_flight.dec()
+            HTTP_REQUEST_SECONDS.labels(endpoint=endpoint, status=status).observe(time.perf_counter() - started)
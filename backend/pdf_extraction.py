@@ -0,0 +1,235 @@
+"""
+PDF Extraction Module
+Pluggable PDF text extraction: pdfium or PyPDF2 backends, page ranges parsed in a process pool,
+pages streamed in order, and extracted text cached by file hash
+"""
+
+import hashlib
+import io
+import logging
+import multiprocessing
+import os
+import re
+import tempfile
+import threading
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Iterator, List, Optional, Union
+
+import PyPDF2
+
+from metrics import record_cache_lookup, track_submission
+
+try:
+    import pypdfium2 as pdfium
+except ImportError:  # pdfium is optional; PyPDF2 is always available
+    pdfium = None
+
+# Setup logging
+logger = logging.getLogger("pdf-extraction")
+
+# "auto" uses pdfium when installed and PyPDF2 otherwise
+PDF_EXTRACTION_BACKEND = os.getenv("PDF_EXTRACTION_BACKEND", "auto").lower()
+# Worker processes for large documents; 0 or 1 parses in the calling thread
+PDF_EXTRACTION_WORKERS = int(os.getenv("PDF_EXTRACTION_WORKERS", str(min(4, os.cpu_count() or 1))))
+# Workers are started fresh ("spawn") or from a clean server process ("forkserver"): forking the
+# multithreaded API process can copy locks held by other threads and deadlock the child
+PDF_POOL_START_METHOD = os.getenv("PDF_POOL_START_METHOD", "spawn")
+# Documents with fewer pages are parsed in-process, where the pool overhead would dominate
+PDF_PARALLEL_MIN_PAGES = int(os.getenv("PDF_PARALLEL_MIN_PAGES", "16"))
+PDF_PAGES_PER_TASK = int(os.getenv("PDF_PAGES_PER_TASK", "8"))
+# Extracted text cache: entries kept in memory, plus an optional directory shared across workers
+PDF_CACHE_MAX_ENTRIES = int(os.getenv("PDF_CACHE_MAX_ENTRIES", "256"))
+PDF_CACHE_DIR = os.getenv("PDF_CACHE_DIR", "")
+
+WHITESPACE_RUN = re.compile(r"\s{2,}")
+
+def resolve_backend(name: str = PDF_EXTRACTION_BACKEND) -> str:
+    if name == "auto":
+        return "pdfium" if pdfium is not None else "pypdf2"
+    if name == "pdfium" and pdfium is None:
+        logger.warning("PDF_EXTRACTION_BACKEND=pdfium but pypdfium2 is not installed, using PyPDF2")
+        return "pypdf2"
+    if name not in ("pdfium", "pypdf2"):
+        raise ValueError(f"Unknown PDF extraction backend: {name}")
+    return name
+
+# PDFium is not thread-safe, even across documents: every call into it in this process (the
+# page count, small documents and the in-process fallback run on request threads) holds this
+_PDFIUM_LOCK = threading.RLock()
+
+class _Document:
+    """An open PDF with a page count and per-page text, independent of the backend"""
+
+    def __init__(self, backend: str, source: Union[bytes, str]):
+        # source is the file content, or the path of a file holding it
+        self.backend = backend
+        if backend == "pdfium":
+            with _PDFIUM_LOCK:
+                self._document = pdfium.PdfDocument(source)
+                self.page_count = len(self._document)
+        else:
+            self._document = PyPDF2.PdfReader(io.BytesIO(source) if isinstance(source, bytes) else source)
+            self.page_count = len(self._document.pages)
+
+    def page_text(self, index: int) -> str:
+        if self.backend == "pdfium":
+            with _PDFIUM_LOCK:
+                page = self._document[index]
+                text_page = page.get_textpage()
+                try:
+                    text = text_page.get_text_range()
+                finally:
+                    text_page.close()
+                    page.close()
+            # pdfium ends lines with \r\n, which the whitespace collapse would turn into spaces
+            return text.replace("\r\n", "\n").replace("\r", "\n")
+        return self._document.pages[index].extract_text() or ""
+
+    def close(self) -> None:
+        if self.backend == "pdfium":
+            with _PDFIUM_LOCK:
+                self._document.close()
+
+def _extract_page_range(backend: str, source: Union[bytes, str], start: int, stop: int) -> List[str]:
+    """Text of pages [start, stop); runs in a worker process, so it opens its own document"""
+    document = _Document(backend, source)
+    try:
+        return [document.page_text(index) for index in range(start, stop)]
+    finally:
+        document.close()
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_lock = threading.Lock()
+
+def _get_pool() -> ProcessPoolExecutor:
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(
+                max_workers=PDF_EXTRACTION_WORKERS,
+                mp_context=multiprocessing.get_context(PDF_POOL_START_METHOD)
+            )
+        return _pool
+
+def _reset_pool() -> None:
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+
+def iter_pdf_pages(content: bytes, backend: Optional[str] = None) -> Iterator[str]:
+    """
+    Yield page texts in order. Large documents are split into page ranges parsed in the
+    process pool; each range is yielded as soon as it and every range before it are done.
+    The workers read the document from a temporary file rather than each receiving a copy.
+    """
+    backend = resolve_backend(backend or PDF_EXTRACTION_BACKEND)
+    document = _Document(backend, content)
+    page_count = document.page_count
+    try:
+        if PDF_EXTRACTION_WORKERS <= 1 or page_count < PDF_PARALLEL_MIN_PAGES:
+            for index in range(page_count):
+                yield document.page_text(index)
+            return
+    finally:
+        document.close()
+
+    ranges = [(start, min(start + PDF_PAGES_PER_TASK, page_count)) for start in range(0, page_count, PDF_PAGES_PER_TASK)]
+    fd, path = tempfile.mkstemp(suffix=".pdf")
+    with os.fdopen(fd, "wb") as f:
+        f.write(content)
+    futures = []
+    try:
+        try:
+            futures = [
+                track_submission("pdf_extraction", _get_pool().submit(_extract_page_range, backend, path, start, stop))
+                for start, stop in ranges
+            ]
+        except BrokenProcessPool:
+            _reset_pool()
+            logger.warning("PDF extraction pool was broken, parsing in-process")
+            yield from _extract_page_range(backend, content, 0, page_count)
+            return
+        for index, future in enumerate(futures):
+            try:
+                pages = future.result()
+            except BrokenProcessPool:
+                _reset_pool()
+                logger.warning("PDF extraction pool broke, parsing the remaining pages in-process")
+                yield from _extract_page_range(backend, content, ranges[index][0], page_count)
+                return
+            yield from pages
+    finally:
+        for future in futures:
+            future.cancel()
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+class ExtractedTextCache:
+    """LRU of extracted text keyed by backend and file hash, optionally persisted to a directory"""
+
+    def __init__(self, max_entries: int, directory: str = ""):
+        self.max_entries = max_entries
+        self.directory = directory
+        self._entries: "OrderedDict[str, str]" = OrderedDict()
+        self._lock = threading.Lock()
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key.replace(':', '-')}.txt")
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                return self._entries[key]
+        if self.directory and os.path.exists(self._path(key)):
+            with open(self._path(key), "r", encoding="utf-8") as f:
+                text = f.read()
+            self._store(key, text)
+            return text
+        return None
+
+    def put(self, key: str, text: str) -> None:
+        self._store(key, text)
+        if self.directory:
+            # Write then rename so concurrent readers never see a partial file
+            temp_path = f"{self._path(key)}.{os.getpid()}.tmp"
+            with open(temp_path, "w", encoding="utf-8") as f:
+                f.write(text)
+            os.replace(temp_path, self._path(key))
+
+    def clear(self) -> None:
+        """Drop the in-memory entries; files in the cache directory are kept"""
+        with self._lock:
+            self._entries.clear()
+
+    def _store(self, key: str, text: str) -> None:
+        with self._lock:
+            self._entries[key] = text
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+TEXT_CACHE = ExtractedTextCache(PDF_CACHE_MAX_ENTRIES, PDF_CACHE_DIR)
+
+def extract_text(content: bytes, backend: Optional[str] = None) -> str:
+    """Whitespace-normalized text of a PDF; repeated uploads of the same file are served from the cache"""
+    backend = resolve_backend(backend or PDF_EXTRACTION_BACKEND)
+    key = f"{backend}:{hashlib.sha256(content).hexdigest()}"
+    cached = TEXT_CACHE.get(key)
+    record_cache_lookup("pdf_text", cached is not None)
+    if cached is not None:
+        logger.debug(f"PDF text cache hit for {key}")
+        return cached
+
+    # Trailing whitespace on a page would merge its last line with the next page's first
+    text = WHITESPACE_RUN.sub(" ", "\n".join(page.rstrip() for page in iter_pdf_pages(content, backend))).strip()
+    TEXT_CACHE.put(key, text)
+    return text
@@ -0,0 +1,252 @@
+"""
+Rate Limiter Module
+Shared per-provider token buckets and the retry policy used for every LLM and transcription call
+"""
+
+import email.utils
+import logging
+import math
+import os
+import random
+import threading
+import time
+from typing import Callable, Dict, Optional, TypeVar
+
+import openai
+from fastapi import HTTPException
+from tenacity import RetryCallState, Retrying, retry_if_exception, stop_after_attempt, stop_after_delay
+
+from cancellation import RequestCancelled, cancellable_sleep, check_cancelled
+from metrics import RETRIES
+
+# Setup logging
+logger = logging.getLogger("rate-limiter")
+
+T = TypeVar("T")
+
+# HTTP statuses worth retrying: timeouts, throttling and transient server errors
+RETRYABLE_STATUS_CODES = {408, 409, 429, 500, 502, 503, 504}
+
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "5"))
+LLM_RETRY_MAX_SECONDS = float(os.getenv("LLM_RETRY_MAX_SECONDS", "120"))
+LLM_RETRY_BACKOFF_CAP_SECONDS = float(os.getenv("LLM_RETRY_BACKOFF_CAP_SECONDS", "30"))
+RATE_LIMIT_MAX_WAIT_SECONDS = float(os.getenv("RATE_LIMIT_MAX_WAIT_SECONDS", "60"))
+
+class RateLimitExceeded(HTTPException):
+    """Raised when a provider stays throttled beyond what the caller is willing to wait"""
+
+    def __init__(self, provider: str, retry_after: float):
+        self.provider = provider
+        self.retry_after = retry_after
+        super().__init__(
+            status_code=429,
+            detail=f"{provider} is rate limiting requests, please retry in {math.ceil(retry_after)} seconds",
+            headers={"Retry-After": str(math.ceil(retry_after))}
+        )
+
+class TokenBucket:
+    """Thread-safe token bucket refilled continuously at a per-minute rate"""
+
+    def __init__(self, per_minute: float, capacity: Optional[float] = None):
+        self.rate = per_minute / 60.0
+        self.capacity = capacity or per_minute
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def _refill(self, now: float) -> None:
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def reserve(self, amount: float) -> float:
+        """Take `amount` from the bucket and return how long the caller must wait before using it"""
+        amount = min(amount, self.capacity)
+        with self.lock:
+            self._refill(time.monotonic())
+            self.tokens -= amount
+            if self.tokens >= 0:
+                return 0.0
+            return -self.tokens / self.rate
+
+    def refund(self, amount: float) -> None:
+        """Return tokens to the bucket, or take more when `amount` is negative"""
+        with self.lock:
+            self._refill(time.monotonic())
+            self.tokens = min(self.capacity, self.tokens + amount)
+
+class ProviderRateLimiter:
+    """Request and token budgets for one provider, shared by every request in the process"""
+
+    def __init__(self, name: str, requests_per_minute: float, tokens_per_minute: Optional[float] = None):
+        self.name = name
+        self.requests = TokenBucket(requests_per_minute)
+        self.tokens = TokenBucket(tokens_per_minute) if tokens_per_minute else None
+        self.blocked_until = 0.0
+        self.lock = threading.Lock()
+
+    def acquire(self, estimated_tokens: int = 0, max_wait: float = RATE_LIMIT_MAX_WAIT_SECONDS) -> None:
+        """Block until the request fits the provider's budgets, or raise if that would take too long"""
+        delay = max(self.blocked_until - time.monotonic(), 0.0)
+        delay = max(delay, self.requests.reserve(1))
+        if self.tokens is not None and estimated_tokens:
+            delay = max(delay, self.tokens.reserve(estimated_tokens))
+
+        if delay > max_wait:
+            # Give the reservation back so callers that do wait are not penalised
+            self._refund(estimated_tokens)
+            raise RateLimitExceeded(self.name, delay)
+
+        if delay > 0:
+            logger.info(f"Waiting {delay:.2f}s for {self.name} rate limit")
+            try:
+                cancellable_sleep(delay)
+            except RequestCancelled:
+                self._refund(estimated_tokens)
+                raise
+
+    def _refund(self, estimated_tokens: int) -> None:
+        self.requests.refund(1)
+        if self.tokens is not None and estimated_tokens:
+            self.tokens.refund(estimated_tokens)
+
+    def record_usage(self, estimated_tokens: int, actual_tokens: Optional[int]) -> None:
+        """Reconcile the token bucket with the usage the provider actually reported"""
+        if self.tokens is not None and actual_tokens is not None:
+            self.tokens.refund(estimated_tokens - actual_tokens)
+
+    def pause(self, seconds: float) -> None:
+        """Hold back every caller after the provider asked us to slow down"""
+        with self.lock:
+            self.blocked_until = max(self.blocked_until, time.monotonic() + seconds)
+
+def _env_limit(name: str, default: str) -> Optional[float]:
+    value = float(os.getenv(name, default))
+    return value if value > 0 else None
+
+# Budgets are per process; set them below the account limits when running several workers
+RATE_LIMITERS: Dict[str, ProviderRateLimiter] = {
+    "openai": ProviderRateLimiter(
+        "openai",
+        _env_limit("OPENAI_REQUESTS_PER_MINUTE", "500"),
+        _env_limit("OPENAI_TOKENS_PER_MINUTE", "800000")
+    ),
+    "openai_audio": ProviderRateLimiter(
+        "openai_audio",
+        _env_limit("OPENAI_AUDIO_REQUESTS_PER_MINUTE", "50")
+    ),
+    "gemini": ProviderRateLimiter(
+        "gemini",
+        _env_limit("GEMINI_REQUESTS_PER_MINUTE", "300"),
+        _env_limit("GEMINI_TOKENS_PER_MINUTE", "1000000")
+    ),
+}
+
+def get_rate_limiter(provider: str) -> ProviderRateLimiter:
+    """Return the shared limiter for a provider"""
+    return RATE_LIMITERS[provider]
+
+def _status_code(exc: BaseException) -> Optional[int]:
+    """HTTP status of an OpenAI or Google API error, if it has one"""
+    status = getattr(exc, "status_code", None)
+    if status is None:
+        status = getattr(exc, "code", None)
+    return status if isinstance(status, int) else None
+
+def is_retryable_error(exc: BaseException) -> bool:
+    """Whether an error is transient and the call should be retried"""
+    if isinstance(exc, (RateLimitExceeded, RequestCancelled)):
+        return False
+    if isinstance(exc, (openai.APIConnectionError, openai.APITimeoutError)):
+        return True
+    return _status_code(exc) in RETRYABLE_STATUS_CODES
+
+def retry_after_seconds(exc: BaseException) -> Optional[float]:
+    """Read the provider's Retry-After hint from an error response"""
+    response = getattr(exc, "response", None)
+    headers = getattr(response, "headers", None)
+    if not headers:
+        return None
+
+    retry_after_ms = headers.get("retry-after-ms")
+    if retry_after_ms:
+        try:
+            return float(retry_after_ms) / 1000
+        except ValueError:
+            pass
+
+    retry_after = headers.get("retry-after")
+    if not retry_after:
+        return None
+    try:
+        return float(retry_after)
+    except ValueError:
+        pass
+    try:
+        retry_at = email.utils.parsedate_to_datetime(retry_after)
+    except (TypeError, ValueError):
+        # Neither seconds nor an HTTP date: fall back to the caller's own backoff
+        return None
+    return max(retry_at.timestamp() - time.time(), 0.0)
+
+def _retry_wait(limiter: ProviderRateLimiter) -> Callable[[RetryCallState], float]:
+    """Honour Retry-After when given, otherwise back off exponentially with full jitter"""
+    def wait(retry_state: RetryCallState) -> float:
+        exc = retry_state.outcome.exception()
+        hinted = retry_after_seconds(exc)
+        if hinted is not None:
+            # Every caller shares the provider's quota, so hold them all back
+            limiter.pause(hinted)
+            return hinted + random.uniform(0, 0.5)
+        ceiling = min(LLM_RETRY_BACKOFF_CAP_SECONDS, 0.5 * 2 ** retry_state.attempt_number)
+        return random.uniform(0, ceiling)
+    return wait
+
+def _log_retry(provider: str) -> Callable[[RetryCallState], None]:
+    def before_sleep(retry_state: RetryCallState) -> None:
+        exc = retry_state.outcome.exception()
+        RETRIES.labels(provider=provider).inc()
+        logger.warning(
+            f"{provider} call failed (attempt {retry_state.attempt_number}): {exc}; "
+            f"retrying in {retry_state.next_action.sleep:.2f}s"
+        )
+    return before_sleep
+
+def call_with_rate_limit(
+    provider: str,
+    func: Callable[[], T],
+    estimated_tokens: int = 0,
+    usage_tokens: Optional[Callable[[T], Optional[int]]] = None
+) -> T:
+    """
+    Run a provider call under the shared rate limiter, retrying transient failures with
+    jittered exponential backoff and Retry-After handling. Throttling that outlasts the
+    retry budget surfaces as a 429 with Retry-After rather than a generic server error.
+    Cancellation of the request is checked before every attempt and cuts backoff short.
+    """
+    limiter = get_rate_limiter(provider)
+    retrying = Retrying(
+        retry=retry_if_exception(is_retryable_error),
+        stop=stop_after_attempt(LLM_MAX_RETRIES + 1) | stop_after_delay(LLM_RETRY_MAX_SECONDS),
+        wait=_retry_wait(limiter),
+        before_sleep=_log_retry(provider),
+        sleep=cancellable_sleep,
+        reraise=True
+    )
+
+    try:
+        for attempt in retrying:
+            with attempt:
+                check_cancelled()
+                limiter.acquire(estimated_tokens)
+                result = func()
+    except RateLimitExceeded:
+        # Already carries the wait a nested call settled on
+        raise
+    except Exception as e:
+        if _status_code(e) == 429:
+            raise RateLimitExceeded(provider, retry_after_seconds(e) or LLM_RETRY_BACKOFF_CAP_SECONDS) from e
+        raise
+
+    if usage_tokens is not None:
+        limiter.record_usage(estimated_tokens, usage_tokens(result))
+    return result
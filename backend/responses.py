@@ -0,0 +1,167 @@
+"""
+Responses Module
+Response encoding: field projection for the large analysis responses, fast JSON for untyped
+payloads and gzip/brotli compression negotiated from Accept-Encoding
+"""
+
+import gzip
+import json
+import logging
+import os
+from typing import Any, Optional, Set, Tuple, Type
+
+from fastapi import HTTPException
+from fastapi.responses import Response
+from pydantic import BaseModel
+
+try:
+    import orjson
+except ImportError:  # Untyped payloads fall back to the standard library encoder
+    orjson = None
+
+try:
+    import brotli
+except ImportError:  # Without brotli only gzip is offered
+    brotli = None
+
+# Setup logging
+logger = logging.getLogger("responses")
+
+RESPONSE_COMPRESSION_ENABLED = os.getenv("RESPONSE_COMPRESSION_ENABLED", "true").lower() == "true"
+# Bodies smaller than this are sent as they are; compressing them costs more than it saves
+RESPONSE_COMPRESSION_MIN_BYTES = int(os.getenv("RESPONSE_COMPRESSION_MIN_BYTES", "1024"))
+# Fast settings: transcripts compress well at low levels, and the CPU is spent on every response
+RESPONSE_GZIP_LEVEL = int(os.getenv("RESPONSE_GZIP_LEVEL", "5"))
+RESPONSE_BROTLI_QUALITY = int(os.getenv("RESPONSE_BROTLI_QUALITY", "4"))
+
+_COMPRESSIBLE_TYPES = ("application/json", "text/")
+
+def dumps(content: Any) -> bytes:
+    """Compact JSON bytes for plain data (dicts, lists, strings), with orjson when installed"""
+    if orjson is not None:
+        return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(content, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+def parse_fields(model: Type[BaseModel], fields: Optional[str]) -> Tuple[Optional[Set[str]], Optional[Set[str]]]:
+    """
+    Parse a fields= projection into (include, exclude) sets of top-level field names. Names are
+    comma-separated; a leading "-" omits the field, e.g. "-raw_transcript,-formatted_transcript".
+    """
+    if not fields or not fields.strip():
+        return None, None
+    include: Set[str] = set()
+    exclude: Set[str] = set()
+    for name in (part.strip() for part in fields.split(",")):
+        if not name:
+            continue
+        target = exclude if name.startswith("-") else include
+        name = name.lstrip("-")
+        if name not in model.model_fields:
+            raise HTTPException(
+                status_code=422,
+                detail=f"Unknown field '{name}' in fields; valid fields are: {', '.join(model.model_fields)}"
+            )
+        target.add(name)
+    return include or None, exclude or None
+
+def encode_model(model: BaseModel, fields: Optional[str] = None) -> bytes:
+    """JSON bytes for a model, serialized by pydantic-core and restricted to the projected fields"""
+    include, exclude = parse_fields(type(model), fields)
+    return model.model_dump_json(include=include, exclude=exclude).encode("utf-8")
+
+def projected_response(model: BaseModel, fields: Optional[str] = None) -> Response:
+    """
+    Response for a model restricted to the projected fields. The model was built and validated by
+    the endpoint, so it is serialized once, straight to bytes, instead of being validated again
+    against the response model.
+    """
+    return Response(content=encode_model(model, fields), media_type="application/json")
+
+def _accepted_encoding(accept_encoding: str) -> Optional[str]:
+    """The best encoding the client accepts: brotli when available, then gzip"""
+    accepted = {}
+    for part in accept_encoding.split(","):
+        coding, _, params = part.strip().partition(";")
+        quality = 1.0
+        if params.strip().startswith("q="):
+            try:
+                quality = float(params.strip()[2:])
+            except ValueError:
+                quality = 0.0
+        accepted[coding.strip().lower()] = quality
+    wildcard = accepted.get("*", 0.0)
+    for coding in ("br", "gzip"):
+        if coding == "br" and brotli is None:
+            continue
+        if accepted.get(coding, wildcard) > 0:
+            return coding
+    return None
+
+def _compress(body: bytes, coding: str) -> bytes:
+    if coding == "br":
+        return brotli.compress(body, quality=RESPONSE_BROTLI_QUALITY)
+    return gzip.compress(body, compresslevel=RESPONSE_GZIP_LEVEL)
+
+class CompressionMiddleware:
+    """
+    ASGI middleware compressing complete JSON and text responses with the best encoding the client
+    accepts. Streamed responses (NDJSON progress) pass through untouched so each line is delivered
+    as soon as it is written.
+    """
+
+    def __init__(self, app, minimum_size: int = RESPONSE_COMPRESSION_MIN_BYTES):
+        self.app = app
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope, receive, send):
+        if not RESPONSE_COMPRESSION_ENABLED or scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        headers = dict(scope.get("headers") or [])
+        coding = _accepted_encoding(headers.get(b"accept-encoding", b"").decode("latin-1"))
+        if coding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start_message = None
+        passthrough = False
+
+        async def send_compressed(message):
+            nonlocal start_message, passthrough
+            if passthrough:
+                await send(message)
+                return
+            if message["type"] == "http.response.start":
+                response_headers = dict(message.get("headers") or [])
+                content_type = response_headers.get(b"content-type", b"").decode("latin-1")
+                if b"content-encoding" in response_headers or not content_type.startswith(_COMPRESSIBLE_TYPES):
+                    passthrough = True
+                    await send(message)
+                else:
+                    # Hold the start until the body shows whether the response is complete
+                    start_message = message
+                return
+            if message["type"] != "http.response.body":
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            raw_headers = [(k, v) for k, v in start_message.get("headers", []) if k.lower() != b"content-length"]
+            raw_headers.append((b"vary", b"Accept-Encoding"))
+            if message.get("more_body", False) or len(body) < self.minimum_size:
+                passthrough = True
+                if not message.get("more_body", False):
+                    raw_headers.append((b"content-length", str(len(body)).encode("latin-1")))
+                await send({**start_message, "headers": raw_headers})
+                await send(message)
+                return
+
+            compressed = _compress(body, coding)
+            raw_headers += [
+                (b"content-encoding", coding.encode("latin-1")),
+                (b"content-length", str(len(compressed)).encode("latin-1")),
+            ]
+            await send({**start_message, "headers": raw_headers})
+            await send({"type": "http.response.body", "body": compressed})
+
+        await self.app(scope, receive, send_compressed)
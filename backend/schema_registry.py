@@ -0,0 +1,136 @@
+"""
+Schema Registry Module
+Strict structured-output schemas derived once from the Pydantic models, with cached validators
+"""
+
+import logging
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Tuple, Type, TypeVar
+
+from pydantic import BaseModel, TypeAdapter, ValidationError
+
+# Setup logging
+logger = logging.getLogger("schema-registry")
+
+M = TypeVar("M", bound=BaseModel)
+
+# Keywords that only document the schema and are not needed by the providers
+DROPPED_KEYWORDS = {"title", "default"}
+# Keywords whose value maps property names to schemas; the names are data, never keywords
+SCHEMA_MAP_KEYWORDS = {"properties", "patternProperties", "$defs", "definitions"}
+# Keywords whose value is instance data, copied as it is
+LITERAL_KEYWORDS = {"enum", "const", "examples"}
+
+@dataclass(frozen=True)
+class ItemError:
+    index: Optional[int]
+    field: str
+    message: str
+    type: str
+
+def _inline_refs(node: Any, defs: Dict[str, Any]) -> Any:
+    """Replace $ref pointers with their definitions so every provider can read the schema"""
+    if isinstance(node, dict):
+        if "$ref" in node:
+            return _inline_refs(defs[node["$ref"].split("/")[-1]], defs)
+        return {key: _inline_refs(value, defs) for key, value in node.items() if key != "$defs"}
+    if isinstance(node, list):
+        return [_inline_refs(value, defs) for value in node]
+    return node
+
+def _make_strict(node: Any) -> Any:
+    """Require every property and forbid extra ones, as strict structured outputs expect"""
+    if isinstance(node, dict):
+        strict = {}
+        for key, value in node.items():
+            if key in DROPPED_KEYWORDS:
+                continue
+            if key in SCHEMA_MAP_KEYWORDS and isinstance(value, dict):
+                strict[key] = {name: _make_strict(schema) for name, schema in value.items()}
+            elif key in LITERAL_KEYWORDS:
+                strict[key] = value
+            else:
+                strict[key] = _make_strict(value)
+        node = strict
+        if node.get("type") == "object" and "properties" in node:
+            node["required"] = list(node["properties"])
+            node["additionalProperties"] = False
+        return node
+    if isinstance(node, list):
+        return [_make_strict(value) for value in node]
+    return node
+
+def strict_json_schema(model: Type[BaseModel]) -> Dict[str, Any]:
+    """Strict, self-contained JSON schema for a Pydantic model"""
+    schema = model.model_json_schema()
+    return _make_strict(_inline_refs(schema, schema.get("$defs", {})))
+
+class SchemaRegistry:
+    """Response formats built from the models once, looked up by name at request time"""
+
+    def __init__(self):
+        self._formats: Dict[str, Dict[str, Any]] = {}
+        self._models: Dict[str, Type[BaseModel]] = {}
+
+    def register(self, name: str, model: Type[BaseModel]) -> Dict[str, Any]:
+        """Derive and store the response_format for a model; returns the stored format"""
+        response_format = {
+            "type": "json_schema",
+            "json_schema": {"name": name, "strict": True, "schema": strict_json_schema(model)}
+        }
+        self._formats[name] = response_format
+        self._models[name] = model
+        logger.debug(f"Registered response schema '{name}' from {model.__name__}")
+        return response_format
+
+    def response_format(self, name: str) -> Dict[str, Any]:
+        """The shared format for a schema; treat it as read-only"""
+        return self._formats[name]
+
+    def model(self, name: str) -> Type[BaseModel]:
+        return self._models[name]
+
+    def names(self) -> List[str]:
+        return list(self._formats)
+
+SCHEMAS = SchemaRegistry()
+
+@lru_cache(maxsize=None)
+def get_type_adapter(tp: Any) -> TypeAdapter:
+    """TypeAdapter for a type, built once per process"""
+    return TypeAdapter(tp)
+
+def _item_errors(error: ValidationError, indexed: bool) -> List[ItemError]:
+    errors = []
+    for detail in error.errors():
+        loc = list(detail["loc"])
+        index = loc.pop(0) if indexed and loc and isinstance(loc[0], int) else None
+        errors.append(ItemError(
+            index=index,
+            field=".".join(str(part) for part in loc),
+            message=detail["msg"],
+            type=detail["type"]
+        ))
+    return errors
+
+def validate_item(model: Type[M], item: Any) -> Tuple[Optional[M], List[ItemError]]:
+    """Validate one item, returning the instance or the structured errors"""
+    try:
+        return get_type_adapter(model).validate_python(item), []
+    except ValidationError as e:
+        return None, _item_errors(e, indexed=False)
+
+def validate_items(model: Type[M], items: List[Any]) -> Tuple[List[M], List[ItemError]]:
+    """
+    Validate a whole list in one pass. Invalid items are dropped and reported with their
+    index; the valid ones are returned in order.
+    """
+    adapter = get_type_adapter(List[model])
+    try:
+        return adapter.validate_python(items), []
+    except ValidationError as e:
+        errors = _item_errors(e, indexed=True)
+    invalid = {error.index for error in errors}
+    valid = adapter.validate_python([item for i, item in enumerate(items) if i not in invalid])
+    return valid, errors
@@ -0,0 +1,140 @@
+"""
+Single Flight Module
+Request coalescing: concurrent identical requests share one in-flight pipeline, and an
+Idempotency-Key replays the finished result to explicit retries
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple, TypeVar
+
+from fastapi import HTTPException
+
+from cancellation import CancelToken, bind_token
+from metrics import COALESCED_REQUESTS
+
+# Setup logging
+logger = logging.getLogger("single-flight")
+
+T = TypeVar("T")
+
+SINGLE_FLIGHT_ENABLED = os.getenv("SINGLE_FLIGHT_ENABLED", "true").lower() == "true"
+# How long a finished result stays available to retries carrying the same Idempotency-Key
+IDEMPOTENCY_TTL_SECONDS = float(os.getenv("IDEMPOTENCY_TTL_SECONDS", "600"))
+IDEMPOTENCY_MAX_ENTRIES = int(os.getenv("IDEMPOTENCY_MAX_ENTRIES", "256"))
+
+def request_fingerprint(endpoint: str, *parts: Any) -> str:
+    """Stable hash of an endpoint and everything that determines its result (content hashes, parameters)"""
+    payload = json.dumps([endpoint, *parts], sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+@dataclass
+class _Flight:
+    task: asyncio.Task
+    fingerprint: str
+    # Shared work is cancelled by its own token, not by whichever caller started it
+    token: CancelToken
+    waiters: int = 0
+    idempotency_keys: set = field(default_factory=set)
+
+class SingleFlight:
+    """
+    In-flight pipelines keyed by request fingerprint, owned by the event loop. The pipeline runs
+    as its own task, so a caller that goes away does not fail the others; it is cancelled only
+    when every caller has gone.
+    """
+
+    @staticmethod
+    async def _run_flight(token: CancelToken, work: Awaitable[T]) -> T:
+        bind_token(token)
+        return await work
+
+    def __init__(self, result_ttl: float, max_results: int):
+        self.result_ttl = result_ttl
+        self.max_results = max_results
+        self._flights: Dict[str, _Flight] = {}
+        self._by_idempotency_key: Dict[str, _Flight] = {}
+        self._results: "OrderedDict[str, Tuple[float, str, Any]]" = OrderedDict()
+
+    def _stored_result(self, idempotency_key: str) -> Optional[Tuple[str, Any]]:
+        entry = self._results.get(idempotency_key)
+        if entry is None:
+            return None
+        expires, fingerprint, result = entry
+        if expires < time.monotonic():
+            del self._results[idempotency_key]
+            return None
+        return fingerprint, result
+
+    def _store_result(self, idempotency_key: str, fingerprint: str, result: Any) -> None:
+        self._results[idempotency_key] = (time.monotonic() + self.result_ttl, fingerprint, result)
+        self._results.move_to_end(idempotency_key)
+        while len(self._results) > self.max_results:
+            self._results.popitem(last=False)
+
+    def _finish(self, fingerprint: str, flight: _Flight) -> None:
+        if self._flights.get(fingerprint) is flight:
+            del self._flights[fingerprint]
+        for key in flight.idempotency_keys:
+            if self._by_idempotency_key.get(key) is flight:
+                del self._by_idempotency_key[key]
+        if flight.task.cancelled():
+            return
+        # Retrieve the exception so an abandoned failure is not reported as never retrieved
+        if flight.task.exception() is None:
+            for key in flight.idempotency_keys:
+                self._store_result(key, fingerprint, flight.task.result())
+
+    async def run(
+        self,
+        endpoint: str,
+        fingerprint: str,
+        func: Callable[[], Awaitable[T]],
+        idempotency_key: Optional[str] = None
+    ) -> T:
+        """Result of func for this fingerprint, joining an identical pipeline already in flight"""
+        if not SINGLE_FLIGHT_ENABLED:
+            return await func()
+
+        if idempotency_key:
+            idempotency_key = f"{endpoint}:{idempotency_key}"
+            stored = self._stored_result(idempotency_key)
+            keyed = self._by_idempotency_key.get(idempotency_key)
+            reused_fingerprint = stored[0] if stored else keyed.fingerprint if keyed else None
+            if reused_fingerprint is not None and reused_fingerprint != fingerprint:
+                raise HTTPException(status_code=422, detail="Idempotency-Key was already used with a different request")
+            if stored is not None:
+                COALESCED_REQUESTS.labels(endpoint=endpoint, outcome="replayed").inc()
+                return stored[1]
+
+        flight = self._flights.get(fingerprint)
+        if flight is None:
+            token = CancelToken()
+            flight = _Flight(asyncio.ensure_future(self._run_flight(token, func())), fingerprint, token)
+            self._flights[fingerprint] = flight
+            flight.task.add_done_callback(lambda _: self._finish(fingerprint, flight))
+            COALESCED_REQUESTS.labels(endpoint=endpoint, outcome="leader").inc()
+        else:
+            logger.info(f"Joining in-flight {endpoint} request {fingerprint[:12]}")
+            COALESCED_REQUESTS.labels(endpoint=endpoint, outcome="joined").inc()
+        if idempotency_key:
+            flight.idempotency_keys.add(idempotency_key)
+            self._by_idempotency_key[idempotency_key] = flight
+
+        flight.waiters += 1
+        try:
+            return await asyncio.shield(flight.task)
+        finally:
+            flight.waiters -= 1
+            if flight.waiters == 0 and not flight.task.done():
+                logger.info(f"Every caller of {endpoint} request {fingerprint[:12]} has gone, cancelling it")
+                flight.token.cancel("abandoned")
+                flight.task.cancel()
+
+SINGLE_FLIGHT = SingleFlight(IDEMPOTENCY_TTL_SECONDS, IDEMPOTENCY_MAX_ENTRIES)
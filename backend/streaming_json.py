@@ -0,0 +1,77 @@
+"""
+Streaming JSON Module
+Incremental parsing of streamed structured-output responses, emitting array items as soon as they close
+"""
+
+import json
+import logging
+from typing import Any, Callable, List, Optional
+
+# Setup logging
+logger = logging.getLogger("streaming-json")
+
+class JSONArrayItemParser:
+    """
+    Incrementally scan a streamed JSON object and hand each object in one of its
+    top-level arrays (e.g. {"assessments": [{...}, {...}]}) to `on_item` the moment
+    its closing brace arrives. Text is fed in arbitrary chunks; strings and escapes
+    may be split across chunk boundaries.
+    """
+
+    def __init__(self, key: str, on_item: Callable[[Any], None]):
+        self.key = key
+        self.on_item = on_item
+        self.depth = 0
+        self.in_string = False
+        self.escape = False
+        self.key_chars: List[str] = []
+        self.last_key: Optional[str] = None
+        self.in_target = False
+        self.item_chars: Optional[List[str]] = None
+        self.items_emitted = 0
+
+    def feed(self, text: str) -> None:
+        """Consume the next chunk of streamed text"""
+        for ch in text:
+            if self.item_chars is not None:
+                self.item_chars.append(ch)
+
+            if self.in_string:
+                if self.escape:
+                    self.escape = False
+                elif ch == "\\":
+                    self.escape = True
+                elif ch == '"':
+                    self.in_string = False
+                    if self.depth == 1:
+                        self.last_key = "".join(self.key_chars)
+                elif self.depth == 1:
+                    self.key_chars.append(ch)
+                continue
+
+            if ch == '"':
+                self.in_string = True
+                if self.depth == 1:
+                    self.key_chars = []
+            elif ch == "{" or ch == "[":
+                self.depth += 1
+                if ch == "[" and self.depth == 2 and self.last_key == self.key:
+                    self.in_target = True
+                elif ch == "{" and self.in_target and self.depth == 3:
+                    self.item_chars = [ch]
+            elif ch == "}" or ch == "]":
+                if ch == "}" and self.in_target and self.depth == 3 and self.item_chars is not None:
+                    self._emit("".join(self.item_chars))
+                    self.item_chars = None
+                self.depth -= 1
+                if self.depth == 1:
+                    self.in_target = False
+
+    def _emit(self, item_text: str) -> None:
+        try:
+            item = json.loads(item_text)
+        except ValueError as e:
+            logger.warning(f"Skipping malformed '{self.key}' item: {str(e)}")
+            return
+        self.items_emitted += 1
+        self.on_item(item)
@@ -0,0 +1,38 @@
+import asyncio
+import time
+
+import pytest
+
+import latency_budget
+from latency_budget import BudgetExceeded, LatencyBudget
+
+def fail():
+    raise ValueError("provider error")
+
+def outcomes(budget):
+    return [(decision.stage, decision.outcome) for decision in budget.report().stages]
+
+def test_run_records_a_failed_stage():
+    budget = LatencyBudget(30)
+    with pytest.raises(ValueError):
+        asyncio.run(budget.run("format", fail))
+    assert outcomes(budget) == [("format", "failed")]
+
+def test_run_records_a_timed_out_stage(monkeypatch):
+    monkeypatch.setattr(latency_budget, "BUDGET_RESERVE_SECONDS", 0)
+    monkeypatch.setattr(latency_budget, "BUDGET_MIN_STAGE_SECONDS", 0)
+    budget = LatencyBudget(0.2)
+    with pytest.raises(BudgetExceeded):
+        asyncio.run(budget.run("format", time.sleep, 0.5))
+    assert outcomes(budget) == [("format", "timed_out")]
+
+def test_call_records_a_failed_stage():
+    budget = LatencyBudget(30)
+    with pytest.raises(ValueError):
+        budget.stage("summary").call(fail)
+    assert outcomes(budget) == [("summary", "failed")]
+
+def test_call_records_a_completed_stage():
+    budget = LatencyBudget(30)
+    assert budget.stage("summary").call(lambda: "done") == "done"
+    assert outcomes(budget) == [("summary", "completed")]
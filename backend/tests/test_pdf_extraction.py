@@ -0,0 +1,44 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+import pdf_extraction
+from benchmarks.fixtures import make_analysis_pdf, make_pdf
+from pdf_extraction import extract_text
+from transcript_stats import scan_transcript
+
+TRANSCRIPT_PDF = make_pdf([
+    ["Interviewer: Tell me about your last project.", "Candidate: I built a billing service."],
+    ["Interviewer: How did you test it?", "Candidate: With contract tests and load tests."],
+])
+
+BACKENDS = ["pypdf2"] + (["pdfium"] if pdf_extraction.pdfium is not None else [])
+
+@pytest.fixture(autouse=True)
+def no_cache(monkeypatch):
+    monkeypatch.setattr(pdf_extraction, "TEXT_CACHE", pdf_extraction.ExtractedTextCache(0))
+
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_lines_are_kept(backend):
+    text = extract_text(TRANSCRIPT_PDF, backend)
+    assert text.split("\n") == [
+        "Interviewer: Tell me about your last project.",
+        "Candidate: I built a billing service.",
+        "Interviewer: How did you test it?",
+        "Candidate: With contract tests and load tests.",
+    ]
+    assert scan_transcript(text).statistics.speaker_turns == 4
+
+@pytest.mark.skipif(pdf_extraction.pdfium is None, reason="pypdfium2 is not installed")
+@pytest.mark.parametrize("content", [TRANSCRIPT_PDF, make_analysis_pdf(3, "Reviewer", seed=11)])
+def test_backends_agree(content):
+    assert extract_text(content, "pdfium") == extract_text(content, "pypdf2")
+
+@pytest.mark.skipif(pdf_extraction.pdfium is None, reason="pypdfium2 is not installed")
+def test_concurrent_in_process_extraction(monkeypatch):
+    monkeypatch.setattr(pdf_extraction, "PDF_EXTRACTION_WORKERS", 1)
+    content = make_analysis_pdf(6, "Reviewer", seed=12)
+    expected = extract_text(content, "pdfium")
+    with ThreadPoolExecutor(8) as executor:
+        results = list(executor.map(lambda _: extract_text(content, "pdfium"), range(32)))
+    assert results == [expected] * 32
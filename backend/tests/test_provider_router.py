@@ -0,0 +1,38 @@
+import pytest
+
+import llm_providers
+from llm_providers import ProviderRouter
+
+@pytest.fixture(autouse=True)
+def configured(monkeypatch):
+    monkeypatch.setenv("OPENAI_API_KEY", "test")
+    monkeypatch.setenv("GEMINI_API_KEY", "test")
+    monkeypatch.setattr(llm_providers, "ROUTER_EXPLORATION_RATE", 0.0)
+
+def record(router, provider, latency, ok, count):
+    for _ in range(count):
+        router.record(provider, latency, ok)
+
+def test_provider_with_only_failures_ranks_last():
+    router = ProviderRouter(["openai", "gemini"])
+    record(router, "openai", 0.1, False, 10)
+    record(router, "gemini", 3.0, True, 10)
+    assert router.rank() == ["gemini", "openai"]
+
+def test_unhealthy_provider_ranks_after_slower_healthy_one():
+    router = ProviderRouter(["openai", "gemini"])
+    record(router, "openai", 0.1, True, 5)
+    record(router, "openai", 0.1, False, 5)
+    record(router, "gemini", 5.0, True, 10)
+    assert router.rank() == ["gemini", "openai"]
+
+def test_configured_order_kept_when_only_one_provider_has_data():
+    router = ProviderRouter(["openai", "gemini"])
+    record(router, "openai", 4.0, True, 10)
+    assert router.rank() == ["openai", "gemini"]
+
+def test_faster_provider_ranks_first():
+    router = ProviderRouter(["openai", "gemini"])
+    record(router, "openai", 4.0, True, 10)
+    record(router, "gemini", 1.0, True, 10)
+    assert router.rank() == ["gemini", "openai"]
@@ -0,0 +1,32 @@
+from types import SimpleNamespace
+
+import pytest
+
+import rate_limiter
+from rate_limiter import RateLimitExceeded, call_with_rate_limit, retry_after_seconds
+
+def error_with_headers(headers):
+    error = Exception("throttled")
+    error.response = SimpleNamespace(headers=headers)
+    return error
+
+@pytest.mark.parametrize("headers, expected", [
+    ({"retry-after-ms": "1500"}, 1.5),
+    ({"retry-after": "7"}, 7.0),
+    ({"retry-after": "Wed, 21 Oct 2015 07:28:00 GMT"}, 0.0),
+    ({"retry-after": "soon"}, None),
+    ({"retry-after": "Wed, 99 Foo 2015"}, None),
+    ({}, None),
+])
+def test_retry_after_seconds(headers, expected):
+    assert retry_after_seconds(error_with_headers(headers)) == expected
+
+def test_nested_rate_limit_keeps_its_retry_after(monkeypatch):
+    monkeypatch.setattr(rate_limiter, "LLM_MAX_RETRIES", 0)
+
+    def throttled():
+        raise RateLimitExceeded("openai", 42)
+
+    with pytest.raises(RateLimitExceeded) as raised:
+        call_with_rate_limit("openai", throttled)
+    assert raised.value.retry_after == 42
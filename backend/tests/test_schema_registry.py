@@ -0,0 +1,37 @@
+from typing import List, Optional
+
+from pydantic import BaseModel, Field
+
+from schema_registry import strict_json_schema, validate_items
+
+class Reference(BaseModel):
+    title: str = Field(title="Reference title")
+    default: Optional[int] = 3
+
+class Document(BaseModel):
+    title: str
+    references: List[Reference]
+
+def test_fields_named_like_keywords_are_kept():
+    schema = strict_json_schema(Document)
+    assert list(schema["properties"]) == ["title", "references"]
+    reference = schema["properties"]["references"]["items"]
+    assert list(reference["properties"]) == ["title", "default"]
+    assert reference["required"] == ["title", "default"]
+
+def test_documentation_keywords_are_dropped():
+    schema = strict_json_schema(Document)
+    reference = schema["properties"]["references"]["items"]
+    assert "title" not in schema
+    assert "title" not in reference["properties"]["title"]
+    assert "default" not in reference["properties"]["default"]
+    assert reference["additionalProperties"] is False
+
+def test_refs_are_inlined():
+    assert "$defs" not in strict_json_schema(Document)
+    assert "$ref" not in str(strict_json_schema(Document))
+
+def test_invalid_items_are_reported_and_dropped():
+    valid, errors = validate_items(Reference, [{"title": "a"}, {"default": 1}, {"title": "c", "default": 2}])
+    assert [item.title for item in valid] == ["a", "c"]
+    assert [(error.index, error.field) for error in errors] == [(1, "title")]
@@ -0,0 +1,179 @@
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+
+import single_flight
+from single_flight import SingleFlight, request_fingerprint
+
+def run(coro):
+    return asyncio.run(coro)
+
+def test_concurrent_callers_share_one_pipeline():
+    flight = SingleFlight(result_ttl=60, max_results=8)
+    calls = 0
+
+    async def pipeline():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.05)
+        return {"result": calls}
+
+    async def main():
+        return await asyncio.gather(*(flight.run("/analyze", "fp", pipeline) for _ in range(4)))
+
+    results = run(main())
+    assert calls == 1
+    assert results == [{"result": 1}] * 4
+
+def test_different_fingerprints_run_separately():
+    flight = SingleFlight(result_ttl=60, max_results=8)
+
+    async def main():
+        async def pipeline(value):
+            await asyncio.sleep(0.01)
+            return value
+        return await asyncio.gather(
+            flight.run("/analyze", "a", lambda: pipeline("a")),
+            flight.run("/analyze", "b", lambda: pipeline("b"))
+        )
+
+    assert run(main()) == ["a", "b"]
+
+def test_leader_exception_reaches_every_follower():
+    flight = SingleFlight(result_ttl=60, max_results=8)
+    calls = 0
+
+    async def pipeline():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.05)
+        raise HTTPException(status_code=502, detail="provider failed")
+
+    async def main():
+        return await asyncio.gather(
+            *(flight.run("/analyze", "fp", pipeline) for _ in range(3)),
+            return_exceptions=True
+        )
+
+    results = run(main())
+    assert calls == 1
+    assert all(isinstance(result, HTTPException) and result.status_code == 502 for result in results)
+
+def test_finished_flight_is_not_joined():
+    flight = SingleFlight(result_ttl=60, max_results=8)
+    calls = 0
+
+    async def pipeline():
+        nonlocal calls
+        calls += 1
+        return calls
+
+    async def main():
+        first = await flight.run("/analyze", "fp", pipeline)
+        second = await flight.run("/analyze", "fp", pipeline)
+        return first, second
+
+    assert run(main()) == (1, 2)
+
+def test_idempotency_key_replays_the_finished_result():
+    flight = SingleFlight(result_ttl=60, max_results=8)
+    calls = 0
+
+    async def pipeline():
+        nonlocal calls
+        calls += 1
+        return calls
+
+    async def main():
+        first = await flight.run("/analyze", "fp", pipeline, idempotency_key="key-1")
+        replay = await flight.run("/analyze", "fp", pipeline, idempotency_key="key-1")
+        other_key = await flight.run("/analyze", "fp", pipeline, idempotency_key="key-2")
+        return first, replay, other_key
+
+    assert run(main()) == (1, 1, 2)
+    assert calls == 2
+
+def test_idempotency_key_reused_for_a_different_request_is_rejected():
+    flight = SingleFlight(result_ttl=60, max_results=8)
+
+    async def pipeline():
+        return "done"
+
+    async def main():
+        await flight.run("/analyze", "fp-1", pipeline, idempotency_key="key")
+        await flight.run("/analyze", "fp-2", pipeline, idempotency_key="key")
+
+    with pytest.raises(HTTPException) as error:
+        run(main())
+    assert error.value.status_code == 422
+
+def test_idempotency_result_expires(monkeypatch):
+    flight = SingleFlight(result_ttl=10, max_results=8)
+    now = [1000.0]
+    monkeypatch.setattr(single_flight.time, "monotonic", lambda: now[0])
+    calls = 0
+
+    async def pipeline():
+        nonlocal calls
+        calls += 1
+        return calls
+
+    async def main():
+        first = await flight.run("/analyze", "fp", pipeline, idempotency_key="key")
+        now[0] += 5
+        replay = await flight.run("/analyze", "fp", pipeline, idempotency_key="key")
+        now[0] += 10
+        expired = await flight.run("/analyze", "fp", pipeline, idempotency_key="key")
+        return first, replay, expired
+
+    assert run(main()) == (1, 1, 2)
+
+def test_idempotency_results_are_bounded():
+    flight = SingleFlight(result_ttl=60, max_results=2)
+    calls = 0
+
+    async def pipeline():
+        nonlocal calls
+        calls += 1
+        return calls
+
+    async def main():
+        for key in ("a", "b", "c"):
+            await flight.run("/analyze", "fp", pipeline, idempotency_key=key)
+        # "a" was evicted, so it runs again; "c" is replayed
+        return (
+            await flight.run("/analyze", "fp", pipeline, idempotency_key="a"),
+            await flight.run("/analyze", "fp", pipeline, idempotency_key="c")
+        )
+
+    assert run(main()) == (4, 3)
+
+def test_pipeline_is_cancelled_when_every_caller_leaves():
+    flight = SingleFlight(result_ttl=60, max_results=8)
+    cancelled = []
+
+    async def pipeline():
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelled.append(True)
+            raise
+
+    async def main():
+        callers = [asyncio.ensure_future(flight.run("/analyze", "fp", pipeline)) for _ in range(2)]
+        await asyncio.sleep(0.01)
+        callers[0].cancel()
+        await asyncio.sleep(0.01)
+        assert not cancelled
+        callers[1].cancel()
+        await asyncio.gather(*callers, return_exceptions=True)
+        await asyncio.sleep(0.01)
+
+    run(main())
+    assert cancelled == [True]
+
+def test_fingerprint_depends_on_every_part():
+    assert request_fingerprint("/analyze", "hash", ["Python"]) == request_fingerprint("/analyze", "hash", ["Python"])
+    assert request_fingerprint("/analyze", "hash", ["Python"]) != request_fingerprint("/analyze", "hash", ["SQL"])
+    assert request_fingerprint("/analyze", "hash") != request_fingerprint("/compare", "hash")
@@ -0,0 +1,64 @@
+import json
+
+import pytest
+
+from streaming_json import JSONArrayItemParser
+
+ITEMS = [
+    {"skill": "Python", "evidence": "Said \"use a {dict}\" and [lists]", "scores": [1, [2, 3]], "notes": {"a": {"b": []}}},
+    {"skill": "SQL \\ joins", "evidence": "Unicode é and \\u escapes — here", "scores": [], "notes": {}},
+    {"skill": "}]{[", "evidence": "", "scores": [4], "notes": {"\"quoted\" key": "value, with: punctuation"}},
+]
+DOCUMENT = json.dumps({"summary": "assessments", "assessments": ITEMS, "other": [{"skill": "ignored"}]})
+
+def parse(chunks, key="assessments"):
+    items = []
+    parser = JSONArrayItemParser(key, items.append)
+    for chunk in chunks:
+        parser.feed(chunk)
+    return items, parser
+
+def chunked(text, size):
+    return [text[i:i + size] for i in range(0, len(text), size)]
+
+def test_whole_document():
+    items, parser = parse([DOCUMENT])
+    assert items == ITEMS
+    assert parser.items_emitted == 3
+
+@pytest.mark.parametrize("size", [1, 2, 3, 5, 7, 16])
+def test_every_chunk_size(size):
+    assert parse(chunked(DOCUMENT, size))[0] == ITEMS
+
+def test_every_split_point():
+    # Splits land inside strings, between a backslash and the escaped character, and between
+    # the opening and closing brackets of nested objects and arrays
+    for split in range(1, len(DOCUMENT)):
+        assert parse([DOCUMENT[:split], DOCUMENT[split:]])[0] == ITEMS, split
+
+def test_split_across_escape_sequences():
+    document = json.dumps({"assessments": [{"text": "a \"quote\" and a \\ backslash"}]})
+    backslash = document.index("\\")
+    items, _ = parse([document[:backslash + 1], document[backslash + 1:]])
+    assert items == [{"text": "a \"quote\" and a \\ backslash"}]
+
+def test_items_are_emitted_as_they_close():
+    items, parser = parse([])
+    prefix = '{"assessments": [' + json.dumps(ITEMS[0])
+    parser.feed(prefix[:-1])
+    assert items == []
+    parser.feed(prefix[-1])
+    assert items == [ITEMS[0]]
+
+def test_string_value_equal_to_the_key_is_not_a_key():
+    document = json.dumps({"label": "assessments", "other": [{"x": 1}], "assessments": [{"x": 2}]})
+    assert parse(chunked(document, 3))[0] == [{"x": 2}]
+
+def test_other_arrays_are_ignored():
+    assert parse([DOCUMENT], key="missing")[0] == []
+    assert parse([DOCUMENT], key="other")[0] == [{"skill": "ignored"}]
+
+def test_malformed_item_is_skipped():
+    items, parser = parse(['{"assessments": [{"a": 1,}, {"b": 2}]}'])
+    assert items == [{"b": 2}]
+    assert parser.items_emitted == 1
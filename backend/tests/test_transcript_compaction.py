@@ -0,0 +1,45 @@
+import pytest
+
+from transcript_compaction import TRUNCATION_MARKER, compact_transcript, remove_disfluencies
+
+@pytest.mark.parametrize("text, expected", [
+    ("I- I think it works", "I think it works"),
+    ("wh- what did you say", "what did you say"),
+    ("the the design", "the design"),
+    ("I think I think we should", "I think we should"),
+    ("we we, we went", "we went"),
+    ("um, so the cache, you know, was slow", "so the cache was slow"),
+    ("It was [inaudible] fine", "It was fine"),
+])
+def test_disfluencies_are_removed(text, expected):
+    assert remove_disfluencies(text) == expected
+
+@pytest.mark.parametrize("text", [
+    "We did pre- and post-processing",
+    "He scored 90 90 on the test",
+    "x = 1 1",
+    "He said that that was fine",
+    "Ports 8080 8080 were both open",
+])
+def test_content_is_kept(text):
+    assert remove_disfluencies(text) == text
+
+def test_line_structure_is_kept():
+    assert remove_disfluencies("Interviewer: Hi\n\n\nCandidate: Hello") == "Interviewer: Hi\n\nCandidate: Hello"
+
+def test_transcript_without_sentence_breaks_keeps_opening_and_closing():
+    text = " ".join(f"word{i}" for i in range(3000))
+    result = compact_transcript(text, 200)
+    assert result.truncated
+    assert result.compacted_tokens <= 200
+    head, tail = result.text.split(TRUNCATION_MARKER.split("{omitted}")[0])
+    assert head.startswith("word0 word1")
+    assert tail.rstrip().endswith("word2998 word2999")
+
+def test_truncation_keeps_whole_sentences_where_they_fit():
+    sentences = [f"Sentence number {i} is about caching." for i in range(400)]
+    result = compact_transcript(" ".join(sentences), 300)
+    assert result.truncated
+    assert result.compacted_tokens <= 300
+    assert result.text.startswith(sentences[0] + " " + sentences[1])
+    assert result.text.endswith(sentences[-1])
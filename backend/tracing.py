@@ -0,0 +1,174 @@
+"""
+Tracing Module
+Nested per-request spans (OpenTelemetry when installed, exported to a collector or a file)
+and the Server-Timing breakdown of stage durations
+"""
+
+import contextvars
+import functools
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager, nullcontext
+from typing import Any, Callable, Dict, Optional
+
+from metrics import STAGE_SECONDS
+
+try:
+    from opentelemetry import trace
+except ImportError:  # Without the OpenTelemetry API only Server-Timing is recorded
+    trace = None
+
+try:
+    from opentelemetry.sdk.resources import Resource
+    from opentelemetry.sdk.trace import TracerProvider
+    from opentelemetry.sdk.trace.export import BatchSpanProcessor, ConsoleSpanExporter
+except ImportError:  # The SDK is only needed to export spans
+    TracerProvider = None
+
+# Setup logging
+logger = logging.getLogger("tracing")
+
+# "otlp" (collector at OTEL_EXPORTER_OTLP_ENDPOINT), "file" (JSON lines), "console" or empty to disable export
+TRACING_EXPORTER = os.getenv("TRACING_EXPORTER", "").lower()
+TRACING_FILE_PATH = os.getenv("TRACING_FILE_PATH", "traces.jsonl")
+TRACING_SERVICE_NAME = os.getenv("TRACING_SERVICE_NAME", "flo-interviewer-analysis")
+SERVER_TIMING_ENABLED = os.getenv("SERVER_TIMING_ENABLED", "true").lower() == "true"
+
+def _file_exporter(path: str):
+    """ConsoleSpanExporter writing one JSON span per line to a file"""
+    stream = open(path, "a", encoding="utf-8")
+    return ConsoleSpanExporter(out=stream, formatter=lambda span: json.dumps(json.loads(span.to_json())) + "\n")
+
+def configure_tracing() -> None:
+    """Install the OpenTelemetry SDK provider and exporter chosen by TRACING_EXPORTER"""
+    if not TRACING_EXPORTER:
+        return
+    if trace is None or TracerProvider is None:
+        logger.warning("TRACING_EXPORTER is set but opentelemetry-sdk is not installed; spans are not exported")
+        return
+    if TRACING_EXPORTER == "otlp":
+        try:
+            from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
+        except ImportError:
+            logger.warning("TRACING_EXPORTER=otlp needs opentelemetry-exporter-otlp-proto-http; spans are not exported")
+            return
+        exporter = OTLPSpanExporter()
+    elif TRACING_EXPORTER == "file":
+        exporter = _file_exporter(TRACING_FILE_PATH)
+    elif TRACING_EXPORTER == "console":
+        exporter = ConsoleSpanExporter()
+    else:
+        logger.warning(f"Unknown TRACING_EXPORTER {TRACING_EXPORTER}; spans are not exported")
+        return
+    provider = TracerProvider(resource=Resource.create({"service.name": TRACING_SERVICE_NAME}))
+    provider.add_span_processor(BatchSpanProcessor(exporter))
+    trace.set_tracer_provider(provider)
+
+configure_tracing()
+tracer = trace.get_tracer("flo-interviewer") if trace is not None else None
+
+class ServerTiming:
+    """Stage durations of one request, summed per stage; stages may finish on worker threads"""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self._durations: "OrderedDict[str, float]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def add(self, name: str, seconds: float) -> None:
+        with self._lock:
+            self._durations[name] = self._durations.get(name, 0.0) + seconds
+
+    def header(self) -> str:
+        """Server-Timing header value; parallel stages overlap, so their sum can exceed the total"""
+        with self._lock:
+            entries = [f"{name};dur={seconds * 1000:.1f}" for name, seconds in self._durations.items()]
+        entries.append(f"total;dur={(time.perf_counter() - self.started) * 1000:.1f}")
+        return ", ".join(entries)
+
+_server_timing: contextvars.ContextVar[Optional[ServerTiming]] = contextvars.ContextVar("server_timing", default=None)
+
+def _start_span(name: str, attributes: Dict[str, Any]):
+    if tracer is None:
+        return nullcontext()
+    return tracer.start_as_current_span(name, attributes={k: v for k, v in attributes.items() if v is not None})
+
+def set_span_attributes(attributes: Dict[str, Any]) -> None:
+    """Attach attributes (model, token counts, sizes, ...) to the current span"""
+    if trace is None:
+        return
+    trace.get_current_span().set_attributes({k: v for k, v in attributes.items() if v is not None})
+
+@contextmanager
+def span(name: str, attributes: Optional[Dict[str, Any]] = None):
+    """A nested tracing span without stage metrics"""
+    with _start_span(name, attributes or {}):
+        yield
+
+@contextmanager
+def stage_span(stage: str, attributes: Optional[Dict[str, Any]] = None):
+    """
+    Trace a pipeline stage: a span named after it, the stage latency histogram and the
+    request's Server-Timing entry. Usable as a decorator or a context manager.
+    """
+    started = time.perf_counter()
+    try:
+        with _start_span(stage, attributes or {}):
+            yield
+    finally:
+        elapsed = time.perf_counter() - started
+        STAGE_SECONDS.labels(stage=stage).observe(elapsed)
+        timing = _server_timing.get()
+        if timing is not None:
+            timing.add(stage, elapsed)
+
+def in_current_context(func: Callable) -> Callable:
+    """
+    Bind func to a copy of the current context, so spans and Server-Timing started on an
+    executor thread nest under the submitting request
+    """
+    return functools.partial(contextvars.copy_context().run, func)
+
+class TracingMiddleware:
+    """
+    ASGI middleware opening the root span of each request and adding the Server-Timing
+    header. Streamed responses only report the stages finished before their first byte.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        timing = ServerTiming()
+        token = _server_timing.set(timing)
+        headers = dict(scope.get("headers") or [])
+        root = None
+
+        async def send_with_timing(message):
+            if message["type"] == "http.response.start":
+                if root is not None:
+                    root.set_attribute("http.status_code", message["status"])
+                if SERVER_TIMING_ENABLED:
+                    message = dict(message)
+                    message["headers"] = list(message.get("headers", [])) + [
+                        (b"server-timing", timing.header().encode("latin-1"))
+                    ]
+            await send(message)
+
+        try:
+            with _start_span(f"{scope['method']} {scope['path']}", {
+                "http.method": scope["method"],
+                "http.target": scope["path"],
+                "http.request_content_length": int(headers[b"content-length"]) if b"content-length" in headers else None
+            }) as root:
+                await self.app(scope, receive, send_with_timing)
+        finally:
+            _server_timing.reset(token)
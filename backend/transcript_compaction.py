@@ -0,0 +1,220 @@
+"""
+Transcript Compaction Module
+Token counting and disfluency removal for transcripts before they are sent to the LLM stages
+"""
+
+import logging
+import math
+import re
+import threading
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Any, Dict, List, Optional
+
+try:
+    import tiktoken
+except ImportError:  # Fall back to a character-based estimate
+    tiktoken = None
+
+# Setup logging
+logger = logging.getLogger("transcript-compaction")
+
+# Filler words and hesitation sounds that carry no content
+FILLER_PATTERN = re.compile(
+    r"(?:(?<=^)|(?<=[\s,.;:!?]))(?:u+m+|u+h+|e+r+m*|a+h+|h+m+|m+h*m+)(?:[,.]|\s*-)?(?=\s|$)",
+    re.IGNORECASE | re.MULTILINE
+)
+# Discourse fillers, only removed when set off by commas so real usage survives
+DISCOURSE_FILLER_PATTERN = re.compile(r",?\s*\b(?:you know|i mean|sort of|kind of),\s*", re.IGNORECASE)
+# Silence, noise and other non-speech markers emitted by transcription
+NON_SPEECH_PATTERN = re.compile(
+    r"[\[(]\s*(?:silence|pause|long pause|music|noise|background noise|laughter|laughs|crosstalk|"
+    r"no speech|blank_audio|inaudible)\s*[\])]",
+    re.IGNORECASE
+)
+ELLIPSIS_PATTERN = re.compile(r"(?:\.\s*){3,}|(?:-\s*){3,}|…+")
+# False starts such as "I- I think" or "wh- what": a cut-off word restarted with the same stem.
+# Hyphenated prefixes ("pre- and post-processing") are followed by a different word and kept.
+FALSE_START_PATTERN = re.compile(r"\b([^\W\d_]{1,12})-\s+(?=\1)", re.IGNORECASE)
+# Immediate repetition of a word or short phrase: "the the", "I think I think". Only words made
+# of letters take part, so repeated numbers and symbols ("scored 90 90", "x = 1 1") are content.
+_WORD = r"[^\W\d_]+(?:'[^\W\d_]+)*"
+REPEATED_PHRASE_PATTERN = re.compile(rf"\b((?:{_WORD},?\s+){{0,5}}?{_WORD})(?:[,.]?\s+\1\b)+", re.IGNORECASE)
+# Words whose doubling is usually grammatical ("he said that that was fine")
+GRAMMATICAL_REPEATS = {"that", "had", "is", "do"}
+HORIZONTAL_SPACE_PATTERN = re.compile(r"[ \t]{2,}")
+SENTENCE_SPLIT_PATTERN = re.compile(r"(?<=[.!?\n])\s+")
+
+TRUNCATION_MARKER = "\n[... {omitted} tokens of the transcript omitted to fit the token budget ...]\n"
+
+@dataclass(frozen=True)
+class CompactionResult:
+    text: str
+    original_tokens: int
+    compacted_tokens: int
+    token_budget: Optional[int] = None
+    truncated: bool = False
+
+_encoding_lock = threading.Lock()
+# Loaded tokenizers by model; None when a model's tokenizer is unavailable
+_encodings: Dict[str, Any] = {}
+
+def _get_encoding(model: str):
+    """Load the tokenizer for a model once per process, or None when it is unavailable"""
+    if model in _encodings:
+        return _encodings[model]
+    # Serialize the first load, so concurrent requests do not each try the download
+    with _encoding_lock:
+        if model not in _encodings:
+            _encodings[model] = _load_encoding(model)
+        return _encodings[model]
+
+def _load_encoding(model: str):
+    if tiktoken is None:
+        logger.warning("tiktoken is not installed, estimating token counts at four characters per token")
+        return None
+    try:
+        try:
+            return tiktoken.encoding_for_model(model)
+        except KeyError:
+            return tiktoken.get_encoding("o200k_base")
+    except Exception as e:
+        # The encoding files are downloaded on first use and may be unreachable
+        logger.warning(f"Could not load tokenizer for {model}, estimating token counts: {str(e)}")
+        return None
+
+def preload_tokenizer(model: str = "gpt-4.1") -> bool:
+    """
+    Load the tokenizer ahead of the first request, downloading its encoding if it is not cached
+    (see TIKTOKEN_CACHE_DIR). Returns False when token counts will be estimated instead.
+    """
+    encoding = _get_encoding(model)
+    if encoding is not None:
+        logger.info(f"Loaded tokenizer {encoding.name} for {model}")
+    return encoding is not None
+
+def count_tokens(text: str, model: str = "gpt-4.1") -> int:
+    """Count the tokens a model will see for the given text"""
+    if not text:
+        return 0
+    encoding = _get_encoding(model)
+    if encoding is None:
+        # Roughly four characters per token for English text
+        return math.ceil(len(text) / 4)
+    return len(encoding.encode(text, disallowed_special=()))
+
+def _collapse_repetition(match: re.Match) -> str:
+    """Keep one copy of a repeated phrase unless the repetition is grammatical"""
+    phrase = match.group(1)
+    if phrase.lower() in GRAMMATICAL_REPEATS:
+        return match.group(0)
+    return phrase
+
+def remove_disfluencies(text: str) -> str:
+    """Strip fillers, false starts, repeated phrases and non-speech markers, keeping line structure"""
+    text = NON_SPEECH_PATTERN.sub(" ", text)
+    text = ELLIPSIS_PATTERN.sub("... ", text)
+    text = DISCOURSE_FILLER_PATTERN.sub(" ", text)
+    text = FILLER_PATTERN.sub("", text)
+    text = FALSE_START_PATTERN.sub("", text)
+    text = REPEATED_PHRASE_PATTERN.sub(_collapse_repetition, text)
+
+    lines = []
+    previous = None
+    for line in text.split("\n"):
+        line = HORIZONTAL_SPACE_PATTERN.sub(" ", line).strip()
+        line = re.sub(r"\s+([,.!?])", r"\1", line)
+        line = re.sub(r"^([,.]\s*)+", "", line)
+        # Collapse blank runs and lines repeated verbatim
+        if (not line and not previous) or (line and line == previous):
+            continue
+        lines.append(line)
+        previous = line
+
+    return "\n".join(lines).strip()
+
+def _slice_tokens(text: str, tokens: int, model: str, from_end: bool = False) -> str:
+    """The first (or last) given number of tokens of a text"""
+    if tokens <= 0:
+        return ""
+    encoding = _get_encoding(model)
+    if encoding is None:
+        characters = tokens * 4
+        return text[-characters:] if from_end else text[:characters]
+    encoded = encoding.encode(text, disallowed_special=())
+    return encoding.decode(encoded[-tokens:] if from_end else encoded[:tokens]).strip()
+
+def _fit_to_budget(text: str, token_budget: int, model: str) -> str:
+    """
+    Keep the opening and closing of the transcript within the budget, dropping the middle. Whole
+    sentences are kept where they fit; the sentence at each cut is sliced by tokens, so a transcript
+    without sentence breaks still keeps its opening and closing.
+    """
+    units = SENTENCE_SPLIT_PATTERN.split(text)
+    unit_tokens = [count_tokens(unit, model) for unit in units]
+
+    # Reserve room for the omission marker, then spend 70% on the head and 30% on the tail
+    available = max(token_budget - count_tokens(TRUNCATION_MARKER.format(omitted=0), model) - 2, 0)
+    head: List[str] = []
+    head_tokens = 0
+    head_limit = int(available * 0.7)
+    # Tokens of the sentence at the cut already taken by the head
+    cut_prefix_tokens = 0
+    for unit, tokens in zip(units, unit_tokens):
+        if head_tokens + tokens > head_limit:
+            prefix = _slice_tokens(unit, head_limit - head_tokens, model)
+            if prefix:
+                cut_prefix_tokens = count_tokens(prefix, model)
+                head.append(prefix)
+                head_tokens += cut_prefix_tokens
+            break
+        head.append(unit)
+        head_tokens += tokens
+    whole_head_units = len(head) - (1 if cut_prefix_tokens else 0)
+
+    tail: List[str] = []
+    tail_tokens = 0
+    tail_limit = available - head_tokens
+    for index in range(len(units) - 1, whole_head_units - 1, -1):
+        unit, tokens = units[index], unit_tokens[index]
+        if index == whole_head_units:
+            # The sentence the head was cut in: never take back what the head already holds
+            tokens = max(tokens - cut_prefix_tokens, 0)
+        if tail_tokens + tokens > tail_limit or tokens < unit_tokens[index]:
+            suffix = _slice_tokens(unit, min(tail_limit - tail_tokens, tokens), model, from_end=True)
+            if suffix:
+                tail.append(suffix)
+                tail_tokens += count_tokens(suffix, model)
+            break
+        tail.append(unit)
+        tail_tokens += tokens
+    tail.reverse()
+
+    omitted = max(sum(unit_tokens) - head_tokens - tail_tokens, 0)
+    return " ".join(head) + TRUNCATION_MARKER.format(omitted=omitted) + " ".join(tail)
+
+@lru_cache(maxsize=16)
+def compact_transcript(text: str, token_budget: Optional[int] = None, model: str = "gpt-4.1") -> CompactionResult:
+    """
+    Remove disfluencies from a transcript and fit it into a token budget.
+    Results are cached so stages with the same budget receive the identical text.
+    """
+    original_tokens = count_tokens(text, model)
+    compacted = remove_disfluencies(text)
+    compacted_tokens = count_tokens(compacted, model)
+    truncated = False
+
+    if token_budget and compacted_tokens > token_budget:
+        compacted = _fit_to_budget(compacted, token_budget, model)
+        compacted_tokens = count_tokens(compacted, model)
+        truncated = True
+        logger.warning(f"Transcript exceeded the {token_budget} token budget and was truncated")
+
+    logger.info(f"Compacted transcript from {original_tokens} to {compacted_tokens} tokens")
+    return CompactionResult(
+        text=compacted,
+        original_tokens=original_tokens,
+        compacted_tokens=compacted_tokens,
+        token_budget=token_budget,
+        truncated=truncated
+    )
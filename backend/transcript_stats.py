@@ -0,0 +1,175 @@
+"""
+Transcript Statistics Module
+Single-pass scan of a transcript for the quality checks and conversational statistics
+(talk ratio, turns, words per minute, answer lengths)
+"""
+
+import re
+from dataclasses import dataclass
+from typing import List, Optional
+
+SPEAKER_ROLES = {
+    "interviewer": "interviewer",
+    "recruiter": "interviewer",
+    "candidate": "candidate",
+    "interviewee": "candidate",
+    "applicant": "candidate",
+}
+
+# One alternation, tried in order at each position, so the transcript is scanned exactly once
+# without lowercased copies. Speaker labels only count at the start of a line, optionally
+# after a timestamp.
+SCAN_PATTERN = re.compile(r"""
+    (?P<speaker>^[ \t]*(?P<lead>\[(?:\d{1,2}:)?\d{1,2}:\d{2}(?:\.\d+)?\][ \t]*)?
+        (?:\*\*)?(?P<role>interviewer|recruiter|candidate|interviewee|applicant)
+        [ \t]*(?:\d+|\([^)\n]{0,40}\))?[ \t]*:)
+  | (?P<timestamp>\[(?:\d{1,2}:)?\d{1,2}:\d{2}(?:\.\d+)?\])
+  | (?P<error>\[(?:inaudible|unclear)\]|\?\?\?|\.{9})
+  | (?P<question>\?)
+  | (?P<cue>\b(?:tell[ \t]+me|describe|explain|what[ \t]+is|how[ \t]+do|why)\w*)
+  | (?P<word>[^\W_][\w'-]*)
+""", re.IGNORECASE | re.MULTILINE | re.VERBOSE)
+
+MIN_TRANSCRIPT_CHARS = 50
+# More error markers than this share of words makes the transcript unreliable
+MAX_ERROR_RATIO = 0.1
+
+@dataclass
+class TranscriptStatistics:
+    word_count: int
+    question_marks: int
+    error_markers: int
+    speaker_turns: int = 0
+    interviewer_turns: int = 0
+    candidate_turns: int = 0
+    interviewer_words: int = 0
+    candidate_words: int = 0
+    candidate_talk_ratio: Optional[float] = None
+    interviewer_questions: int = 0
+    average_answer_words: Optional[float] = None
+    median_answer_words: Optional[float] = None
+    longest_answer_words: Optional[int] = None
+    shortest_answer_words: Optional[int] = None
+    duration_seconds: Optional[float] = None
+    duration_source: Optional[str] = None
+    words_per_minute: Optional[float] = None
+
+@dataclass
+class TranscriptScan:
+    is_valid: bool
+    message: str
+    statistics: TranscriptStatistics
+
+@dataclass
+class _Turn:
+    role: str
+    words: int = 0
+    questions: int = 0
+
+def _timestamp_seconds(text: str) -> float:
+    seconds = 0.0
+    for part in text.strip("[]").split(":"):
+        seconds = seconds * 60 + float(part)
+    return seconds
+
+def _median(values: List[int]) -> float:
+    ordered = sorted(values)
+    middle = len(ordered) // 2
+    return float(ordered[middle]) if len(ordered) % 2 else (ordered[middle - 1] + ordered[middle]) / 2
+
+def scan_transcript(transcript: str, duration_seconds: Optional[float] = None) -> TranscriptScan:
+    """
+    Compute the quality checks and conversation statistics in one pass. Words per minute use
+    duration_seconds (e.g. the audio length) or, failing that, the span of [mm:ss] timestamps.
+    """
+    words = questions = errors = cues = 0
+    turns: List[_Turn] = []
+    first_timestamp = last_timestamp = None
+
+    for match in SCAN_PATTERN.finditer(transcript or ""):
+        kind = match.lastgroup
+        if kind == "word":
+            words += 1
+            if turns:
+                turns[-1].words += 1
+        elif kind == "cue":
+            count = len(match.group().split())
+            words += count
+            cues += 1
+            if turns:
+                turns[-1].words += count
+        elif kind == "question":
+            questions += 1
+            if turns:
+                turns[-1].questions += 1
+        elif kind == "speaker":
+            if match.group("lead"):
+                last_timestamp = _timestamp_seconds(match.group("lead").strip())
+                if first_timestamp is None:
+                    first_timestamp = last_timestamp
+            role = SPEAKER_ROLES[match.group("role").lower()]
+            if not turns or turns[-1].role != role:
+                turns.append(_Turn(role))
+        elif kind == "error":
+            errors += 1
+        elif kind == "timestamp":
+            last_timestamp = _timestamp_seconds(match.group())
+            if first_timestamp is None:
+                first_timestamp = last_timestamp
+
+    statistics = TranscriptStatistics(word_count=words, question_marks=questions, error_markers=errors)
+    if turns:
+        answers = [turn.words for turn in turns if turn.role == "candidate" and turn.words]
+        statistics.speaker_turns = len(turns)
+        statistics.interviewer_turns = sum(1 for turn in turns if turn.role == "interviewer")
+        statistics.candidate_turns = sum(1 for turn in turns if turn.role == "candidate")
+        statistics.interviewer_words = sum(turn.words for turn in turns if turn.role == "interviewer")
+        statistics.candidate_words = sum(answers)
+        statistics.interviewer_questions = sum(turn.questions for turn in turns if turn.role == "interviewer")
+        attributed = statistics.interviewer_words + statistics.candidate_words
+        if attributed:
+            statistics.candidate_talk_ratio = round(statistics.candidate_words / attributed, 3)
+        if answers:
+            statistics.average_answer_words = round(sum(answers) / len(answers), 1)
+            statistics.median_answer_words = _median(answers)
+            statistics.longest_answer_words = max(answers)
+            statistics.shortest_answer_words = min(answers)
+
+    if duration_seconds:
+        statistics.duration_seconds, statistics.duration_source = round(duration_seconds, 1), "audio"
+    elif first_timestamp is not None and last_timestamp > first_timestamp:
+        statistics.duration_seconds, statistics.duration_source = round(last_timestamp - first_timestamp, 1), "timestamps"
+    if statistics.duration_seconds:
+        statistics.words_per_minute = round(words / statistics.duration_seconds * 60, 1)
+
+    if not transcript or len(transcript.strip()) < MIN_TRANSCRIPT_CHARS:
+        return TranscriptScan(False, "Transcript too short for meaningful analysis", statistics)
+    if errors > words * MAX_ERROR_RATIO:
+        return TranscriptScan(False, "Transcript quality too poor for reliable analysis", statistics)
+    # Accept either question indicators or speaker labels
+    if not (questions or cues or turns):
+        return TranscriptScan(False, "Content does not appear to be an interview format", statistics)
+    return TranscriptScan(True, "Transcript quality acceptable", statistics)
+
+def format_statistics_facts(statistics: TranscriptStatistics) -> str:
+    """Measured statistics as prompt lines, so the model quotes them instead of estimating"""
+    facts = [f"- Words: {statistics.word_count}"]
+    if statistics.duration_seconds:
+        facts.append(f"- Duration: {statistics.duration_seconds / 60:.1f} minutes ({statistics.words_per_minute} words per minute)")
+    if statistics.speaker_turns:
+        facts.append(
+            f"- Speaker turns: {statistics.speaker_turns} "
+            f"({statistics.interviewer_turns} interviewer, {statistics.candidate_turns} candidate)"
+        )
+        facts.append(f"- Questions asked by the interviewer: {statistics.interviewer_questions}")
+    if statistics.candidate_talk_ratio is not None:
+        facts.append(f"- Candidate share of words spoken: {statistics.candidate_talk_ratio * 100:.0f}%")
+    if statistics.average_answer_words is not None:
+        facts.append(
+            f"- Candidate answer length in words: average {statistics.average_answer_words}, "
+            f"median {statistics.median_answer_words:g}, longest {statistics.longest_answer_words}, "
+            f"shortest {statistics.shortest_answer_words}"
+        )
+    if statistics.error_markers:
+        facts.append(f"- Inaudible or unclear passages: {statistics.error_markers}")
+    return "\n".join(facts)